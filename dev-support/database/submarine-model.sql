@@ -13,6 +13,7 @@
 
 -- Since the associated tables have primary and foreign key constraints,
 -- we need to delete them all before creating them
+DROP TABLE IF EXISTS `artifact_folder_counter`;
 DROP TABLE IF EXISTS `param`;
 DROP TABLE IF EXISTS `metric`;
 DROP TABLE IF EXISTS `model_version_tag`;
@@ -37,6 +38,7 @@ CREATE TABLE `registered_model_tag` (
 	`name` VARCHAR(256) NOT NULL,
 	`tag` VARCHAR(256) NOT NULL,
 	CONSTRAINT `registered_model_tag_pk` PRIMARY KEY (`name`, `tag`),
+	INDEX `registered_model_tag_tag_name_idx` (`tag`, `name`),
 	FOREIGN KEY(`name`) REFERENCES `registered_model` (`name`) ON UPDATE CASCADE ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 
@@ -67,6 +69,7 @@ CREATE TABLE `model_version_tag` (
 	`version` INTEGER NOT NULL,
 	`tag` VARCHAR(256) NOT NULL,
 	CONSTRAINT `model_version_tag_pk` PRIMARY KEY (`name`, `version`, `tag`),
+	INDEX `model_version_tag_tag_name_version_idx` (`tag`, `name`, `version`),
 	FOREIGN KEY(`name`, `version`) REFERENCES `model_version` (`name`, `version`) ON UPDATE CASCADE ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 
@@ -80,6 +83,7 @@ CREATE TABLE `metric` (
 	`step` INTEGER NOT NULL COMMENT 'Step recorded for this metric entry: `INTEGER`.',
 	`is_nan` BOOLEAN NOT NULL COMMENT 'True if the value is in fact NaN.',
 	CONSTRAINT `metric_pk` PRIMARY KEY  (`id`, `key`, `timestamp`, `worker_index`),
+	INDEX `metric_id_key_worker_index_step_idx` (`id`, `key`, `worker_index`, `step`),
 	FOREIGN KEY(`id`) REFERENCES `experiment` (`id`) ON UPDATE CASCADE ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 
@@ -91,3 +95,9 @@ CREATE TABLE `param` (
 	CONSTRAINT `param_pk` PRIMARY KEY  (`id`, `key`, `worker_index`),
 	FOREIGN KEY(`id`) REFERENCES `experiment` (`id`) ON UPDATE CASCADE ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+CREATE TABLE `artifact_folder_counter` (
+	`path` VARCHAR(190) NOT NULL COMMENT 'Parent folder of numbered artifact folders: *Primary Key* for ``artifact_folder_counter`` table.',
+	`next_number` INTEGER NOT NULL COMMENT 'Number of the next folder to allocate: `Integer`.',
+	CONSTRAINT `artifact_folder_counter_pk` PRIMARY KEY (`path`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
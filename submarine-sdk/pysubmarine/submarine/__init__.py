@@ -18,14 +18,18 @@ import submarine.utils as utils
 from submarine.client.api.experiment_client import ExperimentClient
 
 log_param = submarine.tracking.fluent.log_param
+log_params = submarine.tracking.fluent.log_params
 log_metric = submarine.tracking.fluent.log_metric
+log_metrics = submarine.tracking.fluent.log_metrics
 save_model = submarine.tracking.fluent.save_model
 set_db_uri = utils.set_db_uri
 get_db_uri = utils.get_db_uri
 
 __all__ = [
     "log_metric",
+    "log_metrics",
     "log_param",
+    "log_params",
     "save_model",
     "set_db_uri",
     "get_db_uri",
@@ -0,0 +1,136 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Size-bounded local cache of downloaded artifacts, shared by all processes of a node. Every entry
+is a directory guarded by its own ``flock`` lock file: an entry is downloaded once under an
+exclusive lock and read under a shared lock, and only entries that nobody holds are evicted.
+"""
+
+import fcntl
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+_logger = logging.getLogger(__name__)
+
+_CACHE_DIR_ENV_VAR = "SUBMARINE_ARTIFACT_CACHE_DIR"
+_CACHE_SIZE_ENV_VAR = "SUBMARINE_ARTIFACT_CACHE_SIZE"
+DEFAULT_CACHE_DIR = os.path.join("~", ".cache", "submarine", "artifacts")
+DEFAULT_CACHE_SIZE = 20 * 1024 * 1024 * 1024
+
+_LOCKS_DIR = ".locks"
+# written into an entry once its download is complete, its mtime is the last access time
+_COMPLETE_MARKER = ".complete"
+
+
+def _dir_size(path: str) -> int:
+    size = 0
+    for root, _, filenames in os.walk(path):
+        for f in filenames:
+            size += os.path.getsize(os.path.join(root, f))
+    return size
+
+
+class ArtifactCache:
+    """
+    Local LRU cache of artifact directories keyed by an id, e.g. the id of a model version.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_size: Optional[int] = None) -> None:
+        """
+        :param directory: Cache directory. Defaults to ``SUBMARINE_ARTIFACT_CACHE_DIR`` or
+                          ``~/.cache/submarine/artifacts``.
+        :param max_size: Size in bytes above which the least recently used entries are removed.
+                         Defaults to ``SUBMARINE_ARTIFACT_CACHE_SIZE`` or 20 GiB.
+        """
+        directory = directory or os.environ.get(_CACHE_DIR_ENV_VAR) or DEFAULT_CACHE_DIR
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_size = max_size or int(os.environ.get(_CACHE_SIZE_ENV_VAR, DEFAULT_CACHE_SIZE))
+        os.makedirs(os.path.join(self.directory, _LOCKS_DIR), exist_ok=True)
+
+    @contextmanager
+    def get(self, key: str, download: Callable[[str], None]) -> Iterator[str]:
+        """
+        Yield the local directory of an entry, downloading it first if it is not cached. The
+        entry cannot be evicted while the context is open.
+        :param key: Id of the entry.
+        :param download: Called with a directory to download the entry into on a cache miss.
+        """
+        path = os.path.join(self.directory, key)
+        marker = os.path.join(path, _COMPLETE_MARKER)
+        with open(self._lock_path(key), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                downloaded = False
+                if not os.path.exists(marker):
+                    self._download(path, download)
+                    downloaded = True
+                now = time.time()
+                os.utime(marker, (now, now))
+                fcntl.flock(lock, fcntl.LOCK_SH)
+                if downloaded:
+                    self.evict(keep=key)
+                yield path
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """
+        Remove the least recently used entries until the cache fits in ``max_size``. Entries that
+        are in use by any process are skipped.
+        :param keep: An entry that must not be removed.
+        """
+        entries = []
+        for key in os.listdir(self.directory):
+            marker = os.path.join(self.directory, key, _COMPLETE_MARKER)
+            if key == _LOCKS_DIR or ".tmp-" in key or not os.path.exists(marker):
+                continue
+            entries.append((os.path.getmtime(marker), key, _dir_size(os.path.join(self.directory, key))))
+        total = sum(size for _, _, size in entries)
+        for _, key, size in sorted(entries):
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            with open(self._lock_path(key), "a") as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # in use
+                try:
+                    os.remove(os.path.join(self.directory, key, _COMPLETE_MARKER))
+                    shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+                    total -= size
+                    _logger.info("Evicted %s (%d bytes) from the artifact cache", key, size)
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _lock_path(self, key: str) -> str:
+        return os.path.join(self.directory, _LOCKS_DIR, key + ".lock")
+
+    def _download(self, path: str, download: Callable[[str], None]) -> None:
+        # a partial download left behind by a process that died is discarded
+        shutil.rmtree(path, ignore_errors=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{time.time_ns()}"
+        try:
+            download(tmp_path)
+            with open(os.path.join(tmp_path, _COMPLETE_MARKER), "w"):
+                pass
+            os.rename(tmp_path, path)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
@@ -13,31 +13,133 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import json
+import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
 
 import boto3
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+from submarine.exceptions import SubmarineException
+
+_logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+# number of files uploaded at the same time
+DEFAULT_MAX_WORKERS = 8
+# files larger than the threshold are uploaded in parts, each part by one of max_concurrency threads
+DEFAULT_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=64 * MB, multipart_chunksize=64 * MB, max_concurrency=4, use_threads=True
+)
+DEFAULT_MAX_ATTEMPTS = 3
+_RETRY_BACKOFF = 0.5
+
+# Content-addressed layout: files are split into chunks of CHUNK_SIZE bytes stored once under
+# "chunks/<sha256>", and each folder only holds a manifest that lists the chunks of its files.
+CHUNK_SIZE = 8 * MB
+CHUNKS_PREFIX = "chunks"
+MANIFEST_NAME = "manifest.json"
+_CONTENT_ADDRESSED_ENV_VAR = "SUBMARINE_CONTENT_ADDRESSED_ARTIFACTS"
+
+# Called with the key of a file and the number of bytes just uploaded, possibly from several threads.
+ProgressCallback = Callable[[str, int], None]
+
+
+def _is_not_found(error: ClientError) -> bool:
+    return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
 
 
 class Repository:
-    def __init__(self):
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        transfer_config: TransferConfig = DEFAULT_TRANSFER_CONFIG,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        content_addressed: Optional[bool] = None,
+    ):
+        """
+        :param max_workers: Number of files uploaded concurrently by ``log_artifacts``.
+        :param transfer_config: boto3 transfer configuration used for every file, which sets the
+                                multipart threshold, chunk size and threads per file.
+        :param max_attempts: Number of times the upload of a file is attempted before failing.
+        :param content_addressed: If True, ``log_artifacts`` stores files as deduplicated chunks
+                                  plus a manifest, see ``upload_artifacts_content_addressed``. If
+                                  not provided, it is enabled by setting the
+                                  ``SUBMARINE_CONTENT_ADDRESSED_ARTIFACTS`` environment variable
+                                  to ``true``.
+        """
         self.client = boto3.client(
             "s3",
             aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
             aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
             endpoint_url=os.environ.get("MLFLOW_S3_ENDPOINT_URL"),
+            # every worker transfers a file with up to max_concurrency threads, each needing a
+            # connection, beyond the default pool of 10 connections
+            config=Config(max_pool_connections=max_workers * transfer_config.max_concurrency),
         )
         self.bucket = "submarine"
+        self.max_workers = max_workers
+        self.transfer_config = transfer_config
+        self.max_attempts = max_attempts
+        if content_addressed is None:
+            content_addressed = os.environ.get(_CONTENT_ADDRESSED_ENV_VAR, "").lower() in ("true", "1")
+        self.content_addressed = content_addressed
+        # chunks known to be in the bucket, to skip asking for them again
+        self._known_chunks: set = set()
+        self._known_chunks_lock = threading.Lock()
 
-    def _upload_file(self, local_file: str, bucket: str, key: str) -> None:
-        self.client.upload_file(Filename=local_file, Bucket=bucket, Key=key)
+    def _upload_file(
+        self, local_file: str, bucket: str, key: str, progress: Optional[ProgressCallback] = None
+    ) -> Dict:
+        """
+        Upload a file, retrying failed attempts with an exponential backoff.
+        :return: The manifest entry of the file: its ``key``, ``size`` and number of ``attempts``.
+        """
+        callback = (lambda n: progress(key, n)) if progress is not None else None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.client.upload_file(
+                    Filename=local_file,
+                    Bucket=bucket,
+                    Key=key,
+                    Config=self.transfer_config,
+                    Callback=callback,
+                )
+                return {"key": key, "size": os.path.getsize(local_file), "attempts": attempt}
+            except (S3UploadFailedError, BotoCoreError, ClientError) as e:
+                if attempt == self.max_attempts:
+                    raise SubmarineException(f"Failed to upload {local_file} to s3://{bucket}/{key}: {e}")
+                _logger.warning("Upload of %s failed (attempt %d), retrying: %s", key, attempt, e)
+                time.sleep(_RETRY_BACKOFF * 2 ** (attempt - 1))
 
     def list_artifact_subfolder(self, dest_path):
-        response = self.client.list_objects(
-            Bucket=self.bucket,
-            Prefix=f"{dest_path}/",
-            Delimiter="/",
-        )
-        return response.get("CommonPrefixes")
+        common_prefixes = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{dest_path}/", Delimiter="/"):
+            common_prefixes.extend(page.get("CommonPrefixes", []))
+        return common_prefixes or None
+
+    def next_folder_number(self, dest_path: str) -> int:
+        """
+        :param dest_path: Parent folder in the bucket.
+        :return: The number following the highest numbered subfolder "<dest_path>/<n>", 1 if
+                 there is none.
+        """
+        prefix = f"{dest_path}/"
+        numbers = [0]
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix, Delimiter="/"):
+            names = [p["Prefix"][len(prefix) :].rstrip("/") for p in page.get("CommonPrefixes", [])]
+            numbers.extend(int(name) for name in names if name.isdigit())
+        return max(numbers) + 1
 
     def log_artifact(self, dest_path: str, local_file: str) -> None:
         dest_path = os.path.join(dest_path, os.path.basename(local_file))
@@ -48,25 +150,259 @@ class Repository:
         )
 
     def log_artifacts(self, dest_path: str, local_dir: str) -> str:
+        if self.content_addressed:
+            self.upload_artifacts_content_addressed(dest_path, local_dir)
+        else:
+            self.upload_artifacts(dest_path, local_dir)
+        return f"s3://{self.bucket}/{dest_path}"
+
+    @staticmethod
+    def _list_files(dest_path: str, local_dir: str) -> List[tuple]:
+        """
+        :return: ``(local file, key)`` pairs of the files under ``local_dir``.
+        """
         local_dir = os.path.abspath(local_dir)
+        files = []
         for root, _, filenames in os.walk(local_dir):
             upload_path = dest_path
             if root != local_dir:
                 rel_path = os.path.relpath(root, local_dir)
                 upload_path = os.path.join(dest_path, rel_path)
             for f in filenames:
-                self._upload_file(
-                    local_file=os.path.join(root, f),
-                    bucket=self.bucket,
-                    key=os.path.join(upload_path, f),
-                )
-        return f"s3://{self.bucket}/{dest_path}"
+                files.append((os.path.join(root, f), os.path.join(upload_path, f)))
+        return files
+
+    def upload_artifacts(
+        self, dest_path: str, local_dir: str, progress: Optional[ProgressCallback] = None
+    ) -> List[Dict]:
+        """
+        Upload all files under a local directory concurrently.
+        :param dest_path: Destination path in the bucket.
+        :param local_dir: Local directory to upload.
+        :param progress: Called with the key and the number of bytes uploaded as the upload goes on.
+        :return: The manifest of the uploaded files, one ``{"key", "size", "attempts"}`` dict per
+                 file, sorted by key.
+        """
+        files = self._list_files(dest_path, local_dir)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._upload_file, local_file, self.bucket, key, progress)
+                for local_file, key in files
+            ]
+            manifest, errors = [], []
+            for future in futures:
+                try:
+                    manifest.append(future.result())
+                except SubmarineException as e:
+                    errors.append(str(e))
+        if errors:
+            raise SubmarineException(f"Failed to upload {len(errors)} of {len(files)} files: {errors}")
+        return sorted(manifest, key=lambda entry: entry["key"])
 
-    def delete_folder(self, dest_path) -> None:
-        objects_to_delete = self.client.list_objects(Bucket=self.bucket, Prefix=dest_path)
-        if objects_to_delete.get("Contents") is not None:
-            delete_keys: dict = {"Objects": []}
-            delete_keys["Objects"] = [
-                {"Key": k} for k in [obj["Key"] for obj in objects_to_delete.get("Contents")]
+    def upload_artifacts_content_addressed(self, dest_path: str, local_dir: str) -> Dict:
+        """
+        Upload all files under a local directory as content-addressed chunks. Each file is split
+        into chunks of ``CHUNK_SIZE`` bytes keyed by their SHA-256 under ``chunks/``. Chunks that
+        are already in the bucket, e.g. the unchanged weights of a fine-tuned model, are not
+        uploaded again. The folder itself only receives a ``manifest.json`` listing the files.
+        :param dest_path: Destination path in the bucket.
+        :param local_dir: Local directory to upload.
+        :return: The manifest, ``{"chunk_size": ..., "files": [...]}`` with one
+                 ``{"path", "size", "sha256", "chunks"}`` dict per file, sorted by path.
+        """
+        files = self._list_files(dest_path, local_dir)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._upload_chunks, local_file, os.path.relpath(key, dest_path))
+                for local_file, key in files
             ]
-            self.client.delete_objects(Bucket=self.bucket, Delete=delete_keys)
+            entries = [future.result() for future in futures]
+        manifest = {"chunk_size": CHUNK_SIZE, "files": sorted(entries, key=lambda entry: entry["path"])}
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=os.path.join(dest_path, MANIFEST_NAME),
+            Body=json.dumps(manifest).encode("utf-8"),
+            ContentType="application/json",
+        )
+        return manifest
+
+    def _upload_chunks(self, local_file: str, path: str) -> Dict:
+        file_hash = hashlib.sha256()
+        chunks = []
+        with open(local_file, "rb") as f:
+            for data in iter(lambda: f.read(CHUNK_SIZE), b""):
+                file_hash.update(data)
+                chunk_hash = hashlib.sha256(data).hexdigest()
+                self._put_chunk(chunk_hash, data)
+                chunks.append(chunk_hash)
+        return {
+            "path": path,
+            "size": os.path.getsize(local_file),
+            "sha256": file_hash.hexdigest(),
+            "chunks": chunks,
+        }
+
+    def _put_chunk(self, chunk_hash: str, data: bytes) -> None:
+        with self._known_chunks_lock:
+            if chunk_hash in self._known_chunks:
+                return
+        key = f"{CHUNKS_PREFIX}/{chunk_hash}"
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if not _is_not_found(e):
+                raise
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+        with self._known_chunks_lock:
+            self._known_chunks.add(chunk_hash)
+
+    def download_artifacts(self, path: str, dst: str) -> str:
+        """
+        Download all files under a folder of the bucket to a local directory. Large objects are
+        fetched with concurrent ranged GETs. Files are verified against the folder's manifest
+        for the content-addressed layout, or against their size and MD5 ETag otherwise.
+        :param path: Folder in the bucket.
+        :param dst: Local directory to download to. Created if missing.
+        :return: The local directory.
+        """
+        prefix = path.rstrip("/") + "/"
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=prefix + MANIFEST_NAME)
+            manifest = json.loads(response["Body"].read())
+        except ClientError as e:
+            if not _is_not_found(e):
+                raise
+            manifest = None
+
+        os.makedirs(dst, exist_ok=True)
+        if manifest is not None:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [
+                    executor.submit(self._download_chunks, entry, manifest["chunk_size"], dst)
+                    for entry in manifest["files"]
+                ]
+                for future in futures:
+                    future.result()
+            return dst
+
+        objects = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            objects.extend(page.get("Contents", []))
+        if not objects:
+            raise SubmarineException(f"No artifacts found under s3://{self.bucket}/{prefix}")
+
+        def download(obj: Dict) -> None:
+            local_file = os.path.join(dst, obj["Key"][len(prefix) :])
+            os.makedirs(os.path.dirname(local_file), exist_ok=True)
+            # managed download: objects above the multipart threshold are fetched with ranged GETs
+            self.client.download_file(
+                Bucket=self.bucket, Key=obj["Key"], Filename=local_file, Config=self.transfer_config
+            )
+            self._verify_object(local_file, obj)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(download, objects))
+        return dst
+
+    def _download_chunks(self, entry: Dict, chunk_size: int, dst: str) -> None:
+        local_file = os.path.join(dst, entry["path"])
+        os.makedirs(os.path.dirname(local_file), exist_ok=True)
+        file_hash = hashlib.sha256()
+        with open(local_file, "wb") as f:
+            for chunk_hash in entry["chunks"]:
+                response = self.client.get_object(Bucket=self.bucket, Key=f"{CHUNKS_PREFIX}/{chunk_hash}")
+                data = response["Body"].read()
+                if hashlib.sha256(data).hexdigest() != chunk_hash:
+                    raise SubmarineException(f"Checksum mismatch in chunk {chunk_hash} of {entry['path']}")
+                file_hash.update(data)
+                f.write(data)
+        if file_hash.hexdigest() != entry["sha256"] or os.path.getsize(local_file) != entry["size"]:
+            raise SubmarineException(f"Checksum mismatch in downloaded file {entry['path']}")
+
+    @staticmethod
+    def _verify_object(local_file: str, obj: Dict) -> None:
+        if os.path.getsize(local_file) != obj["Size"]:
+            raise SubmarineException(f"Size mismatch in downloaded file {obj['Key']}")
+        etag = obj.get("ETag", "").strip('"')
+        # the ETag is the MD5 of the content unless the object was uploaded in parts
+        if etag and "-" not in etag:
+            md5 = hashlib.md5()
+            with open(local_file, "rb") as f:
+                for data in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    md5.update(data)
+            if md5.hexdigest() != etag:
+                raise SubmarineException(f"Checksum mismatch in downloaded file {obj['Key']}")
+
+    def copy_folder(self, src_path: str, dest_path: str) -> List[Dict]:
+        """
+        Copy every object under a folder of the bucket to another folder. The objects are copied
+        by the object store itself, without downloading them.
+        :param src_path: Source folder in the bucket.
+        :param dest_path: Destination folder in the bucket.
+        :return: The manifest of the copied objects, one ``{"key", "size"}`` dict per object,
+                 sorted by key.
+        """
+        src_prefix = src_path.rstrip("/") + "/"
+        objects = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=src_prefix):
+            objects.extend(page.get("Contents", []))
+
+        def copy(obj: Dict) -> Dict:
+            key = os.path.join(dest_path, obj["Key"][len(src_prefix) :])
+            # managed copy: objects above the multipart threshold are copied part by part
+            self.client.copy(
+                CopySource={"Bucket": self.bucket, "Key": obj["Key"]},
+                Bucket=self.bucket,
+                Key=key,
+                Config=self.transfer_config,
+            )
+            return {"key": key, "size": obj["Size"]}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            manifest = list(executor.map(copy, objects))
+        return sorted(manifest, key=lambda entry: entry["key"])
+
+    def delete_folder(self, dest_path) -> Dict:
+        """
+        Delete every object under a folder of the bucket. Pages of up to 1000 keys are deleted
+        with one ``delete_objects`` call each, from a thread pool while the listing goes on.
+        :param dest_path: Folder in the bucket.
+        :return: A report with the number of ``deleted`` objects and the ``errors`` returned by
+                 the object store, one ``{"Key", "Code", "Message"}`` dict per object left behind.
+        """
+        prefix = dest_path.rstrip("/") + "/"
+        # bounds the number of listed pages waiting to be deleted
+        in_flight = threading.BoundedSemaphore(self.max_workers * 2)
+
+        def delete(keys: List[str]) -> Dict:
+            try:
+                response = self.client.delete_objects(
+                    Bucket=self.bucket, Delete={"Objects": [{"Key": k} for k in keys], "Quiet": True}
+                )
+                errors = response.get("Errors", [])
+            except (BotoCoreError, ClientError) as e:
+                errors = [{"Key": k, "Code": type(e).__name__, "Message": str(e)} for k in keys]
+            finally:
+                in_flight.release()
+            return {"deleted": len(keys) - len(errors), "errors": errors}
+
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            paginator = self.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(
+                Bucket=self.bucket, Prefix=prefix, PaginationConfig={"PageSize": 1000}
+            ):
+                keys = [obj["Key"] for obj in page.get("Contents", [])]
+                if keys:
+                    in_flight.acquire()
+                    futures.append(executor.submit(delete, keys))
+            reports = [future.result() for future in futures]
+        report = {
+            "deleted": sum(r["deleted"] for r in reports),
+            "errors": [error for r in reports for error in r["errors"]],
+        }
+        if report["errors"]:
+            _logger.warning("Failed to delete %d objects under %s", len(report["errors"]), prefix)
+        return report
@@ -15,10 +15,12 @@
 
 from submarine.entities.experiment import Experiment
 from submarine.entities.Metric import Metric
+from submarine.entities.paged_list import PagedList
 from submarine.entities.Param import Param
 
 __all__ = [
     "Experiment",
     "Metric",
+    "PagedList",
     "Param",
 ]
@@ -0,0 +1,424 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Checkpoint writing and loading for the PyTorch models. The state is snapshotted to CPU memory on
+the training thread and streamed to storage from a background thread, so that training does not
+wait on checkpoint I/O. Every file is written to a temporary name and renamed once complete.
+
+Two formats are supported:
+
+* "ckpt-<step>.pkl": the whole state in one ``torch.save`` file, written by rank 0 alone as
+  every rank holds the same state.
+* "ckpt-<step>/" (sharded): every tensor with at least ``shard_min_rows`` rows, such as the
+  embedding tables of the CTR models and their optimizer state, is split by rows between the
+  ranks. Each rank writes its rows as "t<i>.r<rank>.npy" and then "rank-<rank>.done". Rank 0
+  also writes the remaining state as "dense.pkl" and the "index.json" describing the shards.
+  Shards are read back lazily, one row range at a time.
+* "ckpt-<step>.delta.pkl" (incremental): only the rows of the large tensors that changed since
+  the previous checkpoint, which is named in the file, plus the remaining state. Changed rows are
+  found by diffing against a CPU copy of the last written tensors, which also catches the rows
+  that an optimizer with momentum moves without them being in a batch. Every
+  ``full_checkpoint_interval``-th checkpoint is a full one, which bounds the chain to replay.
+"""
+
+import json
+import logging
+import os
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+from pyarrow import fs
+
+from submarine.utils import fileio
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_PATTERN = re.compile(r"^ckpt-(\d+)(\.delta\.pkl|\.pkl)?$")
+DELTA_SUFFIX = ".delta.pkl"
+INDEX_NAME = "index.json"
+DENSE_NAME = "dense.pkl"
+DEFAULT_SHARD_MIN_ROWS = 65536
+DEFAULT_FULL_CHECKPOINT_INTERVAL = 10
+
+# Replaces a sharded tensor in the dense state.
+_SHARDED_TENSOR_KEY = "__sharded_tensor__"
+
+
+def checkpoint_name(step: int, sharded: bool = False, delta: bool = False) -> str:
+    if sharded:
+        return f"ckpt-{step:08d}"
+    return f"ckpt-{step:08d}{DELTA_SUFFIX}" if delta else f"ckpt-{step:08d}.pkl"
+
+
+def list_checkpoints(checkpoint_dir: str) -> List[str]:
+    """
+    :return: The names of the complete checkpoints in a directory, oldest first.
+    """
+    names = sorted(name for name in fileio.list_dir(checkpoint_dir) if CHECKPOINT_PATTERN.match(name))
+    return [
+        name for name in names if name.endswith(".pkl") or _is_complete(os.path.join(checkpoint_dir, name))
+    ]
+
+
+def snapshot(state: Any) -> Any:
+    """
+    Copy every tensor of a (nested) state dict to CPU memory, so that training can go on
+    updating the original tensors while the copy is written.
+    """
+    if isinstance(state, torch.Tensor):
+        return state.detach().to("cpu", copy=True)
+    if isinstance(state, dict):
+        return type(state)((key, snapshot(value)) for key, value in state.items())
+    if isinstance(state, (list, tuple)):
+        return type(state)(snapshot(value) for value in state)
+    return state
+
+
+def row_range(num_rows: int, rank: int, world_size: int) -> Tuple[int, int]:
+    """
+    :return: The ``[start, end)`` rows of a sharded tensor written by a rank.
+    """
+    return num_rows * rank // world_size, num_rows * (rank + 1) // world_size
+
+
+def _load_file(uri: str) -> Any:
+    with fileio.open_buffered_file_reader(uri) as f:
+        return torch.load(f, map_location="cpu")
+
+
+def _write_atomic(uri: str, write) -> None:
+    tmp_uri = f"{uri}.tmp"
+    try:
+        with fileio.open_buffered_stream_writer(tmp_uri) as stream:
+            write(stream)
+        fileio.move(tmp_uri, uri)
+    except Exception:
+        if fileio.file_info(tmp_uri).type != fs.FileType.NotFound:
+            fileio.delete_file(tmp_uri)
+        raise
+
+
+def _split_state(state: Any, min_rows: int, tensors: List[torch.Tensor]) -> Any:
+    """
+    Move the tensors with at least ``min_rows`` rows out of the state into ``tensors``.
+    """
+    if isinstance(state, torch.Tensor):
+        if state.dim() > 0 and state.shape[0] >= min_rows and state.dtype != torch.bfloat16:
+            tensors.append(state)
+            return {_SHARDED_TENSOR_KEY: len(tensors) - 1}
+        return state
+    if isinstance(state, dict):
+        return type(state)((key, _split_state(value, min_rows, tensors)) for key, value in state.items())
+    if isinstance(state, (list, tuple)):
+        return type(state)(_split_state(value, min_rows, tensors) for value in state)
+    return state
+
+
+def _join_state(state: Any, tensors: List[torch.Tensor]) -> Any:
+    if isinstance(state, dict):
+        if set(state) == {_SHARDED_TENSOR_KEY}:
+            return tensors[state[_SHARDED_TENSOR_KEY]]
+        return type(state)((key, _join_state(value, tensors)) for key, value in state.items())
+    if isinstance(state, (list, tuple)):
+        return type(state)(_join_state(value, tensors) for value in state)
+    return state
+
+
+def _shard_name(tensor_id: int, rank: int) -> str:
+    return f"t{tensor_id}.r{rank}.npy"
+
+
+def _done_name(rank: int) -> str:
+    return f"rank-{rank}.done"
+
+
+def _is_complete(path: str) -> bool:
+    names = set(fileio.list_dir(path))
+    if INDEX_NAME not in names:
+        return False
+    with fileio.open_buffered_file_reader(os.path.join(path, INDEX_NAME)) as f:
+        world_size = json.load(f)["world_size"]
+    return all(_done_name(rank) in names for rank in range(world_size))
+
+
+def write_sharded_checkpoint(
+    state: Any, path: str, rank: int = 0, world_size: int = 1, min_rows: int = DEFAULT_SHARD_MIN_ROWS
+) -> None:
+    """
+    Write the part of a sharded checkpoint that belongs to a rank. Every rank calls it with the
+    same state; the checkpoint is complete once all ranks are done.
+    :param state: Picklable state, usually a dict of state dicts.
+    :param path: Directory of the checkpoint.
+    :param rank: Rank of the calling process.
+    :param world_size: Number of ranks writing the checkpoint.
+    :param min_rows: Tensors with at least that many rows are sharded.
+    """
+    tensors: List[torch.Tensor] = []
+    dense = _split_state(state, min_rows, tensors)
+    fileio.create_dir(path)
+    for tensor_id, tensor in enumerate(tensors):
+        start, end = row_range(tensor.shape[0], rank, world_size)
+        # the synchronous path writes the live, possibly CUDA, tensors. The rows are made C-ordered,
+        # as np.save keeps the Fortran order of transposed tensors and _read_rows expects rows.
+        rows = np.ascontiguousarray(tensor[start:end].detach().cpu().numpy())
+        _write_atomic(os.path.join(path, _shard_name(tensor_id, rank)), lambda f: np.save(f, rows))
+    if rank == 0:
+        _write_atomic(os.path.join(path, DENSE_NAME), lambda f: torch.save(dense, f))
+        index = {
+            "world_size": world_size,
+            "tensors": [
+                {"shape": list(tensor.shape), "dtype": str(tensor.dtype).replace("torch.", "")}
+                for tensor in tensors
+            ],
+        }
+        _write_atomic(os.path.join(path, INDEX_NAME), lambda f: f.write(json.dumps(index).encode("utf-8")))
+    _write_atomic(os.path.join(path, _done_name(rank)), lambda f: None)
+
+
+def _read_rows(uri: str, start: int, end: int) -> np.ndarray:
+    """
+    Read rows ``[start, end)`` of a ".npy" file without reading the rest of it.
+    """
+    with fileio.open_input_file(uri) as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        if fortran_order:
+            raise ValueError(f"Cannot read rows of {uri}, it is stored in Fortran order")
+        row_size = int(np.prod(shape[1:], dtype=np.int64)) * dtype.itemsize
+        f.seek(f.tell() + start * row_size)
+        data = f.read((end - start) * row_size)
+    return np.frombuffer(data, dtype=dtype).reshape((end - start, *shape[1:]))
+
+
+def read_sharded_tensor(path: str, tensor_id: int, start: int = 0, end: Optional[int] = None) -> torch.Tensor:
+    """
+    Read rows ``[start, end)`` of a tensor of a sharded checkpoint, touching only the shards
+    that hold them.
+    :param path: Directory of the checkpoint.
+    :param tensor_id: Position of the tensor in the index.
+    """
+    with fileio.open_buffered_file_reader(os.path.join(path, INDEX_NAME)) as f:
+        index = json.load(f)
+    shape = index["tensors"][tensor_id]["shape"]
+    end = shape[0] if end is None else end
+    result = torch.empty(
+        (end - start, *shape[1:]), dtype=getattr(torch, index["tensors"][tensor_id]["dtype"])
+    )
+    for shard_rank in range(index["world_size"]):
+        shard_start, shard_end = row_range(shape[0], shard_rank, index["world_size"])
+        lo, hi = max(start, shard_start), min(end, shard_end)
+        if lo >= hi:
+            continue
+        rows = _read_rows(
+            os.path.join(path, _shard_name(tensor_id, shard_rank)), lo - shard_start, hi - shard_start
+        )
+        result[lo - start : hi - start] = torch.from_numpy(rows.copy())
+    return result
+
+
+class CheckpointWriter:
+    """
+    Writes checkpoints into a directory and keeps the last ``keep_checkpoints`` of them. With
+    ``asynchronous``, ``save`` returns as soon as the state has been copied to CPU memory, and at
+    most one checkpoint is written at a time.
+    """
+
+    def __init__(
+        self,
+        checkpoint_dir: str,
+        keep_checkpoints: int = 1,
+        asynchronous: bool = False,
+        sharded: bool = False,
+        rank: int = 0,
+        world_size: int = 1,
+        shard_min_rows: int = DEFAULT_SHARD_MIN_ROWS,
+        incremental: bool = False,
+        full_checkpoint_interval: int = DEFAULT_FULL_CHECKPOINT_INTERVAL,
+    ) -> None:
+        """
+        :param checkpoint_dir: Local path or URI supported by :py:mod:`submarine.utils.fileio`.
+        :param keep_checkpoints: Number of checkpoints to keep, older ones are deleted.
+        :param asynchronous: Write checkpoints from a background thread.
+        :param sharded: Write sharded checkpoints, each rank writing its share of the rows.
+        :param rank: Rank of this process. Unless ``sharded``, only rank 0 writes checkpoints.
+        :param world_size: Number of ranks, for sharded checkpoints.
+        :param shard_min_rows: Tensors with at least that many rows are sharded, or diffed by
+                               incremental checkpoints.
+        :param incremental: Write only the rows that changed since the previous checkpoint. Like
+                            full checkpoints, they are written by rank 0 alone, which is the only
+                            rank keeping a copy of the last written tensors.
+        :param full_checkpoint_interval: With ``incremental``, every that many checkpoints one is
+                                         a full checkpoint.
+        """
+        if incremental and sharded:
+            raise ValueError("Incremental checkpoints cannot be sharded")
+        self.checkpoint_dir = checkpoint_dir
+        self.keep_checkpoints = keep_checkpoints
+        self.asynchronous = asynchronous
+        self.sharded = sharded
+        self.rank = rank
+        self.world_size = world_size
+        self.shard_min_rows = shard_min_rows
+        self.incremental = incremental
+        self.full_checkpoint_interval = full_checkpoint_interval
+        # CPU copies of the large tensors as of the last checkpoint, for incremental checkpoints
+        self._base: Optional[List[torch.Tensor]] = None
+        self._last_name: Optional[str] = None
+        self._deltas_since_full = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Optional[Future] = None
+
+    def save(self, state: Any, step: int) -> None:
+        """
+        Write a checkpoint. Waits for the previous asynchronous checkpoint to be written first.
+        :param state: Picklable state, usually a dict of state dicts.
+        :param step: Number of the checkpoint, e.g. the epoch.
+        """
+        self.wait()
+        if not self.sharded and self.rank != 0:
+            return
+        if not self.asynchronous:
+            self._write(state, step)
+            return
+        state = snapshot(state)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SubmarineCheckpointWriter")
+        self._pending = self._executor.submit(self._write, state, step)
+
+    def wait(self) -> None:
+        """
+        Block until the pending asynchronous checkpoint is written, and raise its error if any.
+        """
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            pending.result()
+
+    def close(self) -> None:
+        """
+        Wait for the pending asynchronous checkpoint and stop the background thread. The error of
+        the pending checkpoint, if any, is raised once the thread is stopped.
+        """
+        try:
+            self.wait()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _write(self, state: Any, step: int) -> None:
+        uri = os.path.join(self.checkpoint_dir, checkpoint_name(step, self.sharded))
+        fileio.create_dir(self.checkpoint_dir)
+        if self.sharded:
+            write_sharded_checkpoint(state, uri, self.rank, self.world_size, self.shard_min_rows)
+        elif self.incremental:
+            uri = self._write_incremental(state, step)
+        else:
+            _write_atomic(uri, lambda f: torch.save(state, f))
+        logger.info("Saved checkpoint %s", uri)
+        if self.rank == 0:
+            self._remove_old_checkpoints()
+
+    def _write_incremental(self, state: Any, step: int) -> str:
+        tensors: List[torch.Tensor] = []
+        dense = _split_state(state, self.shard_min_rows, tensors)
+        full = (
+            self._base is None
+            or self._deltas_since_full + 1 >= self.full_checkpoint_interval
+            or [(t.shape, t.dtype) for t in tensors] != [(b.shape, b.dtype) for b in self._base]
+        )
+        if full:
+            name = checkpoint_name(step)
+            _write_atomic(os.path.join(self.checkpoint_dir, name), lambda f: torch.save(state, f))
+            self._base = snapshot(tensors)
+            self._deltas_since_full = 0
+        else:
+            rows = []
+            for tensor, base in zip(tensors, self._base):
+                tensor = tensor.detach().to("cpu")
+                changed = torch.nonzero((tensor != base).reshape(tensor.shape[0], -1).any(dim=1)).flatten()
+                rows.append((changed, tensor[changed]))
+            delta = {"parent": self._last_name, "min_rows": self.shard_min_rows, "dense": dense, "rows": rows}
+            name = checkpoint_name(step, delta=True)
+            _write_atomic(os.path.join(self.checkpoint_dir, name), lambda f: torch.save(delta, f))
+            # only moved forward once the delta is written, so that a failed write is not lost
+            for base, (changed, values) in zip(self._base, rows):
+                base[changed] = values
+            self._deltas_since_full += 1
+        self._last_name = name
+        return os.path.join(self.checkpoint_dir, name)
+
+    def _remove_old_checkpoints(self) -> None:
+        # a sharded checkpoint only counts once all ranks have written it
+        checkpoints = list_checkpoints(self.checkpoint_dir)
+        first_kept = max(len(checkpoints) - self.keep_checkpoints, 0)
+        # a delta is replayed on top of every checkpoint back to the last full one
+        while first_kept > 0 and checkpoints[first_kept].endswith(DELTA_SUFFIX):
+            first_kept -= 1
+        for name in checkpoints[:first_kept]:
+            if name.endswith(".pkl"):
+                fileio.delete_file(os.path.join(self.checkpoint_dir, name))
+            else:
+                fileio.delete_dir(os.path.join(self.checkpoint_dir, name))
+
+
+def load_checkpoint(checkpoint_dir: str, name: Optional[str] = None) -> Optional[Tuple[int, Any]]:
+    """
+    Load a checkpoint written by :py:class:`CheckpointWriter`.
+    :param checkpoint_dir: Directory of the checkpoints.
+    :param name: Name of the checkpoint to load. Defaults to the latest complete checkpoint.
+    :return: The step and state of the checkpoint, or None if there is none.
+    """
+    if name is None:
+        checkpoints = list_checkpoints(checkpoint_dir)
+        if not checkpoints:
+            return None
+        name = checkpoints[-1]
+    step = int(CHECKPOINT_PATTERN.match(name).group(1))
+    path = os.path.join(checkpoint_dir, name)
+    if name.endswith(DELTA_SUFFIX):
+        return step, _load_incremental(checkpoint_dir, name)
+    if name.endswith(".pkl"):
+        return step, _load_file(path)
+    dense = _load_file(os.path.join(path, DENSE_NAME))
+    with fileio.open_buffered_file_reader(os.path.join(path, INDEX_NAME)) as f:
+        num_tensors = len(json.load(f)["tensors"])
+    tensors = [read_sharded_tensor(path, tensor_id) for tensor_id in range(num_tensors)]
+    return step, _join_state(dense, tensors)
+
+
+def _load_incremental(checkpoint_dir: str, name: str) -> Any:
+    """
+    Load the full checkpoint a delta is based on, and replay the deltas on top of it.
+    """
+    deltas = []
+    while name.endswith(DELTA_SUFFIX):
+        deltas.append(_load_file(os.path.join(checkpoint_dir, name)))
+        name = deltas[-1]["parent"]
+    state = _load_file(os.path.join(checkpoint_dir, name))
+    for delta in reversed(deltas):
+        tensors: List[torch.Tensor] = []
+        _split_state(state, delta["min_rows"], tensors)
+        if len(tensors) != len(delta["rows"]):
+            raise ValueError(f"Checkpoint {name} does not match the deltas based on it")
+        for tensor, (changed, values) in zip(tensors, delta["rows"]):
+            tensor[changed] = values
+        state = _join_state(delta["dense"], tensors)
+    return state
@@ -13,24 +13,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import io
 import logging
 import os
 from abc import ABC
 from pathlib import Path
+from typing import Optional
 
 import torch
 from torch import distributed
 from torch.nn.parallel import DistributedDataParallel
 
 from submarine.ml.abstract_model import AbstractModel
+from submarine.ml.pytorch import checkpoint
 from submarine.ml.pytorch.loss import get_loss_fn
 from submarine.ml.pytorch.metric import get_metric_fn
 from submarine.ml.pytorch.optimizer import get_optimizer
 from submarine.ml.pytorch.parameters import default_parameters
 from submarine.ml.pytorch.registries import input_fn_registry
+from submarine.tracking.utils import get_run_context
 from submarine.utils.env import get_from_dicts, get_from_json, get_from_registry
-from submarine.utils.fileio import write_file
 from submarine.utils.pytorch_utils import get_device
 
 logger = logging.getLogger(__name__)
@@ -48,6 +49,7 @@ class BasePyTorchModel(AbstractModel, ABC):
         )
         logging.info("Model parameters : %s", self.params)
         self.input_type = self.params["input"]["type"]
+        self.run_context = get_run_context()
 
         self.init_process_group()
         self.model = DistributedDataParallel(self.model_fn(self.params).to(get_device(self.params)))
@@ -56,16 +58,33 @@ class BasePyTorchModel(AbstractModel, ABC):
         )
         self.loss = get_loss_fn(key=self.params["loss"]["name"])(**self.params["loss"]["kwargs"])
         self.metric = get_metric_fn(key=self.params["output"]["metric"])
+        self.checkpoint_writer = checkpoint.CheckpointWriter(
+            self.params["output"]["save_model_dir"],
+            keep_checkpoints=self.params["output"]["keep_checkpoints"],
+            asynchronous=self.params["output"]["async_checkpoint"],
+            sharded=self.params["output"]["sharded_checkpoint"],
+            rank=self.run_context.rank,
+            world_size=self.run_context.world_size,
+            shard_min_rows=self.params["output"]["shard_min_rows"],
+            incremental=self.params["output"]["incremental_checkpoint"],
+            full_checkpoint_interval=self.params["output"]["full_checkpoint_interval"],
+        )
 
     def init_process_group(self):
         distributed.init_process_group(
             backend=os.environ.get("backend", distributed.Backend.GLOO),
             init_method=os.environ.get("INIT_METHOD", "tcp://127.0.0.1:23456"),
-            world_size=int(os.environ.get("WORLD", 1)),
-            rank=int(os.environ.get("RANK", 0)),
+            world_size=self.run_context.world_size,
+            rank=self.run_context.rank,
         )
 
     def __del__(self):
+        if hasattr(self, "checkpoint_writer"):
+            # an exception raised here would only be printed by the interpreter
+            try:
+                self.checkpoint_writer.close()
+            except Exception:
+                logger.exception("Failed to write the last checkpoint")
         distributed.destroy_process_group()
 
     def train(self, train_loader):
@@ -124,23 +143,56 @@ class BasePyTorchModel(AbstractModel, ABC):
             filepath=self.params["input"]["train_data"], **self.params["training"]
         )()
 
-        for epoch in range(self.params["training"]["num_epochs"]):
+        start_epoch = 0
+        if self.params["output"]["resume_checkpoint"]:
+            step = self.load_checkpoint()
+            if step is not None:
+                start_epoch = step + 1
+
+        for epoch in range(start_epoch, self.params["training"]["num_epochs"]):
             train_loader.sampler.set_epoch(epoch)
             self.train(train_loader)
-            eval_score = self.evaluate()
+            # every rank scores its own part of the validation data, the score of rank 0 decides
+            # for all ranks so that they save the same epochs, as sharded checkpoints need them all
+            eval_score = self._broadcast_from_rank_0(self.evaluate())
 
             if eval_score > best_eval_score:
                 best_eval_score = eval_score
-                self.save_checkpoint()
+                self.save_checkpoint(epoch)
+        self.checkpoint_writer.wait()
         return best_eval_score
 
-    def save_checkpoint(self):
-        with io.BytesIO() as buffer:
-            torch.save(
-                {"model": self.model.module.state_dict(), "optimizer": self.optimizer.state_dict()},
-                buffer,
-            )
-            write_file(buffer, uri=os.path.join(self.params["output"]["save_model_dir"], "ckpt.pkl"))
+    def _broadcast_from_rank_0(self, value: float) -> float:
+        tensor = torch.tensor([value], dtype=torch.float64, device=get_device(self.params))
+        distributed.broadcast(tensor, src=0)
+        return tensor.item()
+
+    def save_checkpoint(self, step: int = 0):
+        """
+        Save the model and optimizer state in ``save_model_dir``. With the ``async_checkpoint``
+        output parameter, the checkpoint is written from a background thread, with
+        ``sharded_checkpoint`` every rank writes its share of the embedding tables, and with
+        ``incremental_checkpoint`` only the embedding rows changed since the previous checkpoint
+        are written.
+        """
+        self.checkpoint_writer.save(
+            {"model": self.model.module.state_dict(), "optimizer": self.optimizer.state_dict()}, step
+        )
+
+    def load_checkpoint(self, name: Optional[str] = None) -> Optional[int]:
+        """
+        Restore the model and optimizer state from a checkpoint in ``save_model_dir``.
+        :param name: Name of the checkpoint, e.g. "ckpt-00000003". Defaults to the latest one.
+        :return: The step of the restored checkpoint, or None if there is no checkpoint.
+        """
+        self.checkpoint_writer.wait()
+        loaded = checkpoint.load_checkpoint(self.params["output"]["save_model_dir"], name)
+        if loaded is None:
+            return None
+        step, state = loaded
+        self.model.module.load_state_dict(state["model"])
+        self.optimizer.load_state_dict(state["optimizer"])
+        return step
 
     def model_fn(self, params):
         seed = params["training"]["seed"]
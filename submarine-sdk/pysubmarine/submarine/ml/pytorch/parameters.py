@@ -14,7 +14,23 @@
 # limitations under the License.
 
 default_parameters = {
-    "output": {"save_model_dir": "./output", "metric": "roc_auc"},
+    "output": {
+        "save_model_dir": "./output",
+        "metric": "roc_auc",
+        # write checkpoints from a background thread
+        "async_checkpoint": False,
+        # number of checkpoints kept in save_model_dir
+        "keep_checkpoints": 1,
+        # split large tensors (embedding tables) by rows between the ranks, see ml.pytorch.checkpoint
+        "sharded_checkpoint": False,
+        "shard_min_rows": 65536,
+        # write only the embedding rows that changed since the previous checkpoint, with a full
+        # checkpoint every full_checkpoint_interval checkpoints
+        "incremental_checkpoint": False,
+        "full_checkpoint_interval": 10,
+        # restore the latest checkpoint in save_model_dir before training
+        "resume_checkpoint": False,
+    },
     "training": {
         "batch_size": 64,
         "num_epochs": 1,
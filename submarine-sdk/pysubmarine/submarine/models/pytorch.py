@@ -22,3 +22,7 @@ def save_model(model, artifact_path: str, input_dim: list) -> None:
     example_forward_example = torch.rand(input_dim)
     scripted_model = torch.jit.trace(model, example_forward_example)
     scripted_model.save(os.path.join(artifact_path, "model.pt"))
+
+
+def load_model(artifact_path: str):
+    return torch.jit.load(os.path.join(artifact_path, "model.pt"))
@@ -16,3 +16,9 @@
 
 def save_model(model, artifact_path: str):
     model.save(artifact_path)
+
+
+def load_model(artifact_path: str):
+    import tensorflow as tf
+
+    return tf.keras.models.load_model(artifact_path)
@@ -0,0 +1,184 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Creation of the SQLAlchemy engines used by the Submarine stores.
+
+The stores share one engine, and so one connection pool, per database URI and
+:py:class:`EngineConfig`, see :py:func:`get_sqlalchemy_engine`. The pool is configured with an
+:py:class:`EngineConfig`, which defaults to the following environment variables:
+
+* ``SUBMARINE_DB_POOL_SIZE``: connections kept open, 5 by default.
+* ``SUBMARINE_DB_MAX_OVERFLOW``: connections opened beyond the pool size under load, 10 by default.
+* ``SUBMARINE_DB_POOL_RECYCLE``: seconds after which a connection is replaced, never by default.
+  Set it below the server's ``wait_timeout`` to turn pre-ping off safely.
+* ``SUBMARINE_DB_POOL_PRE_PING``: ``false`` to stop testing connections with a round trip
+  before each checkout.
+* ``SUBMARINE_DB_NULL_POOL``: ``true`` to open a connection per checkout and close it after use,
+  which suits short-lived jobs and large distributed jobs that would exhaust the connections of
+  the database server.
+
+The pools are replaced in a forked child process, which must not share sockets with its parent.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import sqlalchemy
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from submarine.store.database.db_types import SQLITE
+from submarine.utils import env, extract_db_type_from_uri
+
+_POOL_SIZE_ENV_VAR = "SUBMARINE_DB_POOL_SIZE"
+_MAX_OVERFLOW_ENV_VAR = "SUBMARINE_DB_MAX_OVERFLOW"
+_POOL_RECYCLE_ENV_VAR = "SUBMARINE_DB_POOL_RECYCLE"
+_POOL_PRE_PING_ENV_VAR = "SUBMARINE_DB_POOL_PRE_PING"
+_NULL_POOL_ENV_VAR = "SUBMARINE_DB_NULL_POOL"
+
+# Pragmas set on every SQLite connection. WAL lets readers and a writer work concurrently and,
+# with synchronous=NORMAL, a commit no longer waits for an fsync of the database file.
+_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    # negative values are in KiB: 64 MiB of page cache
+    "cache_size": "-65536",
+    # wait for the lock instead of failing when several local processes write at once
+    "busy_timeout": "10000",
+}
+
+
+def _get_int_env(variable_name: str) -> Optional[int]:
+    value = env.get_env(variable_name)
+    return int(value) if value else None
+
+
+def _get_bool_env(variable_name: str, default: bool) -> bool:
+    value = env.get_env(variable_name)
+    return value.lower() in ("true", "1") if value else default
+
+
+@dataclass(frozen=True)
+class EngineConfig:
+    """
+    Connection pool settings of an engine. The settings left to None keep the SQLAlchemy
+    defaults. SQLite databases ignore ``pool_size`` and ``max_overflow``.
+    """
+
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    pool_recycle: Optional[int] = None
+    pool_pre_ping: bool = True
+    # open a connection per checkout instead of pooling them
+    null_pool: bool = False
+
+    @classmethod
+    def from_env(cls) -> "EngineConfig":
+        """
+        :return: The configuration set with the ``SUBMARINE_DB_*`` environment variables.
+        """
+        return cls(
+            pool_size=_get_int_env(_POOL_SIZE_ENV_VAR),
+            max_overflow=_get_int_env(_MAX_OVERFLOW_ENV_VAR),
+            pool_recycle=_get_int_env(_POOL_RECYCLE_ENV_VAR),
+            pool_pre_ping=_get_bool_env(_POOL_PRE_PING_ENV_VAR, True),
+            null_pool=_get_bool_env(_NULL_POOL_ENV_VAR, False),
+        )
+
+    def get_engine_kwargs(self, db_uri: str) -> Dict[str, Any]:
+        """
+        :return: The keyword arguments of :py:func:`sqlalchemy.create_engine`.
+        """
+        kwargs: Dict[str, Any] = {"pool_pre_ping": self.pool_pre_ping}
+        if self.null_pool:
+            kwargs["poolclass"] = NullPool
+        elif extract_db_type_from_uri(db_uri) != SQLITE:
+            if self.pool_size is not None:
+                kwargs["pool_size"] = self.pool_size
+            if self.max_overflow is not None:
+                kwargs["max_overflow"] = self.max_overflow
+        if self.pool_recycle is not None:
+            kwargs["pool_recycle"] = self.pool_recycle
+        return kwargs
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in _SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def create_sqlalchemy_engine(db_uri: str, config: Optional[EngineConfig] = None) -> Engine:
+    """
+    Create an engine for the database URI. SQLite connections are tuned for local tracking.
+    :param db_uri: The SQLAlchemy database URI string to connect to the database.
+    :param config: The connection pool settings, defaults to :py:meth:`EngineConfig.from_env`.
+    """
+    config = config or EngineConfig.from_env()
+    engine = sqlalchemy.create_engine(db_uri, **config.get_engine_kwargs(db_uri))
+    if extract_db_type_from_uri(db_uri) == SQLITE:
+        sqlalchemy.event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+# Engines shared by the stores, keyed by (db_uri, config).
+_engines: Dict[Tuple[str, EngineConfig], Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_sqlalchemy_engine(db_uri: str, config: Optional[EngineConfig] = None) -> Engine:
+    """
+    Get the engine shared by the stores of the database URI and configuration, creating it on
+    first use.
+    :param db_uri: The SQLAlchemy database URI string to connect to the database.
+    :param config: The connection pool settings, defaults to :py:meth:`EngineConfig.from_env`.
+    """
+    key = (db_uri, config or EngineConfig.from_env())
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = create_sqlalchemy_engine(*key)
+        return engine
+
+
+def dispose_engines() -> None:
+    """
+    Close the connections of every shared engine and drop them, the next stores create new ones.
+    """
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def _reset_engines_after_fork() -> None:
+    """
+    Give every shared engine a new pool in a forked child process. The connections inherited
+    from the parent are left open for the parent to use.
+    """
+    global _engines_lock
+    _engines_lock = threading.Lock()
+    for engine in _engines.values():
+        engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_engines_after_fork)
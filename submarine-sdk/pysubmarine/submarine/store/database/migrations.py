@@ -0,0 +1,128 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Versioned migrations of the database schema used by the Submarine stores.
+
+``Base.metadata.create_all`` only creates missing tables, so changes to existing tables, such as
+new indexes, are applied here. Every migration has a version number and must be idempotent:
+it is also run against databases whose tables were just created with the latest schema, and
+against databases whose tables were created by the Submarine server. The highest applied version
+is stored in the ``schema_version`` table.
+"""
+
+import logging
+from typing import Callable, List, Tuple
+
+import sqlalchemy
+from sqlalchemy.engine import Engine
+
+from submarine.store.database.models import (
+    SqlArtifactFolderCounter,
+    SqlMetric,
+    SqlModelVersionTag,
+    SqlRegisteredModelTag,
+    SqlSchemaVersion,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+def _create_index_if_missing(engine: Engine, index: sqlalchemy.Index) -> None:
+    def index_exists():
+        insp = sqlalchemy.inspect(engine)
+        return index.name in {i["name"] for i in insp.get_indexes(index.table.name)}
+
+    if index_exists():
+        return
+    try:
+        index.create(engine)
+    except sqlalchemy.exc.DBAPIError:
+        # another process may have created the index concurrently
+        if not index_exists():
+            raise
+
+
+def _add_metric_step_index(engine: Engine) -> None:
+    (index,) = [i for i in SqlMetric.__table__.indexes if i.name == "metric_id_key_worker_index_step_idx"]
+    _create_index_if_missing(engine, index)
+
+
+def _add_tag_indexes(engine: Engine) -> None:
+    for table in (SqlRegisteredModelTag.__table__, SqlModelVersionTag.__table__):
+        # a missing table gets its indexes when it is created
+        if not sqlalchemy.inspect(engine).has_table(table.name):
+            continue
+        for index in table.indexes:
+            _create_index_if_missing(engine, index)
+
+
+def _create_table_if_missing(engine: Engine, table: sqlalchemy.Table) -> None:
+    try:
+        table.create(engine, checkfirst=True)
+    except sqlalchemy.exc.DBAPIError:
+        # another process may have created the table concurrently
+        if not sqlalchemy.inspect(engine).has_table(table.name):
+            raise
+
+
+def _add_artifact_folder_counter(engine: Engine) -> None:
+    _create_table_if_missing(engine, SqlArtifactFolderCounter.__table__)
+
+
+# (version, description, migration) in ascending version order
+MIGRATIONS: List[Tuple[int, str, Callable[[Engine], None]]] = [
+    (1, "Add (id, key, worker_index, step) index to metric", _add_metric_step_index),
+    (2, "Add (tag, name) indexes to registered_model_tag and model_version_tag", _add_tag_indexes),
+    (3, "Add artifact_folder_counter table", _add_artifact_folder_counter),
+]
+
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(engine: Engine) -> int:
+    """
+    :return: The highest migration version applied to the database, 0 if none was applied.
+    """
+    if not sqlalchemy.inspect(engine).has_table(SqlSchemaVersion.__tablename__):
+        return 0
+    with engine.connect() as connection:
+        version = connection.execute(
+            sqlalchemy.select(sqlalchemy.func.max(SqlSchemaVersion.version))
+        ).scalar()
+    return version or 0
+
+
+def upgrade(engine: Engine) -> None:
+    """
+    Apply all the migrations that have not been applied to the database yet. Many MySQL DDL
+    statements commit implicitly, so every migration runs on its own and the schema version is
+    recorded once all of them succeeded.
+    """
+    current_version = get_schema_version(engine)
+    if current_version >= LATEST_SCHEMA_VERSION:
+        return
+    for version, description, migrate in MIGRATIONS:
+        if version > current_version:
+            _logger.info("Upgrading Submarine database schema to version %d: %s", version, description)
+            migrate(engine)
+    table = SqlSchemaVersion.__table__
+    _create_table_if_missing(engine, table)
+    try:
+        with engine.begin() as connection:
+            connection.execute(table.delete().where(table.c.version < LATEST_SCHEMA_VERSION))
+            connection.execute(table.insert().values(version=LATEST_SCHEMA_VERSION))
+    except sqlalchemy.exc.IntegrityError:
+        # another process recorded the same version concurrently
+        pass
@@ -23,6 +23,7 @@ from sqlalchemy import (
     Column,
     ForeignKey,
     ForeignKeyConstraint,
+    Index,
     Integer,
     PrimaryKeyConstraint,
     String,
@@ -139,7 +140,11 @@ class SqlRegisteredModelTag(Base):
     # linked entities
     registered_model: SqlRegisteredModel = relationship("SqlRegisteredModel", back_populates="tags")
 
-    __table_args__ = (PrimaryKeyConstraint("name", "tag", name="registered_model_tag_pk"),)
+    __table_args__ = (
+        PrimaryKeyConstraint("name", "tag", name="registered_model_tag_pk"),
+        # tag lookups, the primary key starts with the name
+        Index("registered_model_tag_tag_name_idx", "tag", "name"),
+    )
 
     def __repr__(self):
         return f"<SqlRegisteredModelTag ({self.name}, {self.tag})>"
@@ -306,6 +311,7 @@ class SqlModelVersionTag(Base):
 
     __table_args__ = (
         PrimaryKeyConstraint("name", "version", "tag", name="model_version_tag_pk"),
+        Index("model_version_tag_tag_name_version_idx", "tag", "name", "version"),
         ForeignKeyConstraint(
             ("name", "version"),
             ("model_version.name", "model_version.version"),
@@ -428,7 +434,10 @@ class SqlMetric(Base):
     True if the value is in fact NaN.
     """
 
-    __table_args__ = (PrimaryKeyConstraint("id", "key", "timestamp", "worker_index", name="metric_pk"),)
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "key", "timestamp", "worker_index", name="metric_pk"),
+        Index("metric_id_key_worker_index_step_idx", "id", "key", "worker_index", "step"),
+    )
 
     def __repr__(self):
         return f"<SqlMetric({self.key}, {self.value}, {self.worker_index}, {self.timestamp}, {self.step})>"
@@ -489,3 +498,50 @@ class SqlParam(Base):
         :return: :py:class:`submarine.entities.Param`.
         """
         return Param(key=self.key, value=self.value, worker_index=self.worker_index)
+
+
+# +--------------+-------------+
+# | path         | next_number |
+# +--------------+-------------+
+# | experiment/1 | 4           |
+# +--------------+-------------+
+
+
+class SqlArtifactFolderCounter(Base):
+    __tablename__ = "artifact_folder_counter"
+
+    path = Column(String(190))
+    """
+    Parent folder of numbered artifact folders: *Primary Key* for ``artifact_folder_counter`` table.
+    """
+    next_number = Column(Integer, nullable=False)
+    """
+    Number of the next folder to allocate: `Integer`.
+    """
+
+    __table_args__ = (PrimaryKeyConstraint("path", name="artifact_folder_counter_pk"),)
+
+    def __repr__(self):
+        return f"<SqlArtifactFolderCounter({self.path}, {self.next_number})>"
+
+
+# +---------+
+# | version |
+# +---------+
+# | 1       |
+# +---------+
+
+
+class SqlSchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, nullable=False)
+    """
+    Version of the database schema: *Primary Key* for ``schema_version`` table.
+    Refer to :py:mod:`submarine.store.database.migrations`.
+    """
+
+    __table_args__ = (PrimaryKeyConstraint("version", name="schema_version_pk"),)
+
+    def __repr__(self):
+        return f"<SqlSchemaVersion ({self.version})>"
@@ -14,8 +14,10 @@
 # limitations under the License.
 
 from abc import ABCMeta, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from submarine.entities import PagedList
 from submarine.entities.model_registry import ModelVersion, RegisteredModel
 
 
@@ -82,17 +84,53 @@ class AbstractStore:
 
     @abstractmethod
     def list_registered_model(
-        self, filter_str: Optional[str] = None, filter_tags: Optional[List[str]] = None
-    ) -> List[RegisteredModel]:
+        self,
+        filter_str: Optional[str] = None,
+        filter_tags: Optional[List[str]] = None,
+        max_results: Optional[int] = None,
+        order_by: str = "name",
+        page_token: Optional[str] = None,
+        filter_expression: Optional[str] = None,
+    ) -> PagedList[RegisteredModel]:
         """
         List of all models.
         :param filter_string: Filter query string, defaults to searching all registered models.
-        :param filter_tags: Filter tags, defaults not to filter any tags.
-        :return: A List of :py:class:`submarine.entities.model_registry.RegisteredModel` objects
+        :param filter_tags: Filter tags, the models must have all of them. Defaults not to filter
+                            any tags.
+        :param max_results: Maximum number of models in the page, defaults to all of them.
+        :param order_by: ``name``, ``creation_time`` or ``last_updated_time``, optionally
+                         followed by ``ASC`` or ``DESC``.
+        :param page_token: Token of the page to return, from the previous page.
+        :param filter_expression: Filter on the ``name``, ``tag``, ``creation_time`` and
+                                  ``last_updated_time`` fields, see
+                                  :py:mod:`submarine.store.model_registry.filter_expression`.
+        :return: A page of :py:class:`submarine.entities.model_registry.RegisteredModel` objects
                 that satisfy the search expressions.
         """
         pass
 
+    def iter_registered_models(
+        self,
+        filter_str: Optional[str] = None,
+        filter_tags: Optional[List[str]] = None,
+        order_by: str = "name",
+        page_size: int = 1000,
+        filter_expression: Optional[str] = None,
+    ) -> Iterator[RegisteredModel]:
+        """
+        Iterate over the models that satisfy the filters, fetching ``page_size`` of them at a time.
+        See :py:meth:`list_registered_model` for the parameters.
+        """
+        page_token = None
+        while True:
+            page = self.list_registered_model(
+                filter_str, filter_tags, page_size, order_by, page_token, filter_expression
+            )
+            yield from page
+            if page.token is None:
+                return
+            page_token = page.token
+
     @abstractmethod
     def get_registered_model(self, name: str) -> RegisteredModel:
         """
@@ -148,6 +186,22 @@ class AbstractStore:
         """
         pass
 
+    @abstractmethod
+    def bulk_create_model_versions(
+        self, name: str, model_versions: List[Dict[str, Any]]
+    ) -> List[ModelVersion]:
+        """
+        Create several versions of the registered model in a single transaction. They are
+        numbered consecutively, in order.
+        :param name: Registered model name.
+        :param model_versions: The arguments of :py:meth:`create_model_version` of each version:
+                               ``id``, ``user_id``, ``experiment_id``, ``model_type`` and
+                               optionally ``dataset``, ``description`` and ``tags``.
+        :return: The :py:class:`submarine.entities.model_registry.ModelVersion` objects created
+                 in the backend.
+        """
+        pass
+
     @abstractmethod
     def update_model_version_description(self, name: str, version: int, description: str) -> ModelVersion:
         """
@@ -179,6 +233,39 @@ class AbstractStore:
         """
         pass
 
+    @abstractmethod
+    def bulk_transition_stage(self, name: str, versions: List[int], stage: str) -> None:
+        """
+        Update the stage of several versions of the registered model in a single transaction.
+        :param name: Registered model name.
+        :param versions: Versions of the registered model, which must all exist.
+        :param stage: New desired stage for these versions of registered model.
+        :return: None.
+        """
+        pass
+
+    @abstractmethod
+    def bulk_add_tags(self, name: str, versions: List[int], tags: List[str]) -> None:
+        """
+        Add tags to several versions of the registered model in a single transaction. The tags
+        a version already has are left as they are.
+        :param name: Registered model name.
+        :param versions: Versions of the registered model, which must all exist.
+        :param tags: List of tag values.
+        :return: None.
+        """
+        pass
+
+    @abstractmethod
+    def bulk_delete_versions(self, name: str, versions: List[int]) -> None:
+        """
+        Delete several versions of the registered model in a single transaction.
+        :param name: Registered model name.
+        :param versions: Versions of the registered model, which must all exist.
+        :return: None.
+        """
+        pass
+
     @abstractmethod
     def get_model_version(self, name: str, version: int) -> ModelVersion:
         """
@@ -190,16 +277,54 @@ class AbstractStore:
         pass
 
     @abstractmethod
-    def list_model_versions(self, name: str, filter_tags: Optional[list] = None) -> List[ModelVersion]:
+    def list_model_versions(
+        self,
+        name: str,
+        filter_tags: Optional[list] = None,
+        max_results: Optional[int] = None,
+        order_by: str = "version",
+        page_token: Optional[str] = None,
+        filter_expression: Optional[str] = None,
+    ) -> PagedList[ModelVersion]:
         """
         List of all models that satisfy the filter criteria.
         :param name: Registered model name.
-        :param filter_tags: Filter tags, defaults not to filter any tags.
-        :return: A List of :py:class:`submarine.entities.model_registry.ModelVersion` objects
+        :param filter_tags: Filter tags, the versions must have all of them. Defaults not to
+                            filter any tags.
+        :param max_results: Maximum number of versions in the page, defaults to all of them.
+        :param order_by: ``version``, ``creation_time`` or ``last_updated_time``, optionally
+                         followed by ``ASC`` or ``DESC``.
+        :param page_token: Token of the page to return, from the previous page.
+        :param filter_expression: Filter on the ``tag``, ``stage``, ``model_type``,
+                                  ``creation_time`` and ``last_updated_time`` fields, see
+                                  :py:mod:`submarine.store.model_registry.filter_expression`.
+        :return: A page of :py:class:`submarine.entities.model_registry.ModelVersion` objects
                 that satisfy the search expressions.
         """
         pass
 
+    def iter_model_versions(
+        self,
+        name: str,
+        filter_tags: Optional[list] = None,
+        order_by: str = "version",
+        page_size: int = 1000,
+        filter_expression: Optional[str] = None,
+    ) -> Iterator[ModelVersion]:
+        """
+        Iterate over the versions that satisfy the filters, fetching ``page_size`` of them at a
+        time. See :py:meth:`list_model_versions` for the parameters.
+        """
+        page_token = None
+        while True:
+            page = self.list_model_versions(
+                name, filter_tags, page_size, order_by, page_token, filter_expression
+            )
+            yield from page
+            if page.token is None:
+                return
+            page_token = page.token
+
     @abstractmethod
     def get_model_version_uri(self, name: str, version: int) -> str:
         """
@@ -231,3 +356,21 @@ class AbstractStore:
         :return: None.
         """
         pass
+
+    def get_update_stamp(self) -> Optional[Tuple[Optional[datetime], int]]:
+        """
+        A cheap probe for changes made by other processes. Every change to a registered model,
+        its tags or its versions updates the ``last_updated_time`` of the registered model.
+        Stores that can be probed should override this together with ``get_last_updated_times``.
+        :return: The latest ``last_updated_time`` of the registered models and their number, or
+                 None if the store cannot be probed.
+        """
+        return None
+
+    def get_last_updated_times(self, names: List[str]) -> Optional[Dict[str, datetime]]:
+        """
+        :param names: Registered model names.
+        :return: The ``last_updated_time`` of the registered models that exist, or None if the
+                 store cannot be probed.
+        """
+        return None
@@ -0,0 +1,303 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Read-through cache in front of a model registry store, for serving and evaluation jobs that look
+up the same few models over and over.
+
+``get_registered_model``, ``get_model_version`` and ``get_model_version_uri`` are cached for at
+most ``ttl`` seconds, the least recently used entries being evicted beyond ``max_size``. Every
+mutating call made through the cache drops the entries of the registered model it changes.
+Changes made by other processes are detected by probing the store at most every
+``probe_interval`` seconds with :py:meth:`AbstractStore.get_update_stamp`, the latest
+``last_updated_time`` and the number of registered models. When the stamp moved, the cached
+models whose ``last_updated_time`` changed, or that were deleted, are dropped. As the stamps are
+written with the clock of the writing process, clock skew between processes may delay the
+detection of a change; ``ttl`` bounds how stale an entry can be in any case.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from submarine.entities import PagedList
+from submarine.entities.model_registry import ModelVersion, RegisteredModel
+from submarine.store.model_registry.abstract_store import AbstractStore
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 60.0
+DEFAULT_MAX_SIZE = 1024
+DEFAULT_PROBE_INTERVAL = 1.0
+
+
+class CachingStore(AbstractStore):
+    def __init__(
+        self,
+        store: AbstractStore,
+        ttl: float = DEFAULT_TTL,
+        max_size: int = DEFAULT_MAX_SIZE,
+        probe_interval: float = DEFAULT_PROBE_INTERVAL,
+    ) -> None:
+        """
+        :param store: The model registry store to cache.
+        :param ttl: Seconds an entry is served from the cache.
+        :param max_size: Maximum number of entries.
+        :param probe_interval: Minimum seconds between two probes for changes made by other
+                               processes.
+        """
+        super().__init__()
+        self.store = store
+        self.ttl = ttl
+        self.max_size = max_size
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        # (kind, name, ...) -> (expiry, value), least recently used first
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Tuple[float, Any]]" = OrderedDict()
+        # last_updated_time of the cached registered models, when known
+        self._model_stamps: Dict[str, datetime] = {}
+        self._update_stamp: Optional[Tuple[Optional[datetime], int]] = None
+        self._next_probe = 0.0
+        self._probe_supported = True
+
+    def _get(self, key: Tuple[Hashable, ...], load: Callable[[], Any]) -> Any:
+        self._probe()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+        value = load()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *names: str) -> None:
+        """
+        Drop the cached entries of registered models.
+        :param names: Registered model names.
+        """
+        with self._lock:
+            self._drop(names)
+
+    def _drop(self, names: Tuple[str, ...]) -> None:
+        for key in [key for key in self._entries if key[1] in names]:
+            del self._entries[key]
+        for name in names:
+            self._model_stamps.pop(name, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._model_stamps.clear()
+
+    def _probe(self) -> None:
+        now = time.monotonic()
+        if not self._probe_supported or now < self._next_probe:
+            return
+        self._next_probe = now + self.probe_interval
+        update_stamp = self.store.get_update_stamp()
+        if update_stamp is None:
+            _logger.info("%s cannot be probed for changes, relying on the cache TTL", type(self.store))
+            self._probe_supported = False
+            return
+        if update_stamp == self._update_stamp:
+            return
+        with self._lock:
+            names = list({key[1] for key in self._entries})
+            # forget the stamps of the models evicted from the cache
+            self._model_stamps = {
+                name: self._model_stamps[name] for name in names if name in self._model_stamps
+            }
+            model_stamps = dict(self._model_stamps)
+        # a store that cannot tell the stamps of the models has them all dropped
+        current = (self.store.get_last_updated_times(names) if names else None) or {}
+        # models whose entries were cached before their stamp was known are dropped as well
+        self.invalidate(
+            *[name for name in names if name not in current or model_stamps.get(name) != current[name]]
+        )
+        self._update_stamp = update_stamp
+
+    def create_registered_model(
+        self, name: str, description: Optional[str] = None, tags: Optional[List[str]] = None
+    ) -> RegisteredModel:
+        try:
+            return self.store.create_registered_model(name, description, tags)
+        finally:
+            self.invalidate(name)
+
+    def update_registered_model_description(self, name: str, description: str) -> RegisteredModel:
+        try:
+            return self.store.update_registered_model_description(name, description)
+        finally:
+            self.invalidate(name)
+
+    def rename_registered_model(self, name: str, new_name: str) -> RegisteredModel:
+        try:
+            return self.store.rename_registered_model(name, new_name)
+        finally:
+            self.invalidate(name, new_name)
+
+    def delete_registered_model(self, name: str) -> None:
+        try:
+            self.store.delete_registered_model(name)
+        finally:
+            self.invalidate(name)
+
+    def list_registered_model(
+        self,
+        filter_str: Optional[str] = None,
+        filter_tags: Optional[List[str]] = None,
+        max_results: Optional[int] = None,
+        order_by: str = "name",
+        page_token: Optional[str] = None,
+        filter_expression: Optional[str] = None,
+    ) -> PagedList[RegisteredModel]:
+        return self.store.list_registered_model(
+            filter_str, filter_tags, max_results, order_by, page_token, filter_expression
+        )
+
+    def get_registered_model(self, name: str) -> RegisteredModel:
+        def load() -> RegisteredModel:
+            registered_model = self.store.get_registered_model(name)
+            with self._lock:
+                if self._model_stamps.get(name) != registered_model.last_updated_time:
+                    # the entries cached with another stamp, or none, may be older than this one
+                    self._drop((name,))
+                self._model_stamps[name] = registered_model.last_updated_time
+            return registered_model
+
+        return self._get(("registered_model", name), load)
+
+    def add_registered_model_tag(self, name: str, tag: str) -> None:
+        try:
+            self.store.add_registered_model_tag(name, tag)
+        finally:
+            self.invalidate(name)
+
+    def delete_registered_model_tag(self, name: str, tag: str) -> None:
+        try:
+            self.store.delete_registered_model_tag(name, tag)
+        finally:
+            self.invalidate(name)
+
+    def create_model_version(
+        self,
+        name: str,
+        id: str,
+        user_id: str,
+        experiment_id: str,
+        model_type: str,
+        dataset: Optional[str] = None,
+        description: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> ModelVersion:
+        try:
+            return self.store.create_model_version(
+                name, id, user_id, experiment_id, model_type, dataset, description, tags
+            )
+        finally:
+            self.invalidate(name)
+
+    def bulk_create_model_versions(
+        self, name: str, model_versions: List[Dict[str, Any]]
+    ) -> List[ModelVersion]:
+        try:
+            return self.store.bulk_create_model_versions(name, model_versions)
+        finally:
+            self.invalidate(name)
+
+    def update_model_version_description(self, name: str, version: int, description: str) -> ModelVersion:
+        try:
+            return self.store.update_model_version_description(name, version, description)
+        finally:
+            self.invalidate(name)
+
+    def transition_model_version_stage(self, name: str, version: int, stage: str) -> ModelVersion:
+        try:
+            return self.store.transition_model_version_stage(name, version, stage)
+        finally:
+            self.invalidate(name)
+
+    def delete_model_version(self, name: str, version: int) -> None:
+        try:
+            self.store.delete_model_version(name, version)
+        finally:
+            self.invalidate(name)
+
+    def bulk_transition_stage(self, name: str, versions: List[int], stage: str) -> None:
+        try:
+            self.store.bulk_transition_stage(name, versions, stage)
+        finally:
+            self.invalidate(name)
+
+    def bulk_add_tags(self, name: str, versions: List[int], tags: List[str]) -> None:
+        try:
+            self.store.bulk_add_tags(name, versions, tags)
+        finally:
+            self.invalidate(name)
+
+    def bulk_delete_versions(self, name: str, versions: List[int]) -> None:
+        try:
+            self.store.bulk_delete_versions(name, versions)
+        finally:
+            self.invalidate(name)
+
+    def get_model_version(self, name: str, version: int) -> ModelVersion:
+        return self._get(
+            ("model_version", name, version), lambda: self.store.get_model_version(name, version)
+        )
+
+    def list_model_versions(
+        self,
+        name: str,
+        filter_tags: Optional[list] = None,
+        max_results: Optional[int] = None,
+        order_by: str = "version",
+        page_token: Optional[str] = None,
+        filter_expression: Optional[str] = None,
+    ) -> PagedList[ModelVersion]:
+        return self.store.list_model_versions(
+            name, filter_tags, max_results, order_by, page_token, filter_expression
+        )
+
+    def get_model_version_uri(self, name: str, version: int) -> str:
+        return self._get(
+            ("model_version_uri", name, version), lambda: self.store.get_model_version_uri(name, version)
+        )
+
+    def add_model_version_tag(self, name: str, version: int, tag: str) -> None:
+        try:
+            self.store.add_model_version_tag(name, version, tag)
+        finally:
+            self.invalidate(name)
+
+    def delete_model_version_tag(self, name: str, version: int, tag: str) -> None:
+        try:
+            self.store.delete_model_version_tag(name, version, tag)
+        finally:
+            self.invalidate(name)
+
+    def get_update_stamp(self) -> Optional[Tuple[Optional[datetime], int]]:
+        return self.store.get_update_stamp()
+
+    def get_last_updated_times(self, names: List[str]) -> Optional[Dict[str, datetime]]:
+        return self.store.get_last_updated_times(names)
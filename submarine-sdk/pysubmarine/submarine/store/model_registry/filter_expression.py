@@ -0,0 +1,165 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Filter expressions of the model registry list methods, e.g.::
+
+    tag = 'image' AND (stage = 'Production' OR tag LIKE 'team-%')
+    AND creation_time >= '2021-11-01T00:00:00'
+
+An expression combines comparisons ``<field> <operator> '<value>'`` with ``AND``, ``OR`` and
+parentheses; ``AND`` binds tighter than ``OR``. Values are quoted with single or double quotes,
+a quote is escaped by doubling it. ``LIKE`` only supports prefix patterns, ``'<prefix>%'``, in
+which every other character matches literally. The fields and the operators they support
+are defined by the store compiling the expression.
+"""
+
+import re
+from typing import Callable, Dict, List, Tuple
+
+import sqlalchemy
+
+from submarine.exceptions import SubmarineException
+
+_TOKEN_PATTERN = re.compile(
+    r"""\s*(?:
+        (?P<paren>[()])
+        |(?P<operator><=|>=|!=|=|<|>)
+        |'(?P<single>(?:[^']|'')*)'
+        |"(?P<double>(?:[^"]|"")*)"
+        |(?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    )""",
+    re.VERBOSE,
+)
+
+# Builds the SQL condition of a comparison from its operator and value.
+FieldCompiler = Callable[[str, str], sqlalchemy.sql.ClauseElement]
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN_PATTERN.match(expression, position)
+        if match is None:
+            raise SubmarineException(
+                f"Invalid filter expression: {expression}. Unexpected character at position {position}."
+            )
+        position = match.end()
+        if match.group("paren"):
+            tokens.append(("paren", match.group("paren")))
+        elif match.group("operator"):
+            tokens.append(("operator", match.group("operator")))
+        elif match.group("single") is not None:
+            tokens.append(("value", match.group("single").replace("''", "'")))
+        elif match.group("double") is not None:
+            tokens.append(("value", match.group("double").replace('""', '"')))
+        elif match.group("word").upper() in ("AND", "OR", "LIKE"):
+            kind = "operator" if match.group("word").upper() == "LIKE" else "keyword"
+            tokens.append((kind, match.group("word").upper()))
+        else:
+            tokens.append(("field", match.group("word")))
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser compiling the expression while parsing it::
+
+        expression := term (OR term)*
+        term       := factor (AND factor)*
+        factor     := '(' expression ')' | field operator value
+    """
+
+    def __init__(self, expression: str, fields: Dict[str, FieldCompiler]) -> None:
+        self.expression = expression
+        self.fields = fields
+        self.tokens = _tokenize(expression)
+        self.position = 0
+
+    def error(self, message: str) -> SubmarineException:
+        return SubmarineException(f"Invalid filter expression: {self.expression}. {message}")
+
+    def peek(self) -> Tuple[str, str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else ("end", "")
+
+    def take(self, kind: str) -> str:
+        token_kind, token = self.peek()
+        if token_kind != kind:
+            raise self.error(f"Expected a {kind}, got {token or 'the end of the expression'}.")
+        self.position += 1
+        return token
+
+    def parse(self) -> sqlalchemy.sql.ClauseElement:
+        if not self.tokens:
+            raise self.error("The expression is empty.")
+        condition = self.parse_expression()
+        if self.position != len(self.tokens):
+            raise self.error(f"Unexpected {self.peek()[1]}.")
+        return condition
+
+    def parse_expression(self) -> sqlalchemy.sql.ClauseElement:
+        terms = [self.parse_term()]
+        while self.peek() == ("keyword", "OR"):
+            self.position += 1
+            terms.append(self.parse_term())
+        return terms[0] if len(terms) == 1 else sqlalchemy.or_(*terms)
+
+    def parse_term(self) -> sqlalchemy.sql.ClauseElement:
+        factors = [self.parse_factor()]
+        while self.peek() == ("keyword", "AND"):
+            self.position += 1
+            factors.append(self.parse_factor())
+        return factors[0] if len(factors) == 1 else sqlalchemy.and_(*factors)
+
+    def parse_factor(self) -> sqlalchemy.sql.ClauseElement:
+        if self.peek() == ("paren", "("):
+            self.position += 1
+            condition = self.parse_expression()
+            if self.peek() != ("paren", ")"):
+                raise self.error(f"Expected ), got {self.peek()[1] or 'the end of the expression'}.")
+            self.position += 1
+            return condition
+        field = self.take("field")
+        if field not in self.fields:
+            raise self.error(f"Unknown field {field}, expected one of {', '.join(self.fields)}.")
+        operator = self.take("operator")
+        value = self.take("value")
+        return self.fields[field](operator, value)
+
+
+def compile_filter_expression(
+    expression: str, fields: Dict[str, FieldCompiler]
+) -> sqlalchemy.sql.ClauseElement:
+    """
+    Compile a filter expression into a SQL condition.
+    :param expression: The filter expression.
+    :param fields: The compilers of the conditions on each field. They raise a
+                   :py:class:`submarine.exceptions.SubmarineException` for unsupported operators
+                   or values.
+    :return: A SQLAlchemy condition.
+    """
+    return _Parser(expression, fields).parse()
+
+
+def get_like_prefix(value: str) -> str:
+    """
+    :return: The prefix of a ``LIKE`` pattern, which must be a prefix pattern.
+    """
+    if not value.endswith("%") or "%" in value[:-1]:
+        raise SubmarineException(
+            f"Invalid LIKE pattern: {value}. Only prefix patterns, 'abc%', are supported."
+        )
+    return value[:-1]
@@ -13,22 +13,29 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
+import json
 import logging
+import operator
 from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 import sqlalchemy
 from sqlalchemy.engine.base import Engine
+from sqlalchemy.orm import Query
 from sqlalchemy.orm.session import Session, sessionmaker
 from sqlalchemy.orm.strategy_options import _UnboundLoad
 
+from submarine.entities import PagedList
 from submarine.entities.model_registry import ModelVersion, RegisteredModel
 from submarine.entities.model_registry.model_stages import (
     STAGE_DELETED_INTERNAL,
     get_canonical_stage,
 )
 from submarine.exceptions import SubmarineException
+from submarine.store.database import migrations
+from submarine.store.database.engine import EngineConfig, get_sqlalchemy_engine
 from submarine.store.database.models import (
     Base,
     SqlModelVersion,
@@ -37,6 +44,11 @@ from submarine.store.database.models import (
     SqlRegisteredModelTag,
 )
 from submarine.store.model_registry.abstract_store import AbstractStore
+from submarine.store.model_registry.filter_expression import (
+    FieldCompiler,
+    compile_filter_expression,
+    get_like_prefix,
+)
 from submarine.utils import extract_db_type_from_uri
 from submarine.utils.validation import (
     validate_description,
@@ -48,21 +60,163 @@ from submarine.utils.validation import (
 
 _logger = logging.getLogger(__name__)
 
+# Attempts of create_model_version when a concurrent registration took the same version.
+_CREATE_MODEL_VERSION_ATTEMPTS = 5
+
+# Arguments of create_model_version accepted by bulk_create_model_versions.
+_MODEL_VERSION_REQUIRED_FIELDS = ("id", "user_id", "experiment_id", "model_type")
+_MODEL_VERSION_FIELDS = _MODEL_VERSION_REQUIRED_FIELDS + ("dataset", "description", "tags")
+
+# Maximum number of values bound to one IN clause by the bulk methods, below the SQLite limit.
+_BULK_CHUNK_SIZE = 500
+
+# Sort columns of the list methods. The primary key is appended to the sort keys, so that every
+# row has a distinct position to resume a page from.
+_REGISTERED_MODEL_ORDER_BY = {
+    "name": SqlRegisteredModel.name,
+    "creation_time": SqlRegisteredModel.creation_time,
+    "last_updated_time": SqlRegisteredModel.last_updated_time,
+}
+_MODEL_VERSION_ORDER_BY = {
+    "version": SqlModelVersion.version,
+    "creation_time": SqlModelVersion.creation_time,
+    "last_updated_time": SqlModelVersion.last_updated_time,
+}
+
+
+def _parse_order_by(order_by: str, columns: Dict[str, Any]) -> Tuple[str, bool]:
+    """
+    :return: The column name and whether the order is descending.
+    """
+    parts = order_by.split()
+    if (
+        len(parts) not in (1, 2)
+        or parts[0] not in columns
+        or (len(parts) == 2 and parts[1].upper() not in ("ASC", "DESC"))
+    ):
+        raise SubmarineException(
+            f"Invalid order_by: {order_by}. Expected one of {', '.join(columns)}, optionally followed"
+            " by ASC or DESC."
+        )
+    return parts[0], len(parts) == 2 and parts[1].upper() == "DESC"
+
+
+def _encode_page_token(order_by: str, values: List[Any]) -> str:
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    token = json.dumps({"order_by": order_by, "values": values})
+    return base64.urlsafe_b64encode(token.encode("utf-8")).decode("utf-8")
+
+
+def _decode_page_token(page_token: str, order_by: str, keys: List[Any]) -> List[Any]:
+    try:
+        token = json.loads(base64.urlsafe_b64decode(page_token.encode("utf-8")))
+        if token["order_by"] != order_by or len(token["values"]) != len(keys):
+            raise ValueError("the token was created for another order")
+        return [
+            datetime.fromisoformat(value) if key.type.python_type is datetime else value
+            for key, value in zip(keys, token["values"])
+        ]
+    except (ValueError, KeyError, TypeError) as e:
+        raise SubmarineException(f"Invalid page_token: {page_token}. Error: {str(e)}")
+
+
+def _paginate(
+    query: Query,
+    keys: List[Any],
+    descending: bool,
+    max_results: Optional[int],
+    page_token: Optional[str],
+) -> Tuple[list, Optional[str]]:
+    """
+    Keyset pagination: a page starts right after the sort keys of the last row of the previous
+    page, so that the database seeks to it instead of skipping the rows of the previous pages.
+    :return: The rows of the page and the token of the next page.
+    """
+    if max_results is not None and (not isinstance(max_results, int) or max_results <= 0):
+        raise SubmarineException(f"Invalid max_results: {max_results}. It must be a positive integer.")
+    # identifies the order in the tokens, so that a token is not used with another order
+    order_by = f"{keys[0].key} {'DESC' if descending else 'ASC'}"
+    query = query.order_by(*[key.desc() if descending else key.asc() for key in keys])
+    if page_token is not None:
+        values = _decode_page_token(page_token, order_by, keys)
+        query = query.filter(
+            sqlalchemy.or_(
+                *[
+                    sqlalchemy.and_(
+                        *[key == value for key, value in zip(keys[:i], values[:i])],
+                        keys[i] < values[i] if descending else keys[i] > values[i],
+                    )
+                    for i in range(len(keys))
+                ]
+            )
+        )
+    if max_results is None:
+        return query.all(), None
+    rows = query.limit(max_results + 1).all()
+    if len(rows) <= max_results:
+        return rows, None
+    rows = rows[:max_results]
+    return rows, _encode_page_token(order_by, [getattr(rows[-1], key.key) for key in keys])
+
+
+def _chunks(values: Sequence[Any]) -> Iterator[Sequence[Any]]:
+    for i in range(0, len(values), _BULK_CHUNK_SIZE):
+        yield values[i : i + _BULK_CHUNK_SIZE]
+
+
+_COMPARISONS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def _compare(column: Any, op: str, value: Any, operators: Tuple[str, ...]) -> Any:
+    if op not in operators:
+        raise SubmarineException(
+            f"Operator {op} is not supported for {column.key}, expected one of {', '.join(operators)}."
+        )
+    if op == "LIKE":
+        return column.startswith(get_like_prefix(value), autoescape=True)
+    return _COMPARISONS[op](column, value)
+
+
+def _string_field(column: Any, operators: Tuple[str, ...] = ("=", "!=", "LIKE")) -> FieldCompiler:
+    return lambda op, value: _compare(column, op, value, operators)
+
+
+def _time_field(column: Any) -> FieldCompiler:
+    def compile_time(op: str, value: str) -> Any:
+        try:
+            time = datetime.fromisoformat(value)
+        except ValueError:
+            raise SubmarineException(f"Invalid time: {value}. Expected an ISO 8601 time.")
+        return _compare(column, op, time, ("=", "!=", "<", "<=", ">", ">="))
+
+    return compile_time
+
 
 class SqlAlchemyStore(AbstractStore):
-    def __init__(self, db_uri: str) -> None:
+    def __init__(self, db_uri: str, engine_config: Optional[EngineConfig] = None) -> None:
         """
         Create a database backed store.
         :param db_uri: The SQLAlchemy database URI string to connect to the database. See
                        the `SQLAlchemy docs
                        <https://docs.sqlalchemy.org/en/latest/core/engines.html#database-urls>`_
                        for format specifications. Submarine supports the dialects ``mysql``.
+        :param engine_config: The connection pool settings of the engine, which is shared with
+                              the other stores of the database URI. Defaults to the
+                              ``SUBMARINE_DB_*`` environment variables, see
+                              :py:mod:`submarine.store.database.engine`.
         """
         super().__init__()
 
         self.db_uri = db_uri
         self.db_type = extract_db_type_from_uri(db_uri)
-        self.engine = sqlalchemy.create_engine(db_uri, pool_pre_ping=True)
+        self.engine = get_sqlalchemy_engine(db_uri, engine_config)
         insp = sqlalchemy.inspect(self.engine)
 
         # Verify that all model registry tables exist.
@@ -74,6 +228,7 @@ class SqlAlchemyStore(AbstractStore):
         }
         if len(expected_tables & set(insp.get_table_names())) == 0:
             SqlAlchemyStore._initialize_tables(self.engine)
+        SqlAlchemyStore._verify_schema(self.engine)
         Base.metadata.bind = self.engine
         SessionMaker = sqlalchemy.orm.sessionmaker(bind=self.engine)
         self.ManagedSessionMaker = self._get_managed_session_maker(SessionMaker)
@@ -83,6 +238,14 @@ class SqlAlchemyStore(AbstractStore):
         _logger.info("Creating initial Submarine database tables...")
         Base.metadata.create_all(engine)
 
+    @staticmethod
+    def _verify_schema(engine: Engine):
+        """
+        Bring the schema of an existing database up to date, see
+        :py:mod:`submarine.store.database.migrations`.
+        """
+        migrations.upgrade(engine)
+
     @staticmethod
     def _get_managed_session_maker(SessionMaker: sessionmaker):
         """
@@ -118,7 +281,7 @@ class SqlAlchemyStore(AbstractStore):
                 load the following registered model attributes
                 when fetching a model: ``registered_model_tag``.
         """
-        return [sqlalchemy.orm.subqueryload(SqlRegisteredModel.tags)]
+        return [sqlalchemy.orm.selectinload(SqlRegisteredModel.tags)]
 
     @staticmethod
     def _get_eager_model_version_query_options():
@@ -127,7 +290,7 @@ class SqlAlchemyStore(AbstractStore):
                  load the following model version attributes
                  when fetching a model: ``model_version_tag``.
         """
-        return [sqlalchemy.orm.subqueryload(SqlModelVersion.tags)]
+        return [sqlalchemy.orm.selectinload(SqlModelVersion.tags)]
 
     def _save_to_db(self, session: Session, objs: Union[list, object]) -> None:
         """
@@ -172,22 +335,22 @@ class SqlAlchemyStore(AbstractStore):
 
     @classmethod
     def _get_sql_registered_model(
-        cls, session: Session, name: str, eager: bool = False
+        cls, session: Session, name: str, eager: bool = False, for_update: bool = False
     ) -> SqlRegisteredModel:
         """
         :param eager: If ``True``, eagerly loads the registered model's tags.
                       If ``False``, these attributes are not eagerly loaded and
                       will be loaded when their corresponding object properties
                       are accessed from the resulting ``SqlRegisteredModel`` object.
+        :param for_update: If ``True``, locks the row until the end of the transaction
+                           (``SELECT ... FOR UPDATE``, ignored by SQLite).
         """
         validate_model_name(name)
         query_options = cls._get_eager_registered_model_query_options() if eager else []
-        models: List[SqlRegisteredModel] = (
-            session.query(SqlRegisteredModel)
-            .options(*query_options)
-            .filter(SqlRegisteredModel.name == name)
-            .all()
-        )
+        query = session.query(SqlRegisteredModel).options(*query_options)
+        if for_update:
+            query = query.with_for_update()
+        models: List[SqlRegisteredModel] = query.filter(SqlRegisteredModel.name == name).all()
 
         if len(models) == 0:
             raise SubmarineException(f"Registered model with name={name} not found")
@@ -249,28 +412,92 @@ class SqlAlchemyStore(AbstractStore):
             sql_registered_model = self._get_sql_registered_model(session, name)
             session.delete(sql_registered_model)
 
+    @staticmethod
+    def _get_registered_model_filter_fields() -> Dict[str, FieldCompiler]:
+        def compile_tag(op: str, value: str) -> Any:
+            # an index seek on (tag, name)
+            tags = sqlalchemy.select(SqlRegisteredModelTag.name).where(
+                _compare(SqlRegisteredModelTag.tag, op, value, ("=", "LIKE"))
+            )
+            return SqlRegisteredModel.name.in_(tags)
+
+        return {
+            "name": _string_field(SqlRegisteredModel.name),
+            "tag": compile_tag,
+            "creation_time": _time_field(SqlRegisteredModel.creation_time),
+            "last_updated_time": _time_field(SqlRegisteredModel.last_updated_time),
+        }
+
+    @staticmethod
+    def _get_model_version_filter_fields(name: str) -> Dict[str, FieldCompiler]:
+        def compile_tag(op: str, value: str) -> Any:
+            # an index seek on (tag, name, version)
+            tags = sqlalchemy.select(SqlModelVersionTag.version).where(
+                _compare(SqlModelVersionTag.tag, op, value, ("=", "LIKE")),
+                SqlModelVersionTag.name == name,
+            )
+            return SqlModelVersion.version.in_(tags)
+
+        return {
+            "tag": compile_tag,
+            "stage": lambda op, value: _compare(
+                SqlModelVersion.current_stage, op, get_canonical_stage(value), ("=", "!=")
+            ),
+            "model_type": _string_field(SqlModelVersion.model_type),
+            "creation_time": _time_field(SqlModelVersion.creation_time),
+            "last_updated_time": _time_field(SqlModelVersion.last_updated_time),
+        }
+
     def list_registered_model(
-        self, filter_str: Optional[str] = None, filter_tags: Optional[List[str]] = None
-    ) -> List[RegisteredModel]:
+        self,
+        filter_str: Optional[str] = None,
+        filter_tags: Optional[List[str]] = None,
+        max_results: Optional[int] = None,
+        order_by: str = "name",
+        page_token: Optional[str] = None,
+        filter_expression: Optional[str] = None,
+    ) -> PagedList[RegisteredModel]:
         """
         List of all models.
         :param filter_string: Filter query string, defaults to searching all registered models.
-        :param filter_tags: Filter tags, defaults not to filter any tags.
-        :return: A List of :py:class:`submarine.entities.model_registry.RegisteredModel` objects
+        :param filter_tags: Filter tags, the models must have all of them. Defaults not to filter
+                            any tags.
+        :param max_results: Maximum number of models in the page, defaults to all of them.
+        :param order_by: ``name``, ``creation_time`` or ``last_updated_time``, optionally
+                         followed by ``ASC`` or ``DESC``.
+        :param page_token: Token of the page to return, from the previous page.
+        :param filter_expression: Filter on the ``name``, ``tag``, ``creation_time`` and
+                                  ``last_updated_time`` fields, see
+                                  :py:mod:`submarine.store.model_registry.filter_expression`.
+        :return: A page of :py:class:`submarine.entities.model_registry.RegisteredModel` objects
                 that satisfy the search expressions.
         """
+        column, descending = _parse_order_by(order_by, _REGISTERED_MODEL_ORDER_BY)
+        keys = [_REGISTERED_MODEL_ORDER_BY[column]]
+        if column != "name":
+            keys.append(SqlRegisteredModel.name)
+        fields = self._get_registered_model_filter_fields()
         conditions = []
         if filter_tags is not None:
-            conditions += [
-                SqlRegisteredModel.tags.any(SqlRegisteredModelTag.tag.contains(tag)) for tag in filter_tags
-            ]
+            conditions += [fields["tag"]("=", tag) for tag in filter_tags]
         if filter_str is not None:
             conditions.append(SqlRegisteredModel.name.startswith(filter_str))
+        if filter_expression is not None:
+            conditions.append(compile_filter_expression(filter_expression, fields))
         with self.ManagedSessionMaker() as session:
-            sql_registered_models = session.query(SqlRegisteredModel).filter(*conditions).all()
-            return [
-                sql_registered_model.to_submarine_entity() for sql_registered_model in sql_registered_models
-            ]
+            query = (
+                session.query(SqlRegisteredModel)
+                .options(*self._get_eager_registered_model_query_options())
+                .filter(*conditions)
+            )
+            sql_registered_models, token = _paginate(query, keys, descending, max_results, page_token)
+            return PagedList(
+                [
+                    sql_registered_model.to_submarine_entity()
+                    for sql_registered_model in sql_registered_models
+                ],
+                token,
+            )
 
     def get_registered_model(self, name: str) -> RegisteredModel:
         """
@@ -308,8 +535,8 @@ class SqlAlchemyStore(AbstractStore):
         validate_model_name(name)
         validate_tag(tag)
         with self.ManagedSessionMaker() as session:
-            # check if registered model exists
-            self._get_sql_registered_model(session, name)
+            sql_registered_model = self._get_sql_registered_model(session, name)
+            sql_registered_model.last_updated_time = datetime.now()
             session.merge(SqlRegisteredModelTag(name=name, tag=tag))
 
     def delete_registered_model_tag(self, name: str, tag: str) -> None:
@@ -322,9 +549,9 @@ class SqlAlchemyStore(AbstractStore):
         validate_model_name(name)
         validate_tag(tag)
         with self.ManagedSessionMaker() as session:
-            # check if registered model exists
-            self._get_sql_registered_model(session, name)
+            sql_registered_model = self._get_sql_registered_model(session, name)
             existing_tag = self._get_registered_model_tag(session, name, tag)
+            sql_registered_model.last_updated_time = datetime.now()
             session.delete(existing_tag)
 
     def create_model_version(
@@ -350,42 +577,101 @@ class SqlAlchemyStore(AbstractStore):
         :return: A single object of :py:class:`submarine.entities.model_registry.ModelVersion`
                  created in the backend.
         """
+        model_version = {
+            "id": id,
+            "user_id": user_id,
+            "experiment_id": experiment_id,
+            "model_type": model_type,
+            "dataset": dataset,
+            "description": description,
+            "tags": tags,
+        }
+        return self.bulk_create_model_versions(name, [model_version])[0]
 
-        def next_version(sql_registered_model: SqlRegisteredModel) -> int:
-            if sql_registered_model.model_versions:
-                return (
-                    max(0 if m.version is None else m.version for m in sql_registered_model.model_versions)
-                    + 1
-                )
-            else:
-                return 1
-
+    def bulk_create_model_versions(
+        self, name: str, model_versions: List[Dict[str, Any]]
+    ) -> List[ModelVersion]:
+        """
+        Create several versions of the registered model in a single transaction. They are
+        numbered consecutively, in order.
+        :param name: Registered model name.
+        :param model_versions: The arguments of :py:meth:`create_model_version` of each version:
+                               ``id``, ``user_id``, ``experiment_id``, ``model_type`` and
+                               optionally ``dataset``, ``description`` and ``tags``.
+        :return: The :py:class:`submarine.entities.model_registry.ModelVersion` objects created
+                 in the backend.
+        """
         validate_model_name(name)
-        validate_description(description)
-        validate_tags(tags)
-        with self.ManagedSessionMaker() as session:
-            try:
+        for model_version in model_versions:
+            missing = [field for field in _MODEL_VERSION_REQUIRED_FIELDS if field not in model_version]
+            unknown = [field for field in model_version if field not in _MODEL_VERSION_FIELDS]
+            if missing or unknown:
+                raise SubmarineException(
+                    f"Invalid model version {model_version}. Missing fields: {missing}, unknown fields:"
+                    f" {unknown}."
+                )
+            validate_description(model_version.get("description"))
+            validate_tags(model_version.get("tags"))
+        ids = [model_version["id"] for model_version in model_versions]
+        if len(set(ids)) != len(ids):
+            raise SubmarineException(f"Model create error (name={name}). Duplicated model IDs.")
+        if not model_versions:
+            return []
+        for _ in range(_CREATE_MODEL_VERSION_ATTEMPTS):
+            with self.ManagedSessionMaker() as session:
                 creation_time = datetime.now()
-                sql_registered_model = self._get_sql_registered_model(session, name)
+                # locking the registered model serializes the registrations of its versions
+                sql_registered_model = self._get_sql_registered_model(session, name, for_update=True)
                 sql_registered_model.last_updated_time = creation_time
-                model_version = SqlModelVersion(
-                    name=name,
-                    version=next_version(sql_registered_model),
-                    id=id,
-                    user_id=user_id,
-                    experiment_id=experiment_id,
-                    model_type=model_type,
-                    creation_time=creation_time,
-                    last_updated_time=creation_time,
-                    dataset=dataset,
-                    description=description,
-                    tags=[SqlModelVersionTag(tag=tag) for tag in tags or []],
-                )
-                self._save_to_db(session, [sql_registered_model, model_version])
-                session.flush()
-                return model_version.to_submarine_entity()
-            except sqlalchemy.exc.IntegrityError:
-                raise SubmarineException(f"Model create error (name={name}).")
+                first_version = self._get_max_model_version(session, name) + 1
+                sql_model_versions = [
+                    SqlModelVersion(
+                        name=name,
+                        version=first_version + i,
+                        id=model_version["id"],
+                        user_id=model_version["user_id"],
+                        experiment_id=model_version["experiment_id"],
+                        model_type=model_version["model_type"],
+                        creation_time=creation_time,
+                        last_updated_time=creation_time,
+                        dataset=model_version.get("dataset"),
+                        description=model_version.get("description"),
+                        tags=[SqlModelVersionTag(tag=tag) for tag in model_version.get("tags") or []],
+                    )
+                    for i, model_version in enumerate(model_versions)
+                ]
+                self._save_to_db(session, [sql_registered_model] + sql_model_versions)
+                try:
+                    session.flush()
+                    return [
+                        sql_model_version.to_submarine_entity() for sql_model_version in sql_model_versions
+                    ]
+                except sqlalchemy.exc.IntegrityError:
+                    session.rollback()
+                    # a model ID is already registered, retrying would not help
+                    if any(
+                        session.query(SqlModelVersion)
+                        .filter(SqlModelVersion.name == name, SqlModelVersion.id.in_(chunk))
+                        .first()
+                        is not None
+                        for chunk in _chunks(ids)
+                    ):
+                        raise SubmarineException(f"Model create error (name={name}).")
+            # a database without row locks let a concurrent registration take the version
+            _logger.info("Version conflict while creating a version of model %s, retrying", name)
+        raise SubmarineException(f"Model create error (name={name}).")
+
+    @staticmethod
+    def _get_max_model_version(session: Session, name: str) -> int:
+        """
+        :return: The highest version of a registered model, or 0 if it has none.
+        """
+        max_version = (
+            session.query(sqlalchemy.func.max(SqlModelVersion.version))
+            .filter(SqlModelVersion.name == name)
+            .scalar()
+        )
+        return max_version or 0
 
     @classmethod
     def _get_sql_model_version(
@@ -432,7 +718,8 @@ class SqlAlchemyStore(AbstractStore):
             sql_model = self._get_sql_model_version(session, name, version)
             sql_model.description = description
             sql_model.last_updated_time = update_time
-            self._save_to_db(session, sql_model)
+            sql_model.registered_model.last_updated_time = update_time
+            self._save_to_db(session, [sql_model, sql_model.registered_model])
             return sql_model.to_submarine_entity()
 
     def transition_model_version_stage(self, name: str, version: int, stage: str) -> ModelVersion:
@@ -481,22 +768,48 @@ class SqlAlchemyStore(AbstractStore):
             sql_model_version = self._get_sql_model_version(session, name, version, True)
             return sql_model_version.to_submarine_entity()
 
-    def list_model_versions(self, name: str, filter_tags: Optional[list] = None) -> List[ModelVersion]:
+    def list_model_versions(
+        self,
+        name: str,
+        filter_tags: Optional[list] = None,
+        max_results: Optional[int] = None,
+        order_by: str = "version",
+        page_token: Optional[str] = None,
+        filter_expression: Optional[str] = None,
+    ) -> PagedList[ModelVersion]:
         """
         List of all models that satisfy the filter criteria.
         :param name: Registered model name.
-        :param filter_tags: Filter tags, defaults not to filter any tags.
-        :return: A List of :py:class:`submarine.entities.model_registry.ModelVersion` objects
+        :param filter_tags: Filter tags, the versions must have all of them. Defaults not to
+                            filter any tags.
+        :param max_results: Maximum number of versions in the page, defaults to all of them.
+        :param order_by: ``version``, ``creation_time`` or ``last_updated_time``, optionally
+                         followed by ``ASC`` or ``DESC``.
+        :param page_token: Token of the page to return, from the previous page.
+        :param filter_expression: Filter on the ``tag``, ``stage``, ``model_type``,
+                                  ``creation_time`` and ``last_updated_time`` fields, see
+                                  :py:mod:`submarine.store.model_registry.filter_expression`.
+        :return: A page of :py:class:`submarine.entities.model_registry.ModelVersion` objects
                 that satisfy the search expressions.
         """
+        column, descending = _parse_order_by(order_by, _MODEL_VERSION_ORDER_BY)
+        keys = [_MODEL_VERSION_ORDER_BY[column]]
+        if column != "version":
+            keys.append(SqlModelVersion.version)
+        fields = self._get_model_version_filter_fields(name)
         conditions = [SqlModelVersion.name == name]
         if filter_tags is not None:
-            conditions += [
-                SqlModelVersion.tags.any(SqlModelVersionTag.tag.contains(tag)) for tag in filter_tags
-            ]
+            conditions += [fields["tag"]("=", tag) for tag in filter_tags]
+        if filter_expression is not None:
+            conditions.append(compile_filter_expression(filter_expression, fields))
         with self.ManagedSessionMaker() as session:
-            sql_models = session.query(SqlModelVersion).filter(*conditions).all()
-            return [sql_model.to_submarine_entity() for sql_model in sql_models]
+            query = (
+                session.query(SqlModelVersion)
+                .options(*self._get_eager_model_version_query_options())
+                .filter(*conditions)
+            )
+            sql_models, token = _paginate(query, keys, descending, max_results, page_token)
+            return PagedList([sql_model.to_submarine_entity() for sql_model in sql_models], token)
 
     def get_model_version_uri(self, name: str, version: int) -> str:
         """
@@ -547,8 +860,7 @@ class SqlAlchemyStore(AbstractStore):
         validate_model_version(version)
         validate_tag(tag)
         with self.ManagedSessionMaker() as session:
-            # check if model version exists
-            self._get_sql_model_version(session, name, version)
+            self._touch_model_version(self._get_sql_model_version(session, name, version))
             session.merge(SqlModelVersionTag(name=name, version=version, tag=tag))
 
     def delete_model_version_tag(self, name: str, version: int, tag: str) -> None:
@@ -563,7 +875,155 @@ class SqlAlchemyStore(AbstractStore):
         validate_model_version(version)
         validate_tag(tag)
         with self.ManagedSessionMaker() as session:
-            # check if model version exists
-            self._get_sql_model_version(session, name, version)
+            sql_model_version = self._get_sql_model_version(session, name, version)
             existing_tag = self._get_sql_model_version_tag(session, name, version, tag)
+            self._touch_model_version(sql_model_version)
             session.delete(existing_tag)
+
+    @staticmethod
+    def _get_bulk_versions(versions: List[int]) -> List[int]:
+        for version in versions:
+            validate_model_version(version)
+        return sorted(set(versions))
+
+    @staticmethod
+    def _check_model_versions_exist(session: Session, name: str, versions: List[int]) -> None:
+        existing = set()
+        for chunk in _chunks(versions):
+            existing.update(
+                version
+                for version, in session.query(SqlModelVersion.version).filter(
+                    SqlModelVersion.name == name,
+                    SqlModelVersion.version.in_(chunk),
+                    SqlModelVersion.current_stage != STAGE_DELETED_INTERNAL,
+                )
+            )
+        missing = [version for version in versions if version not in existing]
+        if missing:
+            raise SubmarineException(f"Model Versions (name={name}, versions={missing}) not found.")
+
+    @staticmethod
+    def _touch_registered_model(session: Session, name: str, update_time: datetime) -> None:
+        session.query(SqlRegisteredModel).filter(SqlRegisteredModel.name == name).update(
+            {SqlRegisteredModel.last_updated_time: update_time}, synchronize_session=False
+        )
+
+    def bulk_transition_stage(self, name: str, versions: List[int], stage: str) -> None:
+        """
+        Update the stage of several versions of the registered model in a single transaction.
+        :param name: Registered model name.
+        :param versions: Versions of the registered model, which must all exist.
+        :param stage: New desired stage for these versions of registered model.
+        :return: None.
+        """
+        validate_model_name(name)
+        versions = self._get_bulk_versions(versions)
+        stage = get_canonical_stage(stage)
+        if not versions:
+            return
+        with self.ManagedSessionMaker() as session:
+            update_time = datetime.now()
+            self._check_model_versions_exist(session, name, versions)
+            for chunk in _chunks(versions):
+                session.query(SqlModelVersion).filter(
+                    SqlModelVersion.name == name, SqlModelVersion.version.in_(chunk)
+                ).update(
+                    {SqlModelVersion.current_stage: stage, SqlModelVersion.last_updated_time: update_time},
+                    synchronize_session=False,
+                )
+            self._touch_registered_model(session, name, update_time)
+
+    def bulk_add_tags(self, name: str, versions: List[int], tags: List[str]) -> None:
+        """
+        Add tags to several versions of the registered model in a single transaction. The tags
+        a version already has are left as they are.
+        :param name: Registered model name.
+        :param versions: Versions of the registered model, which must all exist.
+        :param tags: List of tag values.
+        :return: None.
+        """
+        validate_model_name(name)
+        versions = self._get_bulk_versions(versions)
+        validate_tags(tags)
+        tags = sorted(set(tags))
+        if not versions or not tags:
+            return
+        with self.ManagedSessionMaker() as session:
+            update_time = datetime.now()
+            self._check_model_versions_exist(session, name, versions)
+            existing = set()
+            for chunk in _chunks(versions):
+                existing.update(
+                    session.query(SqlModelVersionTag.version, SqlModelVersionTag.tag).filter(
+                        SqlModelVersionTag.name == name,
+                        SqlModelVersionTag.version.in_(chunk),
+                        SqlModelVersionTag.tag.in_(tags),
+                    )
+                )
+            new_tags = [
+                {"name": name, "version": version, "tag": tag}
+                for version in versions
+                for tag in tags
+                if (version, tag) not in existing
+            ]
+            if new_tags:
+                session.execute(sqlalchemy.insert(SqlModelVersionTag), new_tags)
+            for chunk in _chunks(versions):
+                session.query(SqlModelVersion).filter(
+                    SqlModelVersion.name == name, SqlModelVersion.version.in_(chunk)
+                ).update({SqlModelVersion.last_updated_time: update_time}, synchronize_session=False)
+            self._touch_registered_model(session, name, update_time)
+
+    def bulk_delete_versions(self, name: str, versions: List[int]) -> None:
+        """
+        Delete several versions of the registered model in a single transaction.
+        :param name: Registered model name.
+        :param versions: Versions of the registered model, which must all exist.
+        :return: None.
+        """
+        validate_model_name(name)
+        versions = self._get_bulk_versions(versions)
+        if not versions:
+            return
+        with self.ManagedSessionMaker() as session:
+            update_time = datetime.now()
+            self._check_model_versions_exist(session, name, versions)
+            for chunk in _chunks(versions):
+                # the tags are deleted explicitly, SQLite does not enforce the cascade by default
+                session.query(SqlModelVersionTag).filter(
+                    SqlModelVersionTag.name == name, SqlModelVersionTag.version.in_(chunk)
+                ).delete(synchronize_session=False)
+                session.query(SqlModelVersion).filter(
+                    SqlModelVersion.name == name, SqlModelVersion.version.in_(chunk)
+                ).delete(synchronize_session=False)
+            self._touch_registered_model(session, name, update_time)
+
+    @staticmethod
+    def _touch_model_version(sql_model_version: SqlModelVersion) -> None:
+        update_time = datetime.now()
+        sql_model_version.last_updated_time = update_time
+        sql_model_version.registered_model.last_updated_time = update_time
+
+    def get_update_stamp(self) -> Tuple[Optional[datetime], int]:
+        """
+        A cheap probe for changes made by other processes. Every change to a registered model,
+        its tags or its versions updates the ``last_updated_time`` of the registered model.
+        :return: The latest ``last_updated_time`` of the registered models and their number.
+        """
+        with self.ManagedSessionMaker() as session:
+            last_updated_time, count = session.query(
+                sqlalchemy.func.max(SqlRegisteredModel.last_updated_time), sqlalchemy.func.count()
+            ).one()
+            return last_updated_time, count
+
+    def get_last_updated_times(self, names: List[str]) -> Dict[str, datetime]:
+        """
+        :param names: Registered model names.
+        :return: The ``last_updated_time`` of the registered models that exist.
+        """
+        with self.ManagedSessionMaker() as session:
+            return dict(
+                session.query(SqlRegisteredModel.name, SqlRegisteredModel.last_updated_time).filter(
+                    SqlRegisteredModel.name.in_(names)
+                )
+            )
@@ -39,6 +39,30 @@ class AbstractStore:
         """
         pass
 
+    def log_metrics(self, job_id, metrics):
+        """
+        Log several metrics for the specified run. Stores that can write many rows at once should
+        override this; the default logs the metrics one by one.
+        :param job_id: String id for the run
+        :param metrics: List of :py:class:`submarine.entities.Metric` instances to log
+        """
+        self.log_batch(job_id, metrics=metrics)
+
+    def get_metric_history(
+        self, job_id, key, worker_index=None, start_step=None, end_step=None, max_points=None
+    ):
+        """
+        Get the values logged for a metric of the specified run, optionally downsampled
+        :param job_id: String id for the run
+        :param key: Metric name
+        :param worker_index: Only return the values logged by this worker, defaults to all workers
+        :param start_step: Only return the values logged at or after this step
+        :param end_step: Only return the values logged at or before this step
+        :param max_points: Maximum number of points returned per worker, defaults to all points
+        :return: A :py:class:`pandas.DataFrame` with one row per point
+        """
+        pass
+
     def log_param(self, job_id, param):
         """
         Log a param for the specified run
@@ -46,3 +70,48 @@ class AbstractStore:
         :param param: :py:class:`submarine.entities.Param` instance to log
         """
         pass
+
+    def allocate_folder_number(self, path, get_first_number):
+        """
+        Allocate the next number of a numbered folder, such as the artifact folders of an
+        experiment. Stores that can keep a counter should override this so that numbers are never
+        allocated twice, even by workers allocating at once; the default returns
+        ``get_first_number()``, which is only safe for a single worker.
+        :param path: Parent folder of the numbered folders
+        :param get_first_number: Called when the folder has no counter yet, returns the number to
+                                 start from, e.g. the highest existing folder number plus one
+        :return: The allocated number
+        """
+        return get_first_number()
+
+    def log_batch(self, job_id, metrics=None, params=None):
+        """
+        Log several metrics and params for the specified run. Stores that can write many rows at
+        once should override this; the default logs them one by one.
+        :param job_id: String id for the run
+        :param metrics: List of :py:class:`submarine.entities.Metric` instances to log
+        :param params: List of :py:class:`submarine.entities.Param` instances to log
+        """
+        for metric in metrics or []:
+            self.log_metric(job_id, metric)
+        for param in params or []:
+            self.log_param(job_id, param)
+
+    def export_metrics(self, job_id, uri, chunk_size=None):
+        """
+        Export the metrics and params of the specified run to a Parquet dataset
+        :param job_id: String id for the run
+        :param uri: Directory to write ``metric.parquet`` and ``param.parquet`` to, any URI
+                    supported by :py:mod:`submarine.utils.fileio`
+        :param chunk_size: Number of rows read from the store and written at a time
+        """
+        pass
+
+    def import_metrics(self, uri, job_id=None, chunk_size=None):
+        """
+        Import the metrics and params of a run from a Parquet dataset written by ``export_metrics``
+        :param uri: Directory that contains ``metric.parquet`` and ``param.parquet``
+        :param job_id: String id of the run to import to, defaults to the exported run
+        :param chunk_size: Number of rows read from the dataset and written at a time
+        """
+        pass
@@ -16,17 +16,57 @@
 import logging
 import math
 from contextlib import contextmanager
+from typing import Optional
 
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import sqlalchemy
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 
 from submarine.entities import Param
 from submarine.exceptions import SubmarineException
-from submarine.store.database.models import Base, SqlMetric, SqlParam
+from submarine.store.database import migrations
+from submarine.store.database.db_types import MYSQL, POSTGRES, SQLITE
+from submarine.store.database.engine import EngineConfig, get_sqlalchemy_engine
+from submarine.store.database.models import (
+    Base,
+    SqlArtifactFolderCounter,
+    SqlMetric,
+    SqlParam,
+)
 from submarine.store.tracking.abstract_store import AbstractStore
-from submarine.utils import extract_db_type_from_uri
+from submarine.utils import extract_db_type_from_uri, fileio
 
 _logger = logging.getLogger(__name__)
 
+_EXPORT_CHUNK_SIZE = 100000
+
+# Attempts of allocate_folder_number when a concurrent allocation created the same counter.
+_ALLOCATE_FOLDER_ATTEMPTS = 3
+
+# Columns of the Parquet files written by ``export_metrics``. The columns with few distinct
+# values are dictionary-encoded.
+_METRIC_SCHEMA = pa.schema(
+    [
+        ("id", pa.dictionary(pa.int32(), pa.string())),
+        ("key", pa.dictionary(pa.int32(), pa.string())),
+        ("value", pa.float64()),
+        ("worker_index", pa.dictionary(pa.int32(), pa.string())),
+        ("timestamp", pa.timestamp("us")),
+        ("step", pa.int64()),
+        ("is_nan", pa.bool_()),
+    ]
+)
+_PARAM_SCHEMA = pa.schema(
+    [
+        ("id", pa.dictionary(pa.int32(), pa.string())),
+        ("key", pa.dictionary(pa.int32(), pa.string())),
+        ("value", pa.string()),
+        ("worker_index", pa.dictionary(pa.int32(), pa.string())),
+    ]
+)
+
 
 class SqlAlchemyStore(AbstractStore):
     """
@@ -43,18 +83,22 @@ class SqlAlchemyStore(AbstractStore):
     :py:class:`submarine.store.database.models.SqlParam`.
     """
 
-    def __init__(self, db_uri: str) -> None:
+    def __init__(self, db_uri: str, engine_config: Optional[EngineConfig] = None) -> None:
         """
         Create a database backed store.
         :param db_uri: The SQLAlchemy database URI string to connect to the database. See
                        the `SQLAlchemy docs
                        <https://docs.sqlalchemy.org/en/latest/core/engines.html#database-urls>`_
                        for format specifications. Submarine supports the dialects ``mysql``.
+        :param engine_config: The connection pool settings of the engine, which is shared with
+                              the other stores of the database URI. Defaults to the
+                              ``SUBMARINE_DB_*`` environment variables, see
+                              :py:mod:`submarine.store.database.engine`.
         """
         super().__init__()
         self.db_uri = db_uri
         self.db_type = extract_db_type_from_uri(db_uri)
-        self.engine = sqlalchemy.create_engine(db_uri, pool_pre_ping=True)
+        self.engine = get_sqlalchemy_engine(db_uri, engine_config)
         insp = sqlalchemy.inspect(self.engine)
 
         expected_tables = {
@@ -63,17 +107,24 @@ class SqlAlchemyStore(AbstractStore):
         }
         if len(expected_tables & set(insp.get_table_names())) == 0:
             SqlAlchemyStore._initialize_tables(self.engine)
+        SqlAlchemyStore._verify_schema(self.engine)
         Base.metadata.bind = self.engine
         SessionMaker = sqlalchemy.orm.sessionmaker(bind=self.engine)
         self.ManagedSessionMaker = self._get_managed_session_maker(SessionMaker)
-        # TODO(pingsutw): Need to check database's schema is not out of date
-        # SqlAlchemyStore._verify_schema(self.engine)
 
     @staticmethod
     def _initialize_tables(engine):
         _logger.info("Creating initial Submarine database tables...")
         Base.metadata.create_all(engine)
 
+    @staticmethod
+    def _verify_schema(engine):
+        """
+        Bring the schema of an existing database up to date, see
+        :py:mod:`submarine.store.database.migrations`.
+        """
+        migrations.upgrade(engine)
+
     @staticmethod
     def _get_managed_session_maker(SessionMaker):
         """
@@ -126,7 +177,11 @@ class SqlAlchemyStore(AbstractStore):
 
         return instance, created
 
-    def log_metric(self, job_id, metric):
+    @staticmethod
+    def _get_metric_value(metric):
+        """
+        :return: A tuple of the value to store for the metric and whether the value is NaN.
+        """
         is_nan = math.isnan(metric.value)
         if is_nan:
             value = 0
@@ -136,33 +191,218 @@ class SqlAlchemyStore(AbstractStore):
         else:
             # some driver doesn't knows float64, so we need convert it to a regular float
             value = float(metric.value)
-        with self.ManagedSessionMaker() as session:
+        return value, is_nan
+
+    def _insert_ignore_duplicates(self, session, model, rows):
+        """
+        Insert rows into the table of ``model``, skipping the rows whose primary key already exists.
+        On MySQL, PostgreSQL and SQLite this is a single upsert statement that relies on the
+        primary key for deduplication. Other dialects look each row up before inserting it.
+        """
+        table = model.__table__
+        if self.db_type == MYSQL:
+            statement = mysql.insert(table)
+            # Assigning a primary key column to itself leaves the existing row unchanged.
+            key = table.primary_key.columns.values()[0].name
+            statement = statement.on_duplicate_key_update({key: table.c[key]})
+        elif self.db_type == POSTGRES:
+            statement = postgresql.insert(table).on_conflict_do_nothing()
+        elif self.db_type == SQLITE:
+            statement = sqlite.insert(table).on_conflict_do_nothing()
+        else:
             try:
-                self._get_or_create(
-                    model=SqlMetric,
-                    id=job_id,
-                    key=metric.key,
-                    value=value,
-                    worker_index=metric.worker_index,
-                    timestamp=metric.timestamp,
-                    step=metric.step,
-                    session=session,
-                    is_nan=is_nan,
-                )
+                for row in rows:
+                    self._get_or_create(session=session, model=model, **row)
             except sqlalchemy.exc.IntegrityError:
                 session.rollback()
+            return
+        session.execute(statement, rows)
+
+    def _get_metric_row(self, job_id, metric):
+        value, is_nan = self._get_metric_value(metric)
+        return dict(
+            id=job_id,
+            key=metric.key,
+            value=value,
+            worker_index=metric.worker_index,
+            timestamp=metric.timestamp,
+            step=metric.step,
+            is_nan=is_nan,
+        )
+
+    @staticmethod
+    def _get_param_row(job_id, param):
+        return dict(id=job_id, key=param.key, value=param.value, worker_index=param.worker_index)
+
+    def log_metric(self, job_id, metric):
+        with self.ManagedSessionMaker() as session:
+            self._insert_ignore_duplicates(session, SqlMetric, [self._get_metric_row(job_id, metric)])
+
+    def log_metrics(self, job_id, metrics):
+        self.log_batch(job_id, metrics=metrics)
 
     def log_param(self, job_id: str, param: Param) -> None:
         with self.ManagedSessionMaker() as session:
-            try:
-                self._get_or_create(
-                    model=SqlParam,
-                    id=job_id,
-                    session=session,
-                    key=param.key,
-                    value=param.value,
-                    worker_index=param.worker_index,
+            self._insert_ignore_duplicates(session, SqlParam, [self._get_param_row(job_id, param)])
+
+    def log_batch(self, job_id, metrics=None, params=None):
+        """
+        Log several metrics and params for the specified run with one multi-row statement per
+        table, in a single transaction. Rows that already exist are skipped.
+        """
+        metric_rows = [self._get_metric_row(job_id, metric) for metric in metrics or []]
+        param_rows = [self._get_param_row(job_id, param) for param in params or []]
+        with self.ManagedSessionMaker() as session:
+            if metric_rows:
+                self._insert_ignore_duplicates(session, SqlMetric, metric_rows)
+            if param_rows:
+                self._insert_ignore_duplicates(session, SqlParam, param_rows)
+
+    def allocate_folder_number(self, path, get_first_number):
+        """
+        Allocate the next number of a numbered folder from a counter row. Incrementing the row
+        locks it until the end of the transaction, so concurrent allocations are serialized.
+        ``get_first_number`` is only called once per folder, to create its counter.
+        """
+        table = SqlArtifactFolderCounter.__table__
+        for _ in range(_ALLOCATE_FOLDER_ATTEMPTS):
+            with self.ManagedSessionMaker() as session:
+                result = session.execute(
+                    table.update().where(table.c.path == path).values(next_number=table.c.next_number + 1)
                 )
-                session.commit()
-            except sqlalchemy.exc.IntegrityError:
-                session.rollback()
+                if result.rowcount:
+                    next_number = session.execute(
+                        sqlalchemy.select(table.c.next_number).where(table.c.path == path)
+                    ).scalar()
+                    return next_number - 1
+            number = get_first_number()
+            with self.ManagedSessionMaker() as session:
+                try:
+                    session.execute(table.insert().values(path=path, next_number=number + 1))
+                    return number
+                except sqlalchemy.exc.IntegrityError:
+                    # a concurrent allocation created the counter, increment it instead
+                    session.rollback()
+        raise SubmarineException(f"Failed to allocate a folder number under {path}")
+
+    def get_metric_history(
+        self, job_id, key, worker_index=None, start_step=None, end_step=None, max_points=None
+    ):
+        """
+        Get the values logged for a metric of the specified run. When ``max_points`` is set, the
+        steps are split into at most ``max_points`` buckets of equal width and each bucket is
+        aggregated in the database, so only the downsampled points are transferred.
+        :return: A :py:class:`pandas.DataFrame` with the columns ``worker_index``, ``step``,
+                 ``timestamp``, ``value``, ``min_value`` and ``max_value``, sorted by worker and
+                 step. For a bucket, ``step`` is its first step, ``timestamp`` its last timestamp,
+                 ``value`` the mean and ``min_value``/``max_value`` the extremes of its values.
+        """
+        if max_points is not None and max_points < 1:
+            raise SubmarineException(f"max_points must be a positive integer, got {max_points}")
+        conditions = [SqlMetric.id == job_id, SqlMetric.key == key]
+        if worker_index is not None:
+            conditions.append(SqlMetric.worker_index == worker_index)
+        if start_step is not None:
+            conditions.append(SqlMetric.step >= start_step)
+        if end_step is not None:
+            conditions.append(SqlMetric.step <= end_step)
+        columns = ["worker_index", "step", "timestamp", "value", "min_value", "max_value"]
+
+        with self.ManagedSessionMaker() as session:
+            if max_points is None:
+                query = (
+                    session.query(
+                        SqlMetric.worker_index,
+                        SqlMetric.step,
+                        SqlMetric.timestamp,
+                        SqlMetric.value,
+                        SqlMetric.is_nan,
+                    )
+                    .filter(*conditions)
+                    .order_by(SqlMetric.worker_index, SqlMetric.step, SqlMetric.timestamp)
+                )
+                rows = []
+                for index, step, timestamp, value, is_nan in query:
+                    value = float("nan") if is_nan else value
+                    rows.append((index, step, timestamp, value, value, value))
+                return pd.DataFrame.from_records(rows, columns=columns)
+
+            conditions.append(SqlMetric.is_nan.is_(False))
+            min_step, max_step = (
+                session.query(sqlalchemy.func.min(SqlMetric.step), sqlalchemy.func.max(SqlMetric.step))
+                .filter(*conditions)
+                .one()
+            )
+            if min_step is None:
+                return pd.DataFrame(columns=columns)
+            width = -(-(max_step - min_step + 1) // max_points)
+            offset = SqlMetric.step - min_step
+            bucket = (offset - offset % width).label("bucket")
+            query = (
+                session.query(
+                    SqlMetric.worker_index,
+                    sqlalchemy.func.min(SqlMetric.step),
+                    sqlalchemy.func.max(SqlMetric.timestamp),
+                    sqlalchemy.func.avg(SqlMetric.value),
+                    sqlalchemy.func.min(SqlMetric.value),
+                    sqlalchemy.func.max(SqlMetric.value),
+                )
+                .filter(*conditions)
+                .group_by(SqlMetric.worker_index, bucket)
+                .order_by(SqlMetric.worker_index, bucket)
+            )
+            return pd.DataFrame.from_records(
+                [
+                    (index, step, timestamp, float(mean), lo, hi)
+                    for index, step, timestamp, mean, lo, hi in query
+                ],
+                columns=columns,
+            )
+
+    def _export_table(self, model, schema, job_id, uri, chunk_size):
+        table = model.__table__
+        query = sqlalchemy.select(*[table.c[name] for name in schema.names]).where(table.c.id == job_id)
+        with self.engine.connect() as connection, fileio.open_output_stream(uri) as output_stream:
+            connection = connection.execution_options(stream_results=True, max_row_buffer=chunk_size)
+            result = connection.execute(query)
+            with pq.ParquetWriter(output_stream, schema) as writer:
+                for rows in result.partitions(chunk_size):
+                    arrays = []
+                    for field, values in zip(schema, zip(*rows)):
+                        if pa.types.is_dictionary(field.type):
+                            arrays.append(pa.array(values, type=field.type.value_type).dictionary_encode())
+                        else:
+                            arrays.append(pa.array(values, type=field.type))
+                    writer.write_batch(pa.record_batch(arrays, schema=schema))
+
+    def _import_table(self, model, uri, job_id, chunk_size):
+        with fileio.open_input_file(uri) as input_file:
+            for batch in pq.ParquetFile(input_file).iter_batches(batch_size=chunk_size):
+                rows = batch.to_pylist()
+                if job_id is not None:
+                    for row in rows:
+                        row["id"] = job_id
+                with self.ManagedSessionMaker() as session:
+                    self._insert_ignore_duplicates(session, model, rows)
+
+    def export_metrics(self, job_id, uri, chunk_size=None):
+        """
+        Export the metrics and params of the specified run to ``metric.parquet`` and
+        ``param.parquet`` under ``uri``. Rows are streamed from the database with a server-side
+        cursor and written ``chunk_size`` rows at a time, so the run is never held in memory.
+        """
+        chunk_size = chunk_size or _EXPORT_CHUNK_SIZE
+        uri = uri.rstrip("/")
+        fileio.create_dir(uri)
+        self._export_table(SqlMetric, _METRIC_SCHEMA, job_id, f"{uri}/metric.parquet", chunk_size)
+        self._export_table(SqlParam, _PARAM_SCHEMA, job_id, f"{uri}/param.parquet", chunk_size)
+
+    def import_metrics(self, uri, job_id=None, chunk_size=None):
+        """
+        Import the metrics and params written by ``export_metrics``, ``chunk_size`` rows per
+        transaction. Rows that already exist are skipped, so an interrupted import can be rerun.
+        """
+        chunk_size = chunk_size or _EXPORT_CHUNK_SIZE
+        uri = uri.rstrip("/")
+        self._import_table(SqlMetric, f"{uri}/metric.parquet", job_id, chunk_size)
+        self._import_table(SqlParam, f"{uri}/param.parquet", job_id, chunk_size)
@@ -0,0 +1,175 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Background logging of metrics. Metrics are put on a bounded in-memory queue and written to the
+tracking store in batches by a daemon thread, so that training code does not wait on the database.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from submarine.entities import Metric
+from submarine.exceptions import SubmarineException
+from submarine.store.tracking.abstract_store import AbstractStore
+from submarine.tracking.spool import MetricSpool
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_PUT_TIMEOUT = 0.1
+
+# Put on the queue to wake up and stop the background thread.
+_STOP = object()
+
+
+class AsyncMetricLogger:
+    """
+    Writes metrics to a tracking store from a background thread.
+
+    The thread writes a batch as soon as ``batch_size`` metrics are queued or ``flush_interval``
+    seconds after the first metric of the batch arrived, whichever comes first. When the queue
+    holds ``max_queue_size`` metrics, ``log_metric`` blocks until the thread catches up. Pending
+    metrics are flushed when the interpreter exits.
+
+    With a ``spool``, ``log_metric`` never waits longer than ``put_timeout``: metrics that do not
+    fit in the queue in time, and batches the store fails to write, are appended to the spool and
+    replayed once the store accepts writes again.
+    """
+
+    def __init__(
+        self,
+        store: AbstractStore,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        spool: Optional[MetricSpool] = None,
+        put_timeout: float = DEFAULT_PUT_TIMEOUT,
+    ) -> None:
+        """
+        :param store: Tracking store the metrics are written to.
+        :param max_queue_size: Number of metrics that can be waiting to be written.
+        :param batch_size: Maximum number of metrics written by a single store call.
+        :param flush_interval: Maximum number of seconds a metric waits before it is written.
+        :param spool: Local spool for metrics that cannot be written to the store in time.
+        :param put_timeout: Seconds ``log_metric`` waits for room in the queue before it spools
+                            the metric. Only used with a ``spool``.
+        """
+        if max_queue_size < 1 or batch_size < 1:
+            raise SubmarineException("max_queue_size and batch_size must be positive.")
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool = spool
+        self.put_timeout = put_timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._error: Optional[Exception] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="SubmarineAsyncMetricLogger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log_metric(self, job_id: str, metric: Metric) -> None:
+        """
+        Queue a metric to be written. Blocks while the queue is full, or spools the metric if the
+        queue stays full for ``put_timeout`` seconds and a spool is configured.
+        :param job_id: The job name to which the metric should be logged.
+        :param metric: :py:class:`submarine.entities.Metric` instance to log.
+        """
+        if self._closed:
+            raise SubmarineException("Cannot log metrics after the async logger has been closed.")
+        if self.spool is None:
+            self._queue.put((job_id, metric))
+            return
+        try:
+            self._queue.put((job_id, metric), timeout=self.put_timeout)
+        except queue.Full:
+            self.spool.append(job_id, metrics=[metric])
+
+    def flush(self) -> None:
+        """
+        Block until every metric queued so far has been written. Raises the last write error,
+        if any write failed since the previous flush.
+        """
+        self._queue.join()
+        error, self._error = self._error, None
+        if error is not None:
+            raise SubmarineException(f"Failed to write metrics asynchronously: {error}")
+
+    def close(self) -> None:
+        """
+        Write all pending metrics and stop the background thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._error is not None:
+            _logger.error("Failed to write metrics asynchronously: %s", self._error)
+
+    def _run(self) -> None:
+        stopped = False
+        while not stopped:
+            item = self._queue.get()
+            batch = []
+            if item is _STOP:
+                stopped = True
+            else:
+                batch.append(item)
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopped = True
+                        break
+                    batch.append(item)
+            self._write(batch)
+            for _ in range(len(batch) + (1 if stopped else 0)):
+                self._queue.task_done()
+
+    def _write(self, batch: List[tuple]) -> None:
+        metrics_by_job: Dict[str, List[Metric]] = defaultdict(list)
+        for job_id, metric in batch:
+            metrics_by_job[job_id].append(metric)
+        for job_id, metrics in metrics_by_job.items():
+            try:
+                self.store.log_metrics(job_id, metrics)
+            except Exception as e:
+                if self.spool is not None:
+                    _logger.warning("Spooling %d metrics of job %s: %s", len(metrics), job_id, e)
+                    try:
+                        self.spool.append(job_id, metrics=metrics)
+                        continue
+                    except Exception as spool_error:
+                        e = spool_error
+                _logger.exception("Failed to write %d metrics of job %s", len(metrics), job_id)
+                self._error = e
+            else:
+                if self.spool is not None:
+                    self.spool.replay_if_due(self.store)
@@ -13,23 +13,32 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import json
+import logging
 import os
 import re
 import tempfile
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import submarine
+from submarine.artifacts.cache import ArtifactCache
 from submarine.artifacts.repository import Repository
 from submarine.client.api.serve_client import ServeClient
 from submarine.client.utils.api_utils import generate_host
 from submarine.entities import Metric, Param
+from submarine.entities.model_registry import ModelVersion
 from submarine.exceptions import SubmarineException
+from submarine.store.database.engine import EngineConfig
+from submarine.store.model_registry.caching_store import CachingStore
 from submarine.tracking import utils
-from submarine.utils.validation import validate_metric, validate_param
+from submarine.tracking.async_logging import AsyncMetricLogger
+from submarine.tracking.spool import MetricSpool
+from submarine.utils.validation import validate_batch, validate_metric, validate_param
 
 from .constant import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, S3_ENDPOINT_URL
 
+_logger = logging.getLogger(__name__)
+
 
 class SubmarineClient:
     """
@@ -43,12 +52,33 @@ class SubmarineClient:
         aws_access_key_id: Optional[str] = None,
         aws_secret_access_key: Optional[str] = None,
         host: str = generate_host(),
+        async_logging: Optional[bool] = None,
+        spool_dir: Optional[str] = None,
+        registry_cache_ttl: Optional[float] = None,
+        engine_config: Optional[EngineConfig] = None,
     ) -> None:
         """
         :param db_uri: Address of local or remote tracking server. If not provided, defaults
                              to the service set by ``submarine.tracking.set_db_uri``. See
                              `Where Runs Get Recorded <../tracking.html#where-runs-get-recorded>`_
                              for more info.
+        :param async_logging: If True, metrics are written to the tracking server in batches by a
+                              background thread and ``log_metric`` returns without waiting for the
+                              database. If not provided, it is enabled by setting the
+                              ``SUBMARINE_ASYNC_LOGGING`` environment variable to ``true``.
+        :param spool_dir: Local directory where metrics and params are kept while the tracking
+                          server is unreachable. They are uploaded again once it recovers. If not
+                          provided, it is read from the ``SUBMARINE_SPOOL_DIR`` environment
+                          variable. Without a spool directory, store errors are raised.
+        :param registry_cache_ttl: Seconds model registry lookups are cached in memory, see
+                                   :py:mod:`submarine.store.model_registry.caching_store`. If not
+                                   provided, it is read from the
+                                   ``SUBMARINE_MODEL_REGISTRY_CACHE_TTL`` environment variable.
+                                   Defaults to no caching.
+        :param engine_config: Connection pool settings of the database engine, which the tracking
+                              and model registry stores share. If not provided, they are read
+                              from the ``SUBMARINE_DB_*`` environment variables, see
+                              :py:mod:`submarine.store.database.engine`.
         """
         # s3 endpoint url
         if s3_registry_uri is not None:
@@ -66,11 +96,21 @@ class SubmarineClient:
         elif "AWS_SECRET_ACCESS_KEY" not in os.environ:
             os.environ["AWS_SECRET_ACCESS_KEY"] = AWS_SECRET_ACCESS_KEY
         self.artifact_repo = Repository()
+        self._artifact_cache: Optional[ArtifactCache] = None
         self.db_uri = db_uri or submarine.get_db_uri()
-        self.store = utils.get_tracking_sqlalchemy_store(self.db_uri)
-        self.model_registry = utils.get_model_registry_sqlalchemy_store(self.db_uri)
+        self.store = utils.get_tracking_sqlalchemy_store(self.db_uri, engine_config)
+        self.model_registry = utils.get_model_registry_sqlalchemy_store(self.db_uri, engine_config)
+        if registry_cache_ttl is None:
+            registry_cache_ttl = utils.get_model_registry_cache_ttl()
+        if registry_cache_ttl > 0:
+            self.model_registry = CachingStore(self.model_registry, ttl=registry_cache_ttl)
         self.serve_client = ServeClient(host)
         self.experiment_id = utils.get_job_id()
+        if async_logging is None:
+            async_logging = utils.is_async_logging_enabled()
+        spool_dir = spool_dir or utils.get_spool_dir()
+        self.spool = MetricSpool(spool_dir) if spool_dir else None
+        self.async_logger = AsyncMetricLogger(self.store, spool=self.spool) if async_logging else None
 
     def log_metric(
         self,
@@ -94,7 +134,50 @@ class SubmarineClient:
         """
         validate_metric(key, value, timestamp, step)
         metric = Metric(key, value, worker_index, timestamp, step)
-        self.store.log_metric(job_id, metric)
+        if self.async_logger is not None:
+            self.async_logger.log_metric(job_id, metric)
+            return
+        try:
+            self.store.log_metric(job_id, metric)
+        except SubmarineException as e:
+            self._spool(e, job_id, metrics=[metric])
+        else:
+            self._replay_spool_if_due()
+
+    def flush(self) -> None:
+        """
+        Block until all metrics logged asynchronously have been written to the tracking server.
+        Does nothing when asynchronous logging is disabled.
+        """
+        if self.async_logger is not None:
+            self.async_logger.flush()
+
+    def replay_spool(self) -> int:
+        """
+        Upload the metrics and params kept in the spool directory while the tracking server was
+        unreachable. Does nothing when no spool directory is configured.
+        :return: The number of replayed batches.
+        """
+        self.flush()
+        if self.spool is None:
+            return 0
+        return self.spool.replay(self.store)
+
+    def _spool(
+        self,
+        error: SubmarineException,
+        job_id: str,
+        metrics: Optional[List[Metric]] = None,
+        params: Optional[List[Param]] = None,
+    ) -> None:
+        if self.spool is None:
+            raise error
+        _logger.warning("Tracking server unavailable, spooling data of job %s: %s", job_id, error)
+        self.spool.append(job_id, metrics=metrics, params=params)
+
+    def _replay_spool_if_due(self) -> None:
+        if self.spool is not None:
+            self.spool.replay_if_due(self.store)
 
     def log_param(self, job_id: str, key: str, value: str, worker_index: str) -> None:
         """
@@ -106,7 +189,81 @@ class SubmarineClient:
         """
         validate_param(key, value)
         param = Param(key, str(value), worker_index)
-        self.store.log_param(job_id, param)
+        try:
+            self.store.log_param(job_id, param)
+        except SubmarineException as e:
+            self._spool(e, job_id, params=[param])
+        else:
+            self._replay_spool_if_due()
+
+    def log_batch(
+        self, job_id: str, metrics: Optional[List[Metric]] = None, params: Optional[List[Param]] = None
+    ) -> None:
+        """
+        Log multiple metrics and params against the job name in a single request.
+        :param job_id: The job name to which the metrics and params should be logged.
+        :param metrics: A list of :py:class:`submarine.entities.Metric` instances to log.
+        :param params: A list of :py:class:`submarine.entities.Param` instances to log. Param
+                       values are converted to strings.
+        """
+        metrics = metrics or []
+        params = [Param(param.key, str(param.value), param.worker_index) for param in params or []]
+        validate_batch(metrics, params)
+        if self.async_logger is not None:
+            for metric in metrics:
+                self.async_logger.log_metric(job_id, metric)
+            metrics = []
+        if metrics or params:
+            try:
+                self.store.log_batch(job_id, metrics=metrics, params=params)
+            except SubmarineException as e:
+                self._spool(e, job_id, metrics=metrics, params=params)
+            else:
+                self._replay_spool_if_due()
+
+    def get_metric_history(
+        self,
+        job_id: str,
+        key: str,
+        worker_index: Optional[str] = None,
+        start_step: Optional[int] = None,
+        end_step: Optional[int] = None,
+        max_points: Optional[int] = None,
+    ):
+        """
+        Get the values logged for a metric. With ``max_points`` the history is downsampled by the
+        database into at most that many step buckets per worker.
+        :param job_id: The job name to which the metric was logged.
+        :param key: Metric name.
+        :param worker_index: Only return the values logged by this worker. Defaults to all workers.
+        :param start_step: Only return the values logged at or after this step.
+        :param end_step: Only return the values logged at or before this step.
+        :param max_points: Maximum number of points per worker. Defaults to the whole history.
+        :return: A :py:class:`pandas.DataFrame` with the columns ``worker_index``, ``step``,
+                 ``timestamp``, ``value``, ``min_value`` and ``max_value``.
+        """
+        self.flush()
+        return self.store.get_metric_history(job_id, key, worker_index, start_step, end_step, max_points)
+
+    def export_metrics(self, job_id: str, uri: str) -> None:
+        """
+        Archive the metrics and params of a job to a Parquet dataset. The rows are streamed from
+        the tracking server in chunks.
+        :param job_id: The job name whose metrics and params are exported.
+        :param uri: Directory to write ``metric.parquet`` and ``param.parquet`` to. It can be a
+                    local path or any URI supported by :py:mod:`submarine.utils.fileio`, such as
+                    ``s3://`` or ``hdfs://``.
+        """
+        self.flush()
+        self.store.export_metrics(job_id, uri)
+
+    def import_metrics(self, uri: str, job_id: Optional[str] = None) -> None:
+        """
+        Load metrics and params archived with ``export_metrics`` back into the tracking server.
+        :param uri: Directory that contains ``metric.parquet`` and ``param.parquet``.
+        :param job_id: The job name to import the rows to. Defaults to the exported job.
+        """
+        self.store.import_metrics(uri, job_id)
 
     def save_model(
         self,
@@ -155,15 +312,38 @@ class SubmarineClient:
                 model_type=model_type,
             )
 
-            # log artifact under the registry directory
-            self._log_artifact(
-                model,
-                f"registry/{mv.name}-{mv.version}-{model_id}/{mv.name}/{mv.version}",
-                model_type,
-                model_id,
-                input_dim,
-                output_dim,
-            )
+            # copy the artifact logged under the experiment directory to the registry directory
+            self.artifact_repo.copy_folder(dest_path, self._get_registry_artifact_path(mv))
+
+    def load_model(self, name: str, version: int):
+        """
+        Load a registered model version. The artifacts are downloaded once per node into a
+        local cache shared by all processes, see :py:class:`submarine.artifacts.cache.ArtifactCache`.
+        :param name: Registered model name.
+        :param version: Model version.
+        :return: The loaded PyTorch (TorchScript) or TensorFlow model.
+        """
+        mv = self.model_registry.get_model_version(name, version)
+        path = self._get_registry_artifact_path(mv)
+        if self._artifact_cache is None:
+            self._artifact_cache = ArtifactCache()
+        with self._artifact_cache.get(
+            mv.id, lambda dst: self.artifact_repo.download_artifacts(path, dst)
+        ) as model_dir:
+            if mv.model_type == "pytorch":
+                import submarine.models.pytorch
+
+                return submarine.models.pytorch.load_model(model_dir)
+            elif mv.model_type == "tensorflow":
+                import submarine.models.tensorflow
+
+                return submarine.models.tensorflow.load_model(model_dir)
+            else:
+                raise Exception(f"No valid type of model has been matched to {mv.model_type}")
+
+    @staticmethod
+    def _get_registry_artifact_path(mv: ModelVersion) -> str:
+        return f"registry/{mv.name}-{mv.version}-{mv.id}/{mv.name}/{mv.version}"
 
     def _log_artifact(
         self,
@@ -226,14 +406,15 @@ class SubmarineClient:
 
     def _generate_experiment_artifact_path(self, dest_path: str) -> str:
         """
+        Allocate the next numbered folder of the experiment directory. The number comes from a
+        counter in the tracking database, which serializes concurrent saves; the bucket is only
+        listed to start the counter after the folders saved before it existed.
         :param dest_path: destination of current experiment directory
         """
-        list_of_subfolder = self.artifact_repo.list_artifact_subfolder(dest_path)
-        return (
-            os.path.join(dest_path, str(len(list_of_subfolder) + 1))
-            if list_of_subfolder
-            else os.path.join(dest_path, "1")
+        number = self.store.allocate_folder_number(
+            dest_path, lambda: self.artifact_repo.next_folder_number(dest_path)
         )
+        return os.path.join(dest_path, str(number))
 
     def create_serve(self, model_name: str, model_version: int, async_req: bool = True):
         """
@@ -18,16 +18,55 @@ Submarine run. This module is exposed to users at the top-level :py:mod:`submari
 """
 
 import logging
+import os
+import threading
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 
+from submarine.entities import Metric, Param
 from submarine.tracking.client import SubmarineClient
-from submarine.tracking.utils import get_job_id, get_worker_index
+from submarine.tracking.constant import S3_ENDPOINT_URL
+from submarine.tracking.utils import get_run_context
+from submarine.utils import get_db_uri
 
 _RUN_ID_ENV_VAR = "SUBMARINE_RUN_ID"
 
 _logger = logging.getLogger(__name__)
 
+# Clients shared by the fluent API, keyed by (db_uri, s3 endpoint url). Building a client
+# creates an S3 client and the database stores, so it is done once per process.
+_clients: Dict[Tuple[str, str], SubmarineClient] = {}
+_clients_lock = threading.Lock()
+
+
+def _reset_clients() -> None:
+    """
+    Drop every cached client. Connection pools and sockets must not be shared with a forked
+    child process, so this also runs in the child after ``os.fork()``.
+    """
+    global _clients_lock
+    _clients.clear()
+    _clients_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_clients)
+
+
+def _get_client() -> SubmarineClient:
+    """
+    Get the process-wide client for the current DB URI and S3 endpoint, creating it on first use.
+    """
+    key = (get_db_uri(), os.environ.get("MLFLOW_S3_ENDPOINT_URL", S3_ENDPOINT_URL))
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = SubmarineClient(db_uri=key[0])
+                _clients[key] = client
+    return client
+
 
 def log_param(key, value):
     """
@@ -35,9 +74,8 @@ def log_param(key, value):
     :param key: Parameter name (string)
     :param value: Parameter value (string, but will be string-field if not)
     """
-    job_id = get_job_id()
-    worker_index = get_worker_index()
-    SubmarineClient().log_param(job_id, key, value, worker_index)
+    context = get_run_context()
+    _get_client().log_param(context.job_id, key, value, context.worker_index)
 
 
 def log_metric(key, value, step=None):
@@ -49,9 +87,37 @@ def log_metric(key, value, step=None):
                   SQLAlchemy store replaces +/- Inf with max / min float values.
     :param step: Metric step (int). Defaults to zero if unspecified.
     """
-    job_id = get_job_id()
-    worker_index = get_worker_index()
-    SubmarineClient().log_metric(job_id, key, value, worker_index, datetime.now(), step or 0)
+    context = get_run_context()
+    _get_client().log_metric(context.job_id, key, value, context.worker_index, datetime.now(), step or 0)
+
+
+def log_params(params: Dict[str, Any]):
+    """
+    Log a batch of parameters under the current run in a single request.
+    :param params: Dictionary of parameter name (string) to value (string, but will be
+                   string-field if not)
+    """
+    context = get_run_context()
+    _get_client().log_batch(
+        context.job_id, params=[Param(key, value, context.worker_index) for key, value in params.items()]
+    )
+
+
+def log_metrics(metrics: Dict[str, float], step: Optional[int] = None):
+    """
+    Log a batch of metrics under the current run in a single request. All the metrics share the
+    same timestamp and step.
+    :param metrics: Dictionary of metric name (string) to value (float).
+    :param step: Metric step (int). Defaults to zero if unspecified.
+    """
+    context = get_run_context()
+    timestamp = datetime.now()
+    _get_client().log_batch(
+        context.job_id,
+        metrics=[
+            Metric(key, value, context.worker_index, timestamp, step or 0) for key, value in metrics.items()
+        ],
+    )
 
 
 def save_model(
@@ -68,7 +134,7 @@ def save_model(
     :param registered_model_name: If none None, register model into the model registry with
                                   this name. If None, the model only be saved in minio pod.
     """
-    SubmarineClient().save_model(model, model_type, registered_model_name, input_dim, output_dim)
+    _get_client().save_model(model, model_type, registered_model_name, input_dim, output_dim)
 
 
 def create_serve(model_name: str, model_version: int):
@@ -77,7 +143,7 @@ def create_serve(model_name: str, model_version: int):
     :param model_name: Name of a registered model
     :param model_version: Version of a registered model
     """
-    SubmarineClient().create_serve(model_name, model_version)
+    _get_client().create_serve(model_name, model_version)
 
 
 def delete_serve(model_name: str, model_version: int):
@@ -86,4 +152,4 @@ def delete_serve(model_name: str, model_version: int):
     :param model_name: Name of a registered model
     :param model_version: Version of a registered model
     """
-    SubmarineClient().delete_serve(model_name, model_version)
+    _get_client().delete_serve(model_name, model_version)
@@ -0,0 +1,221 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Durable local spool for tracking data that could not be written to the tracking store. Rows are
+appended as JSON lines to segment files in a local directory and uploaded again with
+``log_batch`` once the store is reachable. Tracking writes are idempotent upserts, so a segment
+that is replayed twice does not create duplicate rows.
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import IO, Iterator, List, Optional, Tuple
+
+from submarine.entities import Metric, Param
+from submarine.exceptions import SubmarineException
+from submarine.store.tracking.abstract_store import AbstractStore
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+DEFAULT_REPLAY_INTERVAL = 30.0
+
+# A segment is written by a single process as "<pid>-<n>.open" and renamed to "<pid>-<n>.log"
+# once it is complete. A replayer claims a segment by renaming it to "<pid>-<n>.<its pid>.replay".
+_OPEN_SUFFIX = ".open"
+_SEALED_SUFFIX = ".log"
+_REPLAY_SUFFIX = ".replay"
+
+
+def _segment_name(path: str) -> str:
+    return os.path.basename(path).split(".", 1)[0]
+
+
+def _owner_pid(path: str) -> int:
+    """
+    :return: The process that writes (.open) or replays (.replay) the segment.
+    """
+    name = os.path.basename(path)
+    if name.endswith(_REPLAY_SUFFIX):
+        return int(name.split(".")[1])
+    return int(name.split("-", 1)[0])
+
+
+def _is_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricSpool:
+    """
+    Append-only segment log of metrics and params that are waiting to be written to the
+    tracking store. Safe to share between threads, and between processes using the same
+    directory.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        replay_interval: float = DEFAULT_REPLAY_INTERVAL,
+    ) -> None:
+        """
+        :param directory: Local directory that holds the segment files. Created if missing.
+        :param segment_size: Size in bytes after which a new segment file is started.
+        :param replay_interval: Minimum number of seconds between two replays started by
+                                ``replay_if_due``.
+        """
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.segment_size = segment_size
+        self.replay_interval = replay_interval
+        self._last_replay = time.monotonic()
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file: Optional[IO[str]] = None
+        self._path: Optional[str] = None
+        self._pid = os.getpid()
+
+    def append(
+        self, job_id: str, metrics: Optional[List[Metric]] = None, params: Optional[List[Param]] = None
+    ) -> None:
+        """
+        Durably append metrics and params of a job to the spool.
+        :param job_id: The job name to which the metrics and params belong.
+        :param metrics: A list of :py:class:`submarine.entities.Metric` instances.
+        :param params: A list of :py:class:`submarine.entities.Param` instances.
+        """
+        record = {
+            "job_id": job_id,
+            "metrics": [
+                [m.key, m.value, m.worker_index, m.timestamp.isoformat(), m.step] for m in metrics or []
+            ],
+            "params": [[p.key, p.value, p.worker_index] for p in params or []],
+        }
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            if self._pid != os.getpid():
+                # forked child: the segment belongs to the parent process
+                self._file, self._path, self._pid = None, None, os.getpid()
+            if self._file is None:
+                self._path = os.path.join(self.directory, f"{self._pid}-{time.time_ns()}{_OPEN_SUFFIX}")
+                self._file = open(self._path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if self._file.tell() >= self.segment_size:
+                self._seal()
+
+    def has_pending(self) -> bool:
+        """
+        :return: True if the spool holds rows that have not been replayed yet.
+        """
+        return any(True for _ in self._segments(include_open=True))
+
+    def close(self) -> None:
+        """
+        Seal the segment currently written by this process.
+        """
+        with self._lock:
+            self._seal()
+
+    def replay(self, store: AbstractStore) -> int:
+        """
+        Upload the spooled rows to the store and remove the replayed segments. Segments that are
+        still being written by another live process are left alone.
+        :param store: Tracking store the rows are written to.
+        :return: The number of replayed records.
+        """
+        self.close()
+        replayed = 0
+        for path in self._segments(include_open=False):
+            claimed = os.path.join(self.directory, f"{_segment_name(path)}.{os.getpid()}{_REPLAY_SUFFIX}")
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue  # claimed by another replayer
+            try:
+                for job_id, metrics, params in self._read(claimed):
+                    store.log_batch(job_id, metrics=metrics, params=params)
+                    replayed += 1
+            except Exception as e:
+                os.rename(claimed, os.path.join(self.directory, _segment_name(path) + _SEALED_SUFFIX))
+                raise SubmarineException(f"Failed to replay spooled tracking data: {e}")
+            os.remove(claimed)
+        return replayed
+
+    def replay_if_due(self, store: AbstractStore) -> int:
+        """
+        Replay the spool if it holds rows and no replay was attempted in the last
+        ``replay_interval`` seconds. Meant to be called after a successful store write, once the
+        store has recovered. Replay errors are logged rather than raised.
+        :param store: Tracking store the rows are written to.
+        :return: The number of replayed records.
+        """
+        now = time.monotonic()
+        if now - self._last_replay < self.replay_interval:
+            return 0
+        self._last_replay = now
+        if not self.has_pending():
+            return 0
+        try:
+            return self.replay(store)
+        except SubmarineException:
+            _logger.warning("Failed to replay spooled tracking data", exc_info=True)
+            return 0
+
+    def _seal(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        os.rename(self._path, os.path.join(self.directory, _segment_name(self._path) + _SEALED_SUFFIX))
+        self._file, self._path = None, None
+
+    def _segments(self, include_open: bool) -> Iterator[str]:
+        paths = glob.glob(os.path.join(self.directory, "*" + _SEALED_SUFFIX))
+        for suffix in (_OPEN_SUFFIX, _REPLAY_SUFFIX):
+            for path in glob.glob(os.path.join(self.directory, "*" + suffix)):
+                # segments of a writer or replayer that died before finishing them are picked up
+                if include_open or not _is_alive(_owner_pid(path)):
+                    paths.append(path)
+        return iter(sorted(paths, key=lambda p: _segment_name(p).split("-", 1)[1]))
+
+    @staticmethod
+    def _read(path: str) -> Iterator[Tuple[str, List[Metric], List[Param]]]:
+        with open(path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the last line is truncated if the writer crashed while appending it
+                    _logger.warning("Skipping corrupt record %d of spool segment %s", number, path)
+                    continue
+                metrics = [
+                    Metric(key, value, worker_index, datetime.fromisoformat(timestamp), step)
+                    for key, value, worker_index, timestamp, step in record["metrics"]
+                ]
+                params = [Param(key, value, worker_index) for key, value, worker_index in record["params"]]
+                yield record["job_id"], metrics, params
@@ -16,8 +16,13 @@
 
 import json
 import os
+import threading
 import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
 
+from submarine.store.database.engine import EngineConfig
 from submarine.utils import env
 
 _TRACKING_URI_ENV_VAR = "SUBMARINE_TRACKING_URI"
@@ -31,6 +36,12 @@ _TYPE = "type"
 _TASK = "task"
 _INDEX = "index"
 _RANK = "RANK"
+_CLUSTER = "cluster"
+_WORLD_SIZE = "WORLD_SIZE"
+_WORLD = "WORLD"
+# Task types of a TensorFlow cluster that train, in the order their tasks are ranked. The other
+# tasks, such as "ps" and "evaluator", are not part of the training world.
+_TRAINING_TASK_TYPES = ("chief", "master", "worker")
 
 # Extra environment variables which take precedence for setting the basic/bearer
 # auth on http requests.
@@ -39,63 +50,199 @@ _TRACKING_PASSWORD_ENV_VAR = "SUBMARINE_TRACKING_PASSWORD"
 _TRACKING_TOKEN_ENV_VAR = "SUBMARINE_TRACKING_TOKEN"
 _TRACKING_INSECURE_TLS_ENV_VAR = "SUBMARINE_TRACKING_INSECURE_TLS"
 
+# Set to "true" to write metrics from a background thread, see submarine.tracking.async_logging.
+_ASYNC_LOGGING_ENV_VAR = "SUBMARINE_ASYNC_LOGGING"
 
-def get_job_id():
+# Local directory to spool tracking data to while the store is unreachable,
+# see submarine.tracking.spool.
+_SPOOL_DIR_ENV_VAR = "SUBMARINE_SPOOL_DIR"
+
+# Seconds model registry lookups are cached for, see submarine.store.model_registry.caching_store.
+_MODEL_REGISTRY_CACHE_TTL_ENV_VAR = "SUBMARINE_MODEL_REGISTRY_CACHE_TTL"
+
+# Name of the SQLite database created inside a local "file://<dir>" store directory.
+_LOCAL_STORE_DB_NAME = "submarine.db"
+
+
+@dataclass(frozen=True)
+class RunContext:
     """
-    Get the current experiment id.
-    :return The experiment id:
+    Identity of the current process within a (distributed) training job.
     """
+
+    job_id: str
+    # "<task_type>-<task_index>", e.g. "worker-1" or "master-0"
+    worker_index: str
+    task_type: str
+    task_index: int
+    # global rank among the training tasks, -1 for the "ps" and "evaluator" tasks of a TensorFlow
+    # cluster, which do not train
+    rank: int
+    # number of training tasks
+    world_size: int
+    # parsed TF_CONFIG environment variable, empty if it is not set
+    tf_config: Dict[str, Any] = field(default_factory=dict)
+
+
+_run_context: Optional[RunContext] = None
+_run_context_lock = threading.Lock()
+
+
+def _resolve_job_id() -> str:
     # Get yarn application or K8s experiment ID when running distributed training
-    if env.get_env(_JOB_ID_ENV_VAR) is not None:
-        return env.get_env(_JOB_ID_ENV_VAR)
-    else:  # set Random ID when running local training
+    job_id = env.get_env(_JOB_ID_ENV_VAR)
+    if job_id is None:  # set Random ID when running local training
         job_id = uuid.uuid4().hex
         os.environ[_JOB_ID_ENV_VAR] = job_id
-        return job_id
+    return job_id
 
 
-def get_worker_index():
+def _rank_in_cluster(cluster: Dict[str, Any], task_type: str, task_index: int) -> Tuple[int, int]:
     """
-    Get the current worker index.
-    :return: The worker index:
+    :return: The global rank of a task of a TensorFlow cluster, chief first and then the workers,
+             and the number of training tasks.
     """
-    # Get TensorFlow worker index
+    world_size = sum(len(cluster.get(name, [])) for name in _TRAINING_TASK_TYPES)
+    if task_type not in _TRAINING_TASK_TYPES:
+        return -1, world_size
+    preceding = _TRAINING_TASK_TYPES[: _TRAINING_TASK_TYPES.index(task_type)]
+    return sum(len(cluster.get(name, [])) for name in preceding) + task_index, world_size
+
+
+def _resolve_run_context() -> RunContext:
+    tf_config: Dict[str, Any] = {}
+    cluster: Dict[str, Any] = {}
+    world_size = None
+    rank = env.get_env(_RANK)
+    # Get TensorFlow worker index, a task without index is the only one of its type
     if env.get_env(_TF_CONFIG) is not None:
         tf_config = json.loads(os.environ.get(_TF_CONFIG))
         task_config = tf_config.get(_TASK)
         task_type = task_config.get(_TYPE)
-        task_index = task_config.get(_INDEX)
-        worker_index = task_type + "-" + str(task_index)
+        task_index = int(task_config.get(_INDEX, 0))
+        cluster = tf_config.get(_CLUSTER, {})
     elif env.get_env(_CLUSTER_SPEC) is not None:
         cluster_spec = json.loads(os.environ.get(_CLUSTER_SPEC))
         task_config = cluster_spec.get(_TASK)
         task_type = task_config.get(_JOB_NAME)
-        task_index = task_config.get(_INDEX)
-        worker_index = task_type + "-" + str(task_index)
+        task_index = int(task_config.get(_INDEX, 0))
+        cluster = cluster_spec.get(_CLUSTER, {})
     # Get PyTorch worker index
-    elif env.get_env(_RANK) is not None:
-        rank = env.get_env(_RANK)
-        if rank == "0":
-            worker_index = "master-0"
-        else:
-            worker_index = "worker-" + rank
+    elif rank is not None:
+        task_type = "master" if rank == "0" else "worker"
+        task_index = int(rank)
     # Set worker index to "worker-0" When running local training
     else:
-        worker_index = "worker-0"
+        task_type = "worker"
+        task_index = 0
+
+    task_rank = task_index
+    if cluster:
+        task_rank, world_size = _rank_in_cluster(cluster, task_type, task_index)
+    world_size = env.get_env(_WORLD_SIZE) or env.get_env(_WORLD) or world_size or 1
+    return RunContext(
+        job_id=_resolve_job_id(),
+        worker_index=task_type + "-" + str(task_index),
+        task_type=task_type,
+        task_index=task_index,
+        rank=task_rank if rank is None else int(rank),
+        world_size=int(world_size),
+        tf_config=tf_config,
+    )
+
+
+def get_run_context() -> RunContext:
+    """
+    Get the identity of the current process. It is read from the environment on first use and
+    cached until ``reset_run_context`` is called or the process forks.
+    :return: The :py:class:`RunContext` of the current process.
+    """
+    global _run_context
+    context = _run_context
+    if context is None:
+        with _run_context_lock:
+            if _run_context is None:
+                _run_context = _resolve_run_context()
+            context = _run_context
+    return context
+
+
+def reset_run_context() -> None:
+    """
+    Forget the cached :py:class:`RunContext`, e.g. after changing the environment variables it
+    is read from.
+    """
+    global _run_context
+    _run_context = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_run_context)
+
+
+def get_job_id():
+    """
+    Get the current experiment id.
+    :return The experiment id:
+    """
+    return get_run_context().job_id
+
+
+def get_worker_index():
+    """
+    Get the current worker index.
+    :return: The worker index:
+    """
+    return get_run_context().worker_index
+
+
+def is_async_logging_enabled() -> bool:
+    """
+    :return: True if metrics should be logged asynchronously by default.
+    """
+    return (env.get_env(_ASYNC_LOGGING_ENV_VAR) or "").lower() in ("true", "1")
+
+
+def get_spool_dir() -> Optional[str]:
+    """
+    :return: The directory set with the ``SUBMARINE_SPOOL_DIR`` environment variable, if any.
+    """
+    return env.get_env(_SPOOL_DIR_ENV_VAR) or None
+
 
-    return worker_index
+def get_model_registry_cache_ttl() -> float:
+    """
+    :return: The TTL set with the ``SUBMARINE_MODEL_REGISTRY_CACHE_TTL`` environment variable,
+             0 if it is not set, which disables the cache.
+    """
+    return float(env.get_env(_MODEL_REGISTRY_CACHE_TTL_ENV_VAR) or 0)
+
+
+def resolve_store_uri(store_uri: str) -> str:
+    """
+    Map a local "file://<dir>" store URI to the SQLite database kept in that directory, so that
+    local and CI runs can track without a database server. Other URIs are returned unchanged.
+    :param store_uri: The store URI, e.g. "file:///tmp/submarine" or "mysql+pymysql://...".
+    :return: A SQLAlchemy database URI.
+    """
+    parsed = urlparse(store_uri)
+    if parsed.scheme != "file":
+        return store_uri
+    directory = os.path.abspath(os.path.expanduser(parsed.netloc + parsed.path))
+    os.makedirs(directory, exist_ok=True)
+    return "sqlite:///" + os.path.join(directory, _LOCAL_STORE_DB_NAME)
 
 
-def get_tracking_sqlalchemy_store(store_uri: str):
+def get_tracking_sqlalchemy_store(store_uri: str, engine_config: Optional[EngineConfig] = None):
     from submarine.store.tracking.sqlalchemy_store import SqlAlchemyStore
 
-    return SqlAlchemyStore(store_uri)
+    return SqlAlchemyStore(resolve_store_uri(store_uri), engine_config)
 
 
-def get_model_registry_sqlalchemy_store(store_uri: str):
+def get_model_registry_sqlalchemy_store(store_uri: str, engine_config: Optional[EngineConfig] = None):
     from submarine.store.model_registry.sqlalchemy_store import SqlAlchemyStore
 
-    return SqlAlchemyStore(store_uri)
+    return SqlAlchemyStore(resolve_store_uri(store_uri), engine_config)
 
 
 def generate_model_id() -> str:
@@ -15,7 +15,7 @@
 
 import io
 from pathlib import Path
-from typing import Tuple
+from typing import List, Tuple
 from urllib.parse import urlparse
 
 from pyarrow import fs
@@ -54,6 +54,36 @@ def open_output_stream(uri: str):
     return filesystem.open_output_stream(path)
 
 
+def create_dir(uri: str) -> None:
+    filesystem, path = _parse_uri(uri)
+    filesystem.create_dir(path, recursive=True)
+
+
+def move(src_uri: str, dst_uri: str) -> None:
+    filesystem, src_path = _parse_uri(src_uri)
+    _, dst_path = _parse_uri(dst_uri)
+    filesystem.move(src_path, dst_path)
+
+
+def delete_file(uri: str) -> None:
+    filesystem, path = _parse_uri(uri)
+    filesystem.delete_file(path)
+
+
+def delete_dir(uri: str) -> None:
+    filesystem, path = _parse_uri(uri)
+    filesystem.delete_dir(path)
+
+
+def list_dir(uri: str) -> List[str]:
+    """
+    :return: The names of the entries of a directory, or an empty list if it does not exist.
+    """
+    filesystem, path = _parse_uri(uri)
+    infos = filesystem.get_file_info(fs.FileSelector(path, allow_not_found=True))
+    return [info.base_name for info in infos]
+
+
 def file_info(uri: str) -> fs.FileInfo:
     filesystem, path = _parse_uri(uri)
     (info,) = filesystem.get_file_info([path])
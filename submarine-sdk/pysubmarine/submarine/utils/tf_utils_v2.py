@@ -13,18 +13,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
-import os
-
 import tensorflow as tf
 
 from submarine.ml.tensorflow_v2.optimizer import get_optimizer
+from submarine.tracking.utils import get_run_context
 
 
 def _get_session_config_from_env_var(params):
     """Returns a tf.ConfigProto instance with appropriate device_filters set."""
     tf.compat.v1.disable_v2_behavior()
-    tf_config = json.loads(os.environ.get("TF_CONFIG", "{}"))
+    tf_config = get_run_context().tf_config
 
     if tf_config and "task" in tf_config and "type" in tf_config["task"] and "index" in tf_config["task"]:
         # Master should only communicate with itself and ps.
@@ -115,6 +115,17 @@ def validate_param(key, value) -> None:
     _validate_length_limit("Param value", MAX_PARAM_VAL_LENGTH, str(value))
 
 
+def validate_batch(metrics, params) -> None:
+    """
+    Check that every metric and param of a batch is valid and raise an exception for the first
+    one that isn't.
+    """
+    for metric in metrics:
+        validate_metric(metric.key, metric.value, metric.timestamp, metric.step)
+    for param in params:
+        validate_param(param.key, param.value)
+
+
 def validate_tags(tags: Optional[List[str]]) -> None:
     if tags is not None and not isinstance(tags, list):
         raise SubmarineException("parameter tags must be list or None.")
@@ -0,0 +1,89 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import fcntl
+import os
+
+from submarine.artifacts.cache import ArtifactCache
+
+
+def _writer(size):
+    def download(dst):
+        os.makedirs(dst)
+        with open(os.path.join(dst, "model.pt"), "wb") as f:
+            f.write(b"x" * size)
+
+    return download
+
+
+def test_entry_is_downloaded_once(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_size=1000)
+    calls = []
+
+    def download(dst):
+        calls.append(dst)
+        _writer(10)(dst)
+
+    for _ in range(3):
+        with cache.get("model-1", download) as path:
+            assert path == str(tmp_path / "model-1")
+            with open(os.path.join(path, "model.pt"), "rb") as f:
+                assert f.read() == b"x" * 10
+    assert len(calls) == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_size=250)
+    for key in ["model-1", "model-2"]:
+        with cache.get(key, _writer(100)):
+            pass
+    # model-1 becomes the most recently used entry
+    with cache.get("model-1", _writer(100)):
+        pass
+    with cache.get("model-3", _writer(100)):
+        pass
+    assert sorted(os.listdir(str(tmp_path))) == [".locks", "model-1", "model-3"]
+
+
+def test_entries_in_use_are_not_evicted(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_size=150)
+    with cache.get("model-1", _writer(100)):
+        # another process holds a shared lock on model-2 while it loads it
+        with cache.get("model-2", _writer(100)):
+            pass
+        with open(str(tmp_path / ".locks" / "model-2.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            cache.evict()
+            assert os.path.exists(str(tmp_path / "model-2"))
+        cache.evict()
+        assert os.path.exists(str(tmp_path / "model-1"))
+        assert not os.path.exists(str(tmp_path / "model-2"))
+
+
+def test_failed_download_is_not_cached(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_size=1000)
+
+    def failing_download(dst):
+        os.makedirs(dst)
+        raise IOError("connection reset")
+
+    try:
+        with cache.get("model-1", failing_download):
+            pass
+    except IOError:
+        pass
+    assert sorted(os.listdir(str(tmp_path))) == [".locks"]
+    with cache.get("model-1", _writer(10)) as path:
+        assert os.path.exists(os.path.join(path, "model.pt"))
@@ -15,13 +15,22 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import json
 import pathlib
 import shutil
+import threading
+from collections import defaultdict
+from unittest import mock
 
 import boto3
+import pytest
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
 from moto import mock_s3
 
 from submarine.artifacts import Repository
+from submarine.artifacts.repository import CHUNK_SIZE
+from submarine.exceptions import SubmarineException
 
 
 @mock_s3
@@ -76,6 +85,185 @@ def test_log_artifacts():
     assert common_prefixes == [{'Prefix': 'data/subdir-00/'}, {'Prefix': 'data/subdir-01/'}]
 
 
+@mock_s3
+def test_upload_artifacts(tmp_path):
+    s3 = boto3.resource("s3")
+    s3.create_bucket(Bucket="submarine")
+
+    (tmp_path / "variables").mkdir()
+    for i in range(20):
+        (tmp_path / "variables" / f"shard-{i:02d}").write_bytes(b"x" * i)
+    (tmp_path / "saved_model.pb").write_bytes(b"model")
+
+    progress = defaultdict(int)
+    lock = threading.Lock()
+
+    def on_progress(key, n):
+        with lock:
+            progress[key] += n
+
+    repo = Repository(max_workers=4)
+    manifest = repo.upload_artifacts("model/1", str(tmp_path), progress=on_progress)
+
+    assert [entry["key"] for entry in manifest] == ["model/1/saved_model.pb"] + [
+        f"model/1/variables/shard-{i:02d}" for i in range(20)
+    ]
+    assert {entry["key"]: entry["size"] for entry in manifest} == {
+        **progress,
+        "model/1/variables/shard-00": 0,
+    }
+    assert all(entry["attempts"] == 1 for entry in manifest)
+    obj = s3.Object("submarine", "model/1/variables/shard-07").get()
+    assert obj["Body"].read() == b"x" * 7
+
+
+def test_connection_pool_fits_concurrent_transfers():
+    assert Repository().client.meta.config.max_pool_connections == 32
+    repo = Repository(max_workers=2, transfer_config=TransferConfig(max_concurrency=3))
+    assert repo.client.meta.config.max_pool_connections == 6
+
+
+@mock_s3
+def test_upload_artifacts_retries(tmp_path):
+    s3 = boto3.resource("s3")
+    s3.create_bucket(Bucket="submarine")
+    (tmp_path / "model.pt").write_bytes(b"model")
+
+    repo = Repository(max_attempts=2)
+    upload_file = repo.client.upload_file
+    failures = iter([S3UploadFailedError("connection reset")])
+
+    def flaky_upload_file(**kwargs):
+        error = next(failures, None)
+        if error is not None:
+            raise error
+        return upload_file(**kwargs)
+
+    with mock.patch.object(repo.client, "upload_file", side_effect=flaky_upload_file), mock.patch(
+        "submarine.artifacts.repository._RETRY_BACKOFF", 0
+    ):
+        manifest = repo.upload_artifacts("model/1", str(tmp_path))
+    assert manifest == [{"key": "model/1/model.pt", "size": 5, "attempts": 2}]
+
+    with mock.patch.object(
+        repo.client, "upload_file", side_effect=S3UploadFailedError("connection reset")
+    ), mock.patch("submarine.artifacts.repository._RETRY_BACKOFF", 0):
+        with pytest.raises(SubmarineException, match="Failed to upload 1 of 1 files"):
+            repo.upload_artifacts("model/2", str(tmp_path))
+
+
+@mock_s3
+def test_upload_artifacts_content_addressed(tmp_path):
+    s3 = boto3.resource("s3")
+    s3.create_bucket(Bucket="submarine")
+    weights = tmp_path / "weights.bin"
+    weights.write_bytes(b"a" * CHUNK_SIZE + b"b" * CHUNK_SIZE + b"c")
+    (tmp_path / "description.json").write_bytes(b"{}")
+
+    repo = Repository(content_addressed=True)
+    assert repo.log_artifacts("experiment/1/1", str(tmp_path)) == "s3://submarine/experiment/1/1"
+    manifest = json.loads(s3.Object("submarine", "experiment/1/1/manifest.json").get()["Body"].read())
+    assert [entry["path"] for entry in manifest["files"]] == ["description.json", "weights.bin"]
+    assert manifest["files"][1]["size"] == 2 * CHUNK_SIZE + 1
+    assert len(manifest["files"][1]["chunks"]) == 3
+    assert len(list(s3.Bucket("submarine").objects.filter(Prefix="chunks/"))) == 4
+
+    # a fine-tuned version only changes the last chunk; a fresh repository still skips the others
+    weights.write_bytes(b"a" * CHUNK_SIZE + b"b" * CHUNK_SIZE + b"d")
+    repo = Repository(content_addressed=True)
+    with mock.patch.object(repo.client, "put_object", wraps=repo.client.put_object) as put_object:
+        manifest = repo.upload_artifacts_content_addressed("experiment/1/2", str(tmp_path))
+    assert sorted(c.kwargs["Key"] for c in put_object.call_args_list) == [
+        f"chunks/{manifest['files'][1]['chunks'][2]}",
+        "experiment/1/2/manifest.json",
+    ]
+    assert len(list(s3.Bucket("submarine").objects.filter(Prefix="chunks/"))) == 5
+
+
+@mock_s3
+def test_download_artifacts(tmp_path):
+    s3 = boto3.resource("s3")
+    s3.create_bucket(Bucket="submarine")
+    src = tmp_path / "src"
+    (src / "variables").mkdir(parents=True)
+    (src / "variables" / "variables.data").write_bytes(b"w" * 1000)
+    (src / "saved_model.pb").write_bytes(b"model")
+
+    repo = Repository()
+    repo.upload_artifacts("registry/model-1", str(src))
+    Repository(content_addressed=True).log_artifacts("registry/model-2", str(src))
+
+    for path in ["registry/model-1", "registry/model-2"]:
+        dst = tmp_path / path
+        assert repo.download_artifacts(path, str(dst)) == str(dst)
+        assert (dst / "saved_model.pb").read_bytes() == b"model"
+        assert (dst / "variables" / "variables.data").read_bytes() == b"w" * 1000
+    assert not (tmp_path / "registry/model-2" / "manifest.json").exists()
+
+    download_file = repo.client.download_file
+
+    def corrupted_download_file(Bucket, Key, Filename, Config):
+        download_file(Bucket=Bucket, Key=Key, Filename=Filename, Config=Config)
+        # same size, so only the MD5 of the content can catch it
+        with open(Filename, "r+b") as f:
+            f.write(b"M")
+
+    with mock.patch.object(repo.client, "download_file", side_effect=corrupted_download_file):
+        with pytest.raises(SubmarineException, match="Checksum mismatch in downloaded file"):
+            repo.download_artifacts("registry/model-1", str(tmp_path / "model-1"))
+    with pytest.raises(SubmarineException, match="No artifacts found"):
+        repo.download_artifacts("registry/model-3", str(tmp_path / "model-3"))
+
+
+@mock_s3
+def test_download_artifacts_verifies_chunks(tmp_path):
+    s3 = boto3.resource("s3")
+    s3.create_bucket(Bucket="submarine")
+    (tmp_path / "model.pt").write_bytes(b"model")
+    repo = Repository(content_addressed=True)
+    manifest = repo.upload_artifacts_content_addressed("registry/model-1", str(tmp_path))
+    (chunk_hash,) = manifest["files"][0]["chunks"]
+    s3.Object("submarine", f"chunks/{chunk_hash}").put(Body=b"corrupted")
+
+    with pytest.raises(SubmarineException, match="Checksum mismatch in chunk"):
+        repo.download_artifacts("registry/model-1", str(tmp_path / "dst"))
+
+
+@mock_s3
+def test_copy_folder(tmp_path):
+    s3 = boto3.resource("s3")
+    s3.create_bucket(Bucket="submarine")
+    (tmp_path / "variables").mkdir()
+    (tmp_path / "variables" / "variables.index").write_bytes(b"index")
+    (tmp_path / "saved_model.pb").write_bytes(b"model")
+
+    repo = Repository()
+    repo.upload_artifacts("experiment/1/1", str(tmp_path))
+    repo.upload_artifacts("experiment/1/10", str(tmp_path))
+    manifest = repo.copy_folder("experiment/1/1", "registry/model-1/model/1")
+
+    assert manifest == [
+        {"key": "registry/model-1/model/1/saved_model.pb", "size": 5},
+        {"key": "registry/model-1/model/1/variables/variables.index", "size": 5},
+    ]
+    obj = s3.Object("submarine", "registry/model-1/model/1/variables/variables.index").get()
+    assert obj["Body"].read() == b"index"
+
+
+@mock_s3
+def test_next_folder_number():
+    s3 = boto3.resource("s3")
+    s3.create_bucket(Bucket="submarine")
+    repo = Repository()
+    assert repo.next_folder_number("experiment/1") == 1
+
+    for number in [1, 2, 5]:
+        s3.Object("submarine", f"experiment/1/{number}/model.pt").put(Body=b"model")
+    s3.Object("submarine", "experiment/1/notes/readme.txt").put(Body=b"notes")
+    s3.Object("submarine", "experiment/1/7.txt").put(Body=b"not a folder")
+    assert repo.next_folder_number("experiment/1") == 6
+
+
 @mock_s3
 def test_delete_folder():
     s3 = boto3.resource("s3")
@@ -94,3 +282,32 @@ def test_delete_folder():
 
     common_prefixes = repo.list_artifact_subfolder("folder01")
     assert common_prefixes == [{"Prefix": "folder01/subfolder02/"}]
+
+
+@mock_s3
+def test_delete_folder_with_many_objects():
+    s3 = boto3.resource("s3")
+    s3.create_bucket(Bucket="submarine")
+    for i in range(1100):
+        s3.meta.client.put_object(Bucket="submarine", Key=f"experiment/1/1/ckpt-{i}", Body=b"")
+    s3.meta.client.put_object(Bucket="submarine", Key="experiment/10/1/model.pt", Body=b"")
+
+    repo = Repository(max_workers=2)
+    with mock.patch.object(repo.client, "delete_objects", wraps=repo.client.delete_objects) as delete_objects:
+        report = repo.delete_folder("experiment/1")
+    assert report == {"deleted": 1100, "errors": []}
+    assert delete_objects.call_count == 2
+    assert [obj.key for obj in s3.Bucket("submarine").objects.all()] == ["experiment/10/1/model.pt"]
+
+
+@mock_s3
+def test_delete_folder_reports_errors():
+    s3 = boto3.resource("s3")
+    s3.create_bucket(Bucket="submarine")
+    s3.meta.client.put_object(Bucket="submarine", Key="experiment/1/1/model.pt", Body=b"")
+    s3.meta.client.put_object(Bucket="submarine", Key="experiment/1/2/model.pt", Body=b"")
+
+    repo = Repository()
+    error = {"Key": "experiment/1/2/model.pt", "Code": "AccessDenied", "Message": "Access Denied"}
+    with mock.patch.object(repo.client, "delete_objects", return_value={"Errors": [error]}):
+        assert repo.delete_folder("experiment/1") == {"deleted": 1, "errors": [error]}
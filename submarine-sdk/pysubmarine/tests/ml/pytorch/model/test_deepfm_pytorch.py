@@ -13,6 +13,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import gc
+import logging
+import multiprocessing
+import os
+from unittest import mock
+
+import torch
+
+from submarine.ml.pytorch.checkpoint import list_checkpoints
 from submarine.ml.pytorch.model.ctr import DeepFM
 
 
@@ -23,3 +32,100 @@ def test_run_deepfm(get_model_param):
     trainer.fit()
     trainer.evaluate()
     trainer.predict()
+
+
+def test_deepfm_async_checkpoint(get_model_param):
+    param = get_model_param
+    param["output"]["async_checkpoint"] = True
+
+    trainer = DeepFM(param)
+    trainer.fit()
+    save_model_dir = param["output"]["save_model_dir"]
+    assert list_checkpoints(save_model_dir) == ["ckpt-00000000.pkl"]
+    assert os.listdir(save_model_dir) == ["ckpt-00000000.pkl"]
+
+
+def test_deepfm_sharded_checkpoint(get_model_param):
+    param = get_model_param
+    param["output"]["sharded_checkpoint"] = True
+
+    trainer = DeepFM(param)
+    trainer.fit()
+    save_model_dir = param["output"]["save_model_dir"]
+    assert list_checkpoints(save_model_dir) == ["ckpt-00000000"]
+    state = {key: value.clone() for key, value in trainer.model.module.state_dict().items()}
+
+    with torch.no_grad():
+        trainer.model.module.feature_embedding.weight.weight.zero_()
+    assert trainer.load_checkpoint() == 0
+    for key, value in trainer.model.module.state_dict().items():
+        assert torch.equal(value, state[key])
+
+
+def test_deepfm_logs_checkpoint_errors_when_deleted(get_model_param, caplog):
+    param = get_model_param
+    param["output"]["async_checkpoint"] = True
+
+    trainer = DeepFM(param)
+    with mock.patch("torch.save", side_effect=IOError("disk full")):
+        trainer.save_checkpoint(0)
+        trainer.checkpoint_writer._pending.exception()
+    with caplog.at_level(logging.ERROR):
+        del trainer
+        gc.collect()
+    assert "Failed to write the last checkpoint" in caplog.text
+    assert "disk full" in caplog.text
+
+
+def _fit_rank(param, rank, eval_scores, init_method):
+    os.environ.update({"RANK": str(rank), "WORLD_SIZE": "2", "INIT_METHOD": init_method})
+    trainer = DeepFM(param)
+    with mock.patch.object(trainer, "evaluate", side_effect=eval_scores):
+        # rank 0 decides which epochs are saved
+        assert trainer.fit() == 0.6
+
+
+def test_deepfm_sharded_checkpoint_with_several_ranks(get_model_param, tmp_path):
+    param = get_model_param
+    param["output"]["sharded_checkpoint"] = True
+    param["training"]["num_epochs"] = 3
+    # one batch of 5 rows per rank, batch norm needs more than one row
+    param["training"]["batch_size"] = 5
+    # each rank scores a different part of the validation data
+    eval_scores = [[0.5, 0.4, 0.6], [0.5, 0.7, 0.6]]
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_fit_rank, args=(param, rank, eval_scores[rank], f"file://{tmp_path}/init"))
+        for rank in range(2)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=300)
+    assert [process.exitcode for process in processes] == [0, 0]
+    save_model_dir = param["output"]["save_model_dir"]
+    assert list_checkpoints(save_model_dir)[-1] == "ckpt-00000002"
+    assert "ckpt-00000001" not in os.listdir(save_model_dir)
+
+
+def test_deepfm_incremental_checkpoint(get_model_param):
+    param = get_model_param
+    param["output"]["incremental_checkpoint"] = True
+    param["output"]["keep_checkpoints"] = 2
+    param["output"]["shard_min_rows"] = 1000
+
+    trainer = DeepFM(param)
+    trainer.fit()
+    with torch.no_grad():
+        trainer.model.module.feature_embedding.weight.weight[:3] += 1
+    trainer.save_checkpoint(1)
+    save_model_dir = param["output"]["save_model_dir"]
+    assert list_checkpoints(save_model_dir) == ["ckpt-00000000.pkl", "ckpt-00000001.delta.pkl"]
+    state = {key: value.clone() for key, value in trainer.model.module.state_dict().items()}
+
+    with torch.no_grad():
+        trainer.model.module.feature_embedding.weight.weight.zero_()
+    assert trainer.load_checkpoint() == 1
+    for key, value in trainer.model.module.state_dict().items():
+        assert torch.equal(value, state[key])
@@ -0,0 +1,296 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import threading
+from unittest import mock
+
+import numpy as np
+import pytest
+import torch
+
+from submarine.ml.pytorch.checkpoint import (
+    CheckpointWriter,
+    list_checkpoints,
+    load_checkpoint,
+    read_sharded_tensor,
+)
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_checkpoint_writer_keeps_last_checkpoints(tmp_path, asynchronous):
+    writer = CheckpointWriter(str(tmp_path / "ckpt"), keep_checkpoints=2, asynchronous=asynchronous)
+    for step in range(4):
+        writer.save({"model": {"weight": torch.full((2, 2), float(step))}}, step)
+    writer.close()
+
+    assert list_checkpoints(str(tmp_path / "ckpt")) == ["ckpt-00000002.pkl", "ckpt-00000003.pkl"]
+    assert sorted(os.listdir(str(tmp_path / "ckpt"))) == ["ckpt-00000002.pkl", "ckpt-00000003.pkl"]
+    state = torch.load(str(tmp_path / "ckpt" / "ckpt-00000003.pkl"))
+    assert torch.equal(state["model"]["weight"], torch.full((2, 2), 3.0))
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_checkpoint_writer_with_several_ranks(tmp_path, asynchronous):
+    checkpoint_dir = str(tmp_path)
+    writers = [
+        CheckpointWriter(checkpoint_dir, asynchronous=asynchronous, rank=rank, world_size=2)
+        for rank in range(2)
+    ]
+    # the ranks would race on the same temporary file, rank 0 writes the checkpoints alone
+    writers[1].save({"weight": torch.zeros(2)}, 0)
+    writers[1].close()
+    assert os.listdir(checkpoint_dir) == []
+    for step in range(2):
+        for writer in writers:
+            writer.save({"weight": torch.full((2,), float(step))}, step)
+    for writer in writers:
+        writer.close()
+
+    assert sorted(os.listdir(checkpoint_dir)) == ["ckpt-00000001.pkl"]
+    assert torch.equal(load_checkpoint(checkpoint_dir)[1]["weight"], torch.ones(2))
+
+
+def test_async_checkpoint_does_not_block_training(tmp_path):
+    writer = CheckpointWriter(str(tmp_path), asynchronous=True)
+    weight = torch.zeros(3)
+    release = threading.Event()
+    save = torch.save
+
+    def slow_save(*args, **kwargs):
+        release.wait()
+        save(*args, **kwargs)
+
+    with mock.patch("torch.save", side_effect=slow_save):
+        writer.save({"weight": weight}, 1)
+        # training goes on updating the parameters while the checkpoint is written
+        weight += 1
+        assert list_checkpoints(str(tmp_path)) == []
+        release.set()
+        writer.wait()
+    writer.close()
+
+    state = torch.load(str(tmp_path / "ckpt-00000001.pkl"))
+    assert torch.equal(state["weight"], torch.zeros(3))
+
+
+def test_async_checkpoint_errors_are_raised(tmp_path):
+    writer = CheckpointWriter(str(tmp_path), asynchronous=True)
+    with mock.patch("torch.save", side_effect=IOError("disk full")):
+        writer.save({"weight": torch.zeros(1)}, 1)
+        with pytest.raises(IOError, match="disk full"):
+            writer.wait()
+    writer.close()
+    assert os.listdir(str(tmp_path)) == []
+
+    # close raises the error as well, once the background thread is stopped
+    with mock.patch("torch.save", side_effect=IOError("disk full")):
+        writer.save({"weight": torch.zeros(1)}, 2)
+        with pytest.raises(IOError, match="disk full"):
+            writer.close()
+    assert writer._executor is None
+
+
+def _state(step):
+    embedding = torch.arange(300 * 4, dtype=torch.float32).reshape(300, 4) + step
+    return {
+        "model": {"embedding.weight": embedding, "bias": torch.full((4,), float(step))},
+        "optimizer": {"state": {0: {"exp_avg": embedding * 2}}, "param_groups": [{"lr": 0.1, "params": [0]}]},
+    }
+
+
+def test_sharded_checkpoint(tmp_path):
+    checkpoint_dir = str(tmp_path)
+    writers = [
+        CheckpointWriter(
+            checkpoint_dir, keep_checkpoints=1, sharded=True, rank=rank, world_size=3, shard_min_rows=100
+        )
+        for rank in range(3)
+    ]
+    for step in range(2):
+        writers[0].save(_state(step), step)
+        # not complete until every rank wrote its rows
+        assert list_checkpoints(checkpoint_dir)[-1:] != [f"ckpt-{step:08d}"]
+        for writer in writers[1:]:
+            writer.save(_state(step), step)
+        assert list_checkpoints(checkpoint_dir)[-1] == f"ckpt-{step:08d}"
+    writers[0].save(_state(2), 2)
+    # the previous checkpoint is pruned once the new one is complete
+    assert sorted(os.listdir(checkpoint_dir)) == ["ckpt-00000001", "ckpt-00000002"]
+
+    path = os.path.join(checkpoint_dir, "ckpt-00000001")
+    assert sorted(name for name in os.listdir(path) if name.startswith("t0.")) == [
+        "t0.r0.npy",
+        "t0.r1.npy",
+        "t0.r2.npy",
+    ]
+    step, state = load_checkpoint(checkpoint_dir)
+    expected = _state(1)
+    assert step == 1
+    assert torch.equal(state["model"]["embedding.weight"], expected["model"]["embedding.weight"])
+    assert torch.equal(state["model"]["bias"], expected["model"]["bias"])
+    assert torch.equal(
+        state["optimizer"]["state"][0]["exp_avg"], expected["optimizer"]["state"][0]["exp_avg"]
+    )
+    assert state["optimizer"]["param_groups"] == expected["optimizer"]["param_groups"]
+    # rows spanning two shards
+    assert torch.equal(read_sharded_tensor(path, 0, 90, 110), expected["model"]["embedding.weight"][90:110])
+
+
+def test_sharded_checkpoint_of_live_parameters(tmp_path):
+    checkpoint_dir = str(tmp_path)
+    embedding = torch.nn.Embedding(300, 4)
+    state = {"model": embedding.state_dict(keep_vars=True)}
+    assert state["model"]["weight"].requires_grad
+    # without async_checkpoint, the live parameters are written, not a CPU snapshot of them
+    for rank in range(2):
+        CheckpointWriter(checkpoint_dir, sharded=True, rank=rank, world_size=2, shard_min_rows=100).save(
+            state, 0
+        )
+    _, loaded = load_checkpoint(checkpoint_dir)
+    assert torch.equal(loaded["model"]["weight"], embedding.weight.detach())
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_sharded_checkpoint_of_transposed_tensor(tmp_path, asynchronous):
+    checkpoint_dir = str(tmp_path)
+    weight = torch.arange(4 * 300, dtype=torch.float32).reshape(4, 300).t()
+    assert not weight.is_contiguous()
+    for rank in range(2):
+        writer = CheckpointWriter(
+            checkpoint_dir,
+            asynchronous=asynchronous,
+            sharded=True,
+            rank=rank,
+            world_size=2,
+            shard_min_rows=100,
+        )
+        writer.save({"weight": weight}, 0)
+        writer.close()
+    _, loaded = load_checkpoint(checkpoint_dir)
+    assert torch.equal(loaded["weight"], weight)
+
+    # rows cannot be read from a shard in Fortran order
+    path = os.path.join(checkpoint_dir, "ckpt-00000000")
+    np.save(os.path.join(path, "t0.r0.npy"), np.asfortranarray(weight[:150].numpy()))
+    with pytest.raises(ValueError, match="Fortran order"):
+        read_sharded_tensor(path, 0)
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_incremental_checkpoint(tmp_path, asynchronous):
+    checkpoint_dir = str(tmp_path)
+    writer = CheckpointWriter(
+        checkpoint_dir,
+        keep_checkpoints=2,
+        asynchronous=asynchronous,
+        shard_min_rows=100,
+        incremental=True,
+        full_checkpoint_interval=3,
+    )
+    state = _state(0)
+    embedding = state["model"]["embedding.weight"]
+    for step in range(5):
+        embedding[step * 10 : step * 10 + 2] += 1
+        state["model"]["bias"] += 1
+        writer.save(state, step)
+    writer.close()
+
+    # the last two checkpoints are deltas, kept with the full checkpoint they are based on
+    assert list_checkpoints(checkpoint_dir) == [
+        "ckpt-00000003.pkl",
+        "ckpt-00000004.delta.pkl",
+    ]
+    delta = torch.load(os.path.join(checkpoint_dir, "ckpt-00000004.delta.pkl"))
+    assert delta["parent"] == "ckpt-00000003.pkl"
+    changed, values = delta["rows"][0]
+    assert changed.tolist() == [40, 41]
+    assert torch.equal(values, embedding[40:42])
+    # the optimizer state did not change
+    assert delta["rows"][1][0].tolist() == []
+
+    step, loaded = load_checkpoint(checkpoint_dir)
+    assert step == 4
+    assert torch.equal(loaded["model"]["embedding.weight"], embedding)
+    assert torch.equal(loaded["model"]["bias"], state["model"]["bias"])
+    assert loaded["optimizer"] == {
+        "state": {0: {"exp_avg": mock.ANY}},
+        "param_groups": [{"lr": 0.1, "params": [0]}],
+    }
+
+
+def test_incremental_checkpoint_replays_deltas(tmp_path):
+    checkpoint_dir = str(tmp_path)
+    writer = CheckpointWriter(checkpoint_dir, keep_checkpoints=3, shard_min_rows=100, incremental=True)
+    state = _state(0)
+    embedding = state["model"]["embedding.weight"]
+    expected = []
+    for step in range(3):
+        embedding[step] = -1.0
+        writer.save(state, step)
+        expected.append(embedding.clone())
+    writer.close()
+
+    assert list_checkpoints(checkpoint_dir) == [
+        "ckpt-00000000.pkl",
+        "ckpt-00000001.delta.pkl",
+        "ckpt-00000002.delta.pkl",
+    ]
+    for step, name in enumerate(list_checkpoints(checkpoint_dir)):
+        assert torch.equal(
+            load_checkpoint(checkpoint_dir, name)[1]["model"]["embedding.weight"], expected[step]
+        )
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_incremental_checkpoint_with_several_ranks(tmp_path, asynchronous):
+    checkpoint_dir = str(tmp_path)
+    writers = [
+        CheckpointWriter(
+            checkpoint_dir,
+            keep_checkpoints=3,
+            asynchronous=asynchronous,
+            rank=rank,
+            world_size=2,
+            shard_min_rows=100,
+            incremental=True,
+        )
+        for rank in range(2)
+    ]
+    state = _state(0)
+    embedding = state["model"]["embedding.weight"]
+    for step in range(3):
+        embedding[step] = -1.0
+        for writer in writers:
+            writer.save(state, step)
+    for writer in writers:
+        writer.close()
+
+    assert writers[1]._base is None
+    assert sorted(os.listdir(checkpoint_dir)) == [
+        "ckpt-00000000.pkl",
+        "ckpt-00000001.delta.pkl",
+        "ckpt-00000002.delta.pkl",
+    ]
+    assert torch.equal(load_checkpoint(checkpoint_dir)[1]["model"]["embedding.weight"], embedding)
+
+
+def test_incremental_checkpoint_cannot_be_sharded(tmp_path):
+    with pytest.raises(ValueError, match="cannot be sharded"):
+        CheckpointWriter(str(tmp_path), sharded=True, incremental=True)
+
+
+def test_load_checkpoint_without_checkpoints(tmp_path):
+    assert load_checkpoint(str(tmp_path)) is None
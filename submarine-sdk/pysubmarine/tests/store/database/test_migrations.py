@@ -0,0 +1,73 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sqlalchemy
+
+from submarine.store.database import migrations
+from submarine.store.database.models import (
+    Base,
+    SqlArtifactFolderCounter,
+    SqlMetric,
+    SqlModelVersionTag,
+    SqlRegisteredModelTag,
+    SqlSchemaVersion,
+)
+from submarine.store.tracking.sqlalchemy_store import SqlAlchemyStore
+
+METRIC_INDEX = "metric_id_key_worker_index_step_idx"
+TAG_INDEXES = {
+    SqlRegisteredModelTag.__tablename__: "registered_model_tag_tag_name_idx",
+    SqlModelVersionTag.__tablename__: "model_version_tag_tag_name_version_idx",
+}
+
+
+def _get_index_names(engine, table_name):
+    return {index["name"] for index in sqlalchemy.inspect(engine).get_indexes(table_name)}
+
+
+def test_new_database_is_at_latest_version(tmp_path):
+    store = SqlAlchemyStore(f"sqlite:///{tmp_path}/submarine.db")
+    assert migrations.get_schema_version(store.engine) == migrations.LATEST_SCHEMA_VERSION
+    assert METRIC_INDEX in _get_index_names(store.engine, SqlMetric.__tablename__)
+    for table_name, index in TAG_INDEXES.items():
+        assert index in _get_index_names(store.engine, table_name)
+
+
+def test_upgrade_existing_database(tmp_path):
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path}/submarine.db")
+    # a database created before the schema was versioned
+    new_tables = {SqlSchemaVersion.__tablename__, SqlArtifactFolderCounter.__tablename__}
+    tables = [table for table in Base.metadata.sorted_tables if table.name not in new_tables]
+    Base.metadata.create_all(engine, tables=tables)
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.text(f"DROP INDEX {METRIC_INDEX}"))
+        for index in TAG_INDEXES.values():
+            connection.execute(sqlalchemy.text(f"DROP INDEX {index}"))
+    assert migrations.get_schema_version(engine) == 0
+    assert METRIC_INDEX not in _get_index_names(engine, SqlMetric.__tablename__)
+
+    migrations.upgrade(engine)
+    assert migrations.get_schema_version(engine) == migrations.LATEST_SCHEMA_VERSION
+    assert sqlalchemy.inspect(engine).has_table(SqlArtifactFolderCounter.__tablename__)
+    assert METRIC_INDEX in _get_index_names(engine, SqlMetric.__tablename__)
+    for table_name, index in TAG_INDEXES.items():
+        assert index in _get_index_names(engine, table_name)
+
+    # upgrading an up-to-date database is a no-op
+    migrations.upgrade(engine)
+    SqlAlchemyStore(f"sqlite:///{tmp_path}/submarine.db")
+    with engine.connect() as connection:
+        versions = connection.execute(sqlalchemy.select(SqlSchemaVersion.version)).scalars().all()
+    assert versions == [migrations.LATEST_SCHEMA_VERSION]
@@ -0,0 +1,169 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+import pytest
+import sqlalchemy
+
+from submarine.exceptions import SubmarineException
+from submarine.store.database.engine import EngineConfig
+from submarine.store.model_registry.caching_store import CachingStore
+from submarine.store.model_registry.sqlalchemy_store import SqlAlchemyStore
+
+
+@pytest.fixture
+def stores(tmp_path):
+    db_uri = f"sqlite:///{tmp_path}/submarine.db"
+    # the second store plays another process sharing the database, its own engine configuration
+    # keeps its statements apart
+    store, other_store = SqlAlchemyStore(db_uri), SqlAlchemyStore(db_uri, EngineConfig(null_pool=True))
+    statements = []
+    sqlalchemy.event.listen(
+        store.engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    store.create_registered_model("model", tags=["tag"])
+    store.create_model_version("model", "model_id_0", "test", "application_1234", "pytorch")
+    statements.clear()
+    yield store, other_store, statements
+    store.engine.dispose()
+    other_store.engine.dispose()
+
+
+def _probes(statements):
+    return [s for s in statements if "max(registered_model.last_updated_time)" in s]
+
+
+def test_lookups_are_cached(stores):
+    store, _, statements = stores
+    cache = CachingStore(store, probe_interval=60)
+    executed = []
+    for _ in range(3):
+        assert cache.get_registered_model("model").tags == ["tag"]
+        assert cache.get_model_version("model", 1).id == "model_id_0"
+        assert cache.get_model_version_uri("model", 1).endswith("/model/1")
+        executed.append(len(statements))
+    # only the first lookups reach the database, after a single probe
+    assert executed[0] == executed[1] == executed[2]
+    assert len(_probes(statements)) == 1
+
+    with pytest.raises(SubmarineException):
+        cache.get_model_version("model", 2)
+    with pytest.raises(SubmarineException):
+        cache.get_model_version("model", 2)
+
+
+def test_mutations_invalidate(stores):
+    store, _, _ = stores
+    cache = CachingStore(store, probe_interval=60)
+    cache.get_registered_model("model")
+    cache.add_registered_model_tag("model", "new")
+    assert cache.get_registered_model("model").tags == ["new", "tag"]
+
+    cache.get_model_version("model", 1)
+    cache.transition_model_version_stage("model", 1, "Production")
+    assert cache.get_model_version("model", 1).current_stage == "Production"
+
+    # failed mutations invalidate as well
+    store.add_model_version_tag("model", 1, "tag")
+    with pytest.raises(SubmarineException):
+        cache.add_model_version_tag("model", 2, "tag")
+    assert cache.get_model_version("model", 1).tags == ["tag"]
+
+    cache.rename_registered_model("model", "renamed")
+    with pytest.raises(SubmarineException):
+        cache.get_registered_model("model")
+    assert cache.get_registered_model("renamed").name == "renamed"
+
+
+def test_changes_from_other_processes(stores):
+    store, other_store, statements = stores
+    cache = CachingStore(store, probe_interval=0)
+    cache.get_registered_model("model")
+    cache.get_model_version("model", 1)
+    executed = len(statements)
+    cache.get_registered_model("model")
+    cache.get_model_version("model", 1)
+    # a probe per lookup, which is a single statement while nothing changed
+    assert statements[executed:] == _probes(statements)[-2:]
+
+    other_store.add_model_version_tag("model", 1, "new")
+    assert cache.get_model_version("model", 1).tags == ["new"]
+
+    other_store.create_registered_model("other")
+    cache.get_registered_model("model")
+    cache.get_registered_model("other")
+    statements.clear()
+    other_store.add_registered_model_tag("other", "new")
+    # only the changed model is dropped
+    assert cache.get_registered_model("model").tags == ["tag"]
+    assert not [s for s in statements if "WHERE registered_model.name = ?" in s]
+    assert cache.get_registered_model("other").tags == ["new"]
+
+    other_store.delete_registered_model("other")
+    with pytest.raises(SubmarineException):
+        cache.get_registered_model("other")
+
+
+def test_ttl_and_lru(stores):
+    store, other_store, _ = stores
+    with mock.patch("time.monotonic", return_value=100.0) as monotonic:
+        cache = CachingStore(store, ttl=10, max_size=2, probe_interval=1000)
+        cache.get_registered_model("model")
+        other_store.update_registered_model_description("model", "updated")
+        monotonic.return_value = 105.0
+        assert cache.get_registered_model("model").description is None
+        monotonic.return_value = 111.0
+        assert cache.get_registered_model("model").description == "updated"
+
+    cache.get_model_version("model", 1)
+    cache.get_model_version_uri("model", 1)
+    assert len(cache._entries) == 2
+    assert ("registered_model", "model") not in cache._entries
+
+
+def test_store_without_probe(stores):
+    store, other_store, _ = stores
+    cache = CachingStore(store, probe_interval=0)
+    with mock.patch.object(store, "get_update_stamp", return_value=None):
+        cache.get_registered_model("model")
+        other_store.update_registered_model_description("model", "updated")
+        assert cache.get_registered_model("model").description is None
+
+
+def test_bulk_mutations_invalidate(stores):
+    store, _, _ = stores
+    cache = CachingStore(store, probe_interval=60)
+    cache.bulk_create_model_versions(
+        "model",
+        [
+            {
+                "id": "model_id_1",
+                "user_id": "test",
+                "experiment_id": "application_1234",
+                "model_type": "pytorch",
+            }
+        ],
+    )
+    cache.get_model_version("model", 2)
+    cache.bulk_add_tags("model", [1, 2], ["tag"])
+    assert cache.get_model_version("model", 2).tags == ["tag"]
+    cache.bulk_transition_stage("model", [1, 2], "Archived")
+    assert cache.get_model_version("model", 2).current_stage == "Archived"
+    cache.bulk_delete_versions("model", [2])
+    with pytest.raises(SubmarineException):
+        cache.get_model_version("model", 2)
@@ -0,0 +1,68 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import sqlalchemy
+
+from submarine.exceptions import SubmarineException
+from submarine.store.model_registry.filter_expression import (
+    compile_filter_expression,
+    get_like_prefix,
+)
+
+_FIELDS = {
+    "a": lambda op, value: sqlalchemy.text(f"a {op} '{value}'"),
+    "b": lambda op, value: sqlalchemy.text(f"b {op} '{value}'"),
+}
+
+
+def _compile(expression):
+    return str(compile_filter_expression(expression, _FIELDS))
+
+
+def test_compile_filter_expression():
+    assert _compile("a = 'x'") == "a = 'x'"
+    assert _compile("a = 'x' AND b != \"y\" or a LIKE 'z%'") == "a = 'x' AND b != 'y' OR a LIKE 'z%'"
+    assert _compile("a = 'x' and (b < 'y' OR b >= 'z')") == "a = 'x' AND (b < 'y' OR b >= 'z')"
+    assert _compile("  ((a <= 'it''s'))  ") == "a <= 'it's'"
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "",
+        "a",
+        "a =",
+        "a = x",
+        "c = 'x'",
+        "a = 'x' AND",
+        "(a = 'x'",
+        "(a = 'x' (",
+        "a = 'x')",
+        "a = 'x' b = 'y'",
+        "a ~ 'x'",
+    ],
+)
+def test_compile_invalid_filter_expression(expression):
+    with pytest.raises(SubmarineException, match="Invalid filter expression"):
+        _compile(expression)
+
+
+def test_get_like_prefix():
+    assert get_like_prefix("team_%") == "team_"
+    assert get_like_prefix("%") == ""
+    for pattern in ["team", "%team", "te%am%"]:
+        with pytest.raises(SubmarineException, match="Only prefix patterns"):
+            get_like_prefix(pattern)
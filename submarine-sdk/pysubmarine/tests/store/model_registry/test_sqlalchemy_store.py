@@ -13,12 +13,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import tempfile
 import unittest
 from datetime import datetime
 from typing import List
+from unittest import mock
 
 import freezegun
 import pytest
+import sqlalchemy
 from freezegun import freeze_time
 
 import submarine
@@ -737,3 +740,331 @@ class TestSqlAlchemyStore(unittest.TestCase):
             self.store.delete_model_version_tag(None, rm1mv1.version, tags[1])
         with self.assertRaises(SubmarineException):
             self.store.delete_model_version_tag(rm1mv1.name, None, tags[1])
+
+
+class TestSqlAlchemyStoreSqlite(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.store = SqlAlchemyStore(f"sqlite:///{self.tempdir.name}/submarine.db")
+        self.statements = []
+        sqlalchemy.event.listen(self.store.engine, "before_cursor_execute", self._record_statement)
+
+    def tearDown(self):
+        sqlalchemy.event.remove(self.store.engine, "before_cursor_execute", self._record_statement)
+        self.store.engine.dispose()
+        self.tempdir.cleanup()
+
+    def _record_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _create_model_version(self, model_id: str) -> ModelVersion:
+        return self.store.create_model_version("model", model_id, "test", "application_1234", "pytorch")
+
+    def test_create_model_version_does_not_load_versions(self):
+        self.store.create_registered_model("model")
+        for i in range(10):
+            self._create_model_version(f"model_id_{i}")
+        self.statements.clear()
+        mv = self._create_model_version("model_id_10")
+        assert mv.version == 11
+        selects = [s for s in self.statements if s.lstrip().upper().startswith("SELECT")]
+        # the registered model and the highest version
+        assert len(selects) == 2
+        assert "max(model_version.version)" in selects[1]
+
+    def test_create_model_version_retries_on_version_conflict(self):
+        self.store.create_registered_model("model")
+        self._create_model_version("model_id_0")
+        self._create_model_version("model_id_1")
+        # a concurrent registration took version 2 after it was computed
+        with mock.patch.object(SqlAlchemyStore, "_get_max_model_version", side_effect=[1, 2]):
+            mv = self._create_model_version("model_id_2")
+        assert mv.version == 3
+        assert [m.version for m in self.store.list_model_versions("model")] == [1, 2, 3]
+
+    def test_create_model_version_duplicate_id(self):
+        self.store.create_registered_model("model")
+        self._create_model_version("model_id_0")
+        with mock.patch.object(
+            SqlAlchemyStore, "_get_max_model_version", wraps=SqlAlchemyStore._get_max_model_version
+        ) as get_max_model_version:
+            with pytest.raises(SubmarineException, match="Model create error"):
+                self._create_model_version("model_id_0")
+        # not retried
+        assert get_max_model_version.call_count == 1
+        with pytest.raises(SubmarineException):
+            self.store.create_model_version("unknown", "model_id_1", "test", "application_1234", "pytorch")
+
+    def test_list_registered_model_pages(self):
+        for i in range(25):
+            self.store.create_registered_model(f"model_{i:02d}", tags=["tag1", f"tag_{i}"])
+        self.statements.clear()
+        page = self.store.list_registered_model(max_results=10)
+        assert [rm.name for rm in page] == [f"model_{i:02d}" for i in range(10)]
+        assert page[3].tags == ["tag1", "tag_3"]
+        # the models and then their tags, whatever the number of models
+        assert len([s for s in self.statements if s.lstrip().upper().startswith("SELECT")]) == 2
+
+        names = [rm.name for rm in page]
+        while page.token is not None:
+            page = self.store.list_registered_model(max_results=10, page_token=page.token)
+            names += [rm.name for rm in page]
+        assert names == [f"model_{i:02d}" for i in range(25)]
+        assert len(page) == 5
+
+        page = self.store.list_registered_model(filter_tags=["tag1"], max_results=3, order_by="name DESC")
+        page = self.store.list_registered_model(
+            filter_tags=["tag1"], max_results=3, order_by="name desc", page_token=page.token
+        )
+        assert [rm.name for rm in page] == ["model_21", "model_20", "model_19"]
+        assert len(self.store.list_registered_model()) == 25
+        assert self.store.list_registered_model().token is None
+
+        with pytest.raises(SubmarineException, match="Invalid page_token"):
+            self.store.list_registered_model(max_results=3, order_by="creation_time", page_token=page.token)
+        with pytest.raises(SubmarineException, match="Invalid page_token"):
+            self.store.list_registered_model(page_token="invalid")
+        with pytest.raises(SubmarineException, match="Invalid order_by"):
+            self.store.list_registered_model(order_by="description")
+        with pytest.raises(SubmarineException, match="Invalid max_results"):
+            self.store.list_registered_model(max_results=0)
+
+    def test_list_registered_model_by_time(self):
+        for i, name in enumerate(["c", "a", "b", "d"]):
+            # a and b are created at the same time, the name breaks the tie
+            with freeze_time(datetime(2021, 11, 11, 11, 11, min(i, 2))):
+                self.store.create_registered_model(name)
+        names = []
+        page_token = None
+        while True:
+            page = self.store.list_registered_model(
+                max_results=1, order_by="creation_time DESC", page_token=page_token
+            )
+            names += [rm.name for rm in page]
+            page_token = page.token
+            if page_token is None:
+                break
+        assert names == ["d", "b", "a", "c"]
+
+    def test_iter_model_versions(self):
+        self.store.create_registered_model("model")
+        for i in range(7):
+            self.store.create_model_version(
+                "model", f"model_id_{i}", "test", "application_1234", "pytorch", tags=[f"tag_{i % 2}"]
+            )
+        versions = self.store.iter_model_versions("model", page_size=2)
+        assert [mv.version for mv in versions] == list(range(1, 8))
+        versions = self.store.iter_model_versions("model", filter_tags=["tag_0"], order_by="version DESC")
+        assert [(mv.version, mv.tags) for mv in versions] == [
+            (7, ["tag_0"]),
+            (5, ["tag_0"]),
+            (3, ["tag_0"]),
+            (1, ["tag_0"]),
+        ]
+
+        page = self.store.list_model_versions("model", max_results=3, order_by="last_updated_time")
+        assert [mv.version for mv in page] == [1, 2, 3]
+        page = self.store.list_model_versions(
+            "model", max_results=3, order_by="last_updated_time", page_token=page.token
+        )
+        assert [mv.version for mv in page] == [4, 5, 6]
+        assert [rm.name for rm in self.store.iter_registered_models(page_size=1)] == ["model"]
+
+    def test_list_with_filter_expression(self):
+        self.store.create_registered_model("image_1", tags=["image", "team-a"])
+        self.store.create_registered_model("image_2", tags=["image", "team_b"])
+        with freeze_time("2021-11-11 11:11:11"):
+            self.store.create_registered_model("text_1", tags=["text", "team-a"])
+        self.store.create_registered_model("text_2", tags=["textual"])
+
+        def names(expression):
+            return [rm.name for rm in self.store.list_registered_model(filter_expression=expression)]
+
+        assert names("tag = 'text'") == ["text_1"]
+        assert names("tag LIKE 'text%'") == ["text_1", "text_2"]
+        # only % is a wildcard
+        assert names("tag LIKE 'team_%'") == ["image_2"]
+        assert names("tag = 'image' AND tag LIKE 'team-%' OR name = 'text_2'") == ["image_1", "text_2"]
+        assert names("tag = 'image' AND (tag LIKE 'team-%' OR name = 'text_2')") == ["image_1"]
+        assert names("creation_time < '2021-11-12T00:00:00'") == ["text_1"]
+        assert names("name LIKE 'image%'") == ["image_1", "image_2"]
+        # filter_tags match exact tags
+        assert [rm.name for rm in self.store.list_registered_model(filter_tags=["text"])] == ["text_1"]
+        with pytest.raises(SubmarineException, match="Operator < is not supported for tag"):
+            names("tag < 'text'")
+        with pytest.raises(SubmarineException, match="Invalid time"):
+            names("creation_time < 'yesterday'")
+
+        for i, tags in enumerate([["a"], ["a", "b"], ["b"]]):
+            self.store.create_model_version(
+                "image_1",
+                f"model_id_{i}",
+                "test",
+                "application_1234",
+                "tensorflow" if i else "pytorch",
+                tags=tags,
+            )
+        self.store.create_model_version(
+            "image_2", "model_id_3", "test", "application_1234", "pytorch", tags=["a"]
+        )
+        self.store.transition_model_version_stage("image_1", 3, STAGE_PRODUCTION)
+
+        def versions(expression):
+            return [
+                mv.version for mv in self.store.list_model_versions("image_1", filter_expression=expression)
+            ]
+
+        assert versions("tag = 'a'") == [1, 2]
+        assert versions("tag = 'a' AND tag = 'b'") == [2]
+        assert versions("stage = 'production' OR model_type = 'pytorch'") == [1, 3]
+        assert versions("stage != 'Production' AND tag LIKE 'b%'") == [2]
+        with pytest.raises(SubmarineException, match="Invalid Model Version stage"):
+            versions("stage = 'Serving'")
+        with pytest.raises(SubmarineException, match="Unknown field name"):
+            versions("name = 'image_1'")
+
+    def test_tag_filter_uses_tag_index(self):
+        self.store.create_registered_model("model", tags=["tag"])
+        self.store.create_model_version(
+            "model", "model_id_0", "test", "application_1234", "pytorch", tags=["tag"]
+        )
+        self.statements.clear()
+        self.store.list_registered_model(filter_expression="tag = 'tag'")
+        self.store.list_model_versions("model", filter_expression="tag = 'tag'")
+        plans = []
+        with self.store.engine.connect() as connection:
+            for statement in [s for s in self.statements if "_tag.tag" in s and "IN (SELECT" in s]:
+                # the parameters do not matter to the plan
+                plan = connection.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", tuple([None] * statement.count("?"))
+                ).fetchall()
+                plans.append(" ".join(row[-1] for row in plan))
+        assert len(plans) == 2
+        assert "USING COVERING INDEX registered_model_tag_tag_name_idx (tag=?)" in plans[0]
+        assert "USING COVERING INDEX model_version_tag_tag_name_version_idx" in plans[1]
+
+    def _bulk_create_model_versions(self, count: int) -> List[ModelVersion]:
+        model_versions = [
+            {
+                "id": f"model_id_{i}",
+                "user_id": "test",
+                "experiment_id": "application_1234",
+                "model_type": "pytorch",
+            }
+            for i in range(count)
+        ]
+        return self.store.bulk_create_model_versions("model", model_versions)
+
+    def test_bulk_create_model_versions(self):
+        self.store.create_registered_model("model")
+        self._create_model_version("model_id")
+        self.statements.clear()
+        model_versions = self._bulk_create_model_versions(20)
+        assert [mv.version for mv in model_versions] == list(range(2, 22))
+        assert [mv.id for mv in model_versions] == [f"model_id_{i}" for i in range(20)]
+        # the registered model and the highest version, then batched inserts
+        assert len([s for s in self.statements if s.lstrip().upper().startswith("SELECT")]) == 2
+        assert len(self.statements) < 10
+        assert self.store.get_registered_model("model").last_updated_time == model_versions[0].creation_time
+
+        self.store.bulk_create_model_versions(
+            "model",
+            [
+                {
+                    "id": "model_id_20",
+                    "user_id": "test",
+                    "experiment_id": "application_1234",
+                    "model_type": "pytorch",
+                    "description": "description",
+                    "tags": ["tag"],
+                }
+            ],
+        )
+        assert self.store.get_model_version("model", 22).tags == ["tag"]
+        assert self.store.bulk_create_model_versions("model", []) == []
+
+        # nothing is created when a version fails
+        with pytest.raises(SubmarineException, match="Model create error"):
+            self._bulk_create_model_versions(21)
+        model_version = {
+            "id": "model_id_21",
+            "user_id": "test",
+            "experiment_id": "application_1234",
+            "model_type": "pytorch",
+        }
+        with pytest.raises(SubmarineException, match="Duplicated model IDs"):
+            self.store.bulk_create_model_versions("model", [model_version, model_version])
+        with pytest.raises(SubmarineException, match="Missing fields: \\['model_type'\\]"):
+            self.store.bulk_create_model_versions(
+                "model", [{"id": "model_id_21", "user_id": "test", "experiment_id": "application_1234"}]
+            )
+        assert len(self.store.list_model_versions("model")) == 22
+
+    def test_bulk_transition_stage(self):
+        self.store.create_registered_model("model")
+        self._bulk_create_model_versions(5)
+        self.statements.clear()
+        self.store.bulk_transition_stage("model", [1, 3, 4], "production")
+        updates = [s for s in self.statements if s.lstrip().upper().startswith("UPDATE")]
+        assert len(updates) == 2
+        stages = [mv.current_stage for mv in self.store.list_model_versions("model")]
+        assert stages == ["Production", "None", "Production", "Production", "None"]
+        model_version = self.store.get_model_version("model", 1)
+        assert model_version.last_updated_time > model_version.creation_time
+        assert self.store.get_registered_model("model").last_updated_time == model_version.last_updated_time
+
+        # all or nothing
+        with pytest.raises(SubmarineException, match="versions=\\[6\\]"):
+            self.store.bulk_transition_stage("model", [2, 6], "Archived")
+        assert self.store.get_model_version("model", 2).current_stage == "None"
+        with pytest.raises(SubmarineException, match="Invalid Model Version stage"):
+            self.store.bulk_transition_stage("model", [2], "Serving")
+        with pytest.raises(SubmarineException):
+            self.store.bulk_transition_stage("model", [0], "Archived")
+
+    def test_bulk_add_tags(self):
+        self.store.create_registered_model("model")
+        self._bulk_create_model_versions(3)
+        self.store.add_model_version_tag("model", 2, "tag1")
+        self.statements.clear()
+        self.store.bulk_add_tags("model", [1, 2], ["tag1", "tag2"])
+        assert len([s for s in self.statements if s.lstrip().upper().startswith("INSERT")]) == 1
+        assert [mv.tags for mv in self.store.list_model_versions("model")] == [
+            ["tag1", "tag2"],
+            ["tag1", "tag2"],
+            [],
+        ]
+        model_version = self.store.get_model_version("model", 2)
+        assert self.store.get_registered_model("model").last_updated_time == model_version.last_updated_time
+
+        with pytest.raises(SubmarineException, match="not found"):
+            self.store.bulk_add_tags("model", [3, 4], ["tag3"])
+        assert self.store.get_model_version("model", 3).tags == []
+        with pytest.raises(SubmarineException, match="Tag cannot be empty"):
+            self.store.bulk_add_tags("model", [3], [""])
+
+    def test_bulk_delete_versions(self):
+        self.store.create_registered_model("model")
+        self._bulk_create_model_versions(4)
+        self.store.bulk_add_tags("model", [1, 2, 3, 4], ["tag"])
+        self.statements.clear()
+        self.store.bulk_delete_versions("model", [1, 3])
+        assert len([s for s in self.statements if s.lstrip().upper().startswith("DELETE")]) == 2
+        assert [mv.version for mv in self.store.list_model_versions("model")] == [2, 4]
+        with self.store.ManagedSessionMaker() as session:
+            assert session.query(models.SqlModelVersionTag).count() == 2
+
+        with pytest.raises(SubmarineException, match="versions=\\[1\\]"):
+            self.store.bulk_delete_versions("model", [1, 2])
+        assert [mv.version for mv in self.store.list_model_versions("model")] == [2, 4]
+
+    def test_bulk_operations_in_chunks(self):
+        self.store.create_registered_model("model")
+        with mock.patch("submarine.store.model_registry.sqlalchemy_store._BULK_CHUNK_SIZE", 2):
+            self._bulk_create_model_versions(5)
+            self.store.bulk_transition_stage("model", [1, 2, 3, 4, 5], "Archived")
+            self.store.bulk_add_tags("model", [1, 2, 3, 4, 5], ["tag"])
+            self.store.bulk_delete_versions("model", [1, 2, 3, 4])
+        assert [
+            (mv.version, mv.current_stage, mv.tags) for mv in self.store.list_model_versions("model")
+        ] == [(5, "Archived", ["tag"])]
@@ -13,13 +13,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import math
+import tempfile
+import threading
 import unittest
-from datetime import datetime
+from datetime import datetime, timedelta
+from unittest import mock
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
+import sqlalchemy
 
 import submarine
 from submarine.entities import Metric, Param
+from submarine.exceptions import SubmarineException
 from submarine.store.database import models
 from submarine.store.database.models import SqlExperiment, SqlMetric, SqlParam
 from submarine.store.tracking.sqlalchemy_store import SqlAlchemyStore
@@ -78,3 +86,243 @@ class TestSqlAlchemyStore(unittest.TestCase):
             assert metrics[0].id == JOB_ID
             assert metrics[1].value == 6
             assert metrics[1].worker_index == "worker-2"
+
+    def test_log_metrics(self):
+        timestamp = datetime.now()
+        metrics = [
+            Metric("name_1", 5, "worker-1", timestamp, 0),
+            Metric("name_2", 6, "worker-1", timestamp, 1),
+        ]
+        self.store.log_metrics(JOB_ID, metrics)
+        # logging the same batch again skips the existing rows
+        self.store.log_metrics(JOB_ID, metrics)
+
+        # Validate metrics
+        with self.store.ManagedSessionMaker() as session:
+            metrics = (
+                session.query(SqlMetric)
+                .options()
+                .filter(SqlMetric.id == JOB_ID)
+                .order_by(SqlMetric.key)
+                .all()
+            )
+            assert len(metrics) == 2
+            assert metrics[0].key == "name_1"
+            assert metrics[0].value == 5
+            assert metrics[0].step == 0
+            assert metrics[1].key == "name_2"
+            assert metrics[1].value == 6
+            assert metrics[1].step == 1
+
+    def test_log_batch(self):
+        timestamp = datetime.now()
+        metrics = [Metric(f"name_{i}", i, "worker-1", timestamp, 1) for i in range(20)]
+        params = [Param("name_1", "a", "worker-1"), Param("name_2", "b", "worker-1")]
+        self.store.log_batch(JOB_ID, metrics=metrics, params=params)
+
+        # Validate metrics and params
+        with self.store.ManagedSessionMaker() as session:
+            sql_metrics = session.query(SqlMetric).filter(SqlMetric.id == JOB_ID).all()
+            sql_params = session.query(SqlParam).filter(SqlParam.id == JOB_ID).order_by(SqlParam.key).all()
+            assert sorted(m.value for m in sql_metrics) == list(range(20))
+            assert [(p.key, p.value) for p in sql_params] == [("name_1", "a"), ("name_2", "b")]
+
+
+class TestSqlAlchemyStoreSqlite(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.store = SqlAlchemyStore(f"sqlite:///{self.tempdir.name}/submarine.db")
+        self.statements = []
+        sqlalchemy.event.listen(self.store.engine, "before_cursor_execute", self._record_statement)
+
+    def tearDown(self):
+        sqlalchemy.event.remove(self.store.engine, "before_cursor_execute", self._record_statement)
+        self.store.engine.dispose()
+        self.tempdir.cleanup()
+
+    def _record_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _get_metrics(self):
+        with self.store.ManagedSessionMaker() as session:
+            return [
+                (m.key, m.value, m.worker_index, m.step, m.is_nan)
+                for m in session.query(SqlMetric).filter(SqlMetric.id == JOB_ID).order_by(SqlMetric.step)
+            ]
+
+    def _get_params(self):
+        with self.store.ManagedSessionMaker() as session:
+            return [
+                (p.key, p.value, p.worker_index)
+                for p in session.query(SqlParam).filter(SqlParam.id == JOB_ID).order_by(SqlParam.key)
+            ]
+
+    def test_log_metric_is_a_single_statement(self):
+        self.store.log_metric(JOB_ID, Metric("name_1", 5, "worker-1", datetime.now(), 0))
+        inserts = [s for s in self.statements if s.lstrip().upper().startswith(("INSERT", "SELECT"))]
+        assert len(inserts) == 1
+        assert "ON CONFLICT DO NOTHING" in inserts[0]
+
+    def test_log_metric_skips_duplicates(self):
+        timestamp = datetime.now()
+        self.store.log_metric(JOB_ID, Metric("name_1", 5, "worker-1", timestamp, 0))
+        # same primary key, the existing row is kept
+        self.store.log_metric(JOB_ID, Metric("name_1", 7, "worker-1", timestamp, 0))
+        self.store.log_metric(JOB_ID, Metric("name_1", float("nan"), "worker-1", datetime.now(), 1))
+        assert self._get_metrics() == [
+            ("name_1", 5, "worker-1", 0, False),
+            ("name_1", 0, "worker-1", 1, True),
+        ]
+
+    def test_log_param_skips_duplicates(self):
+        self.store.log_param(JOB_ID, Param("name_1", "a", "worker-1"))
+        self.store.log_param(JOB_ID, Param("name_1", "b", "worker-1"))
+        self.store.log_param(JOB_ID, Param("name_1", "c", "worker-2"))
+        assert self._get_params() == [("name_1", "a", "worker-1"), ("name_1", "c", "worker-2")]
+
+    def test_log_batch_skips_existing_rows(self):
+        timestamp = datetime.now()
+        self.store.log_batch(
+            JOB_ID,
+            metrics=[Metric("name_1", 1, "worker-1", timestamp, 1)],
+            params=[Param("name_1", "a", "worker-1")],
+        )
+        self.statements.clear()
+        self.store.log_batch(
+            JOB_ID,
+            metrics=[
+                Metric("name_1", step, "worker-1", timestamp if step == 1 else datetime.now(), step)
+                for step in range(1, 4)
+            ],
+            params=[Param("name_1", "b", "worker-1"), Param("name_2", "c", "worker-1")],
+        )
+        inserts = [s for s in self.statements if s.lstrip().upper().startswith("INSERT")]
+        assert len(inserts) == 2
+        assert [m[3] for m in self._get_metrics()] == [1, 2, 3]
+        assert self._get_params() == [("name_1", "a", "worker-1"), ("name_2", "c", "worker-1")]
+
+    def test_get_metric_history(self):
+        start = datetime.now()
+        metrics = [
+            Metric("loss", step, "worker-0", start + timedelta(seconds=step), step) for step in range(100)
+        ]
+        metrics += [
+            Metric("loss", 2 * step, "worker-1", start + timedelta(seconds=step), step)
+            for step in range(0, 100, 2)
+        ]
+        metrics.append(Metric("accuracy", 0.5, "worker-0", start, 0))
+        self.store.log_batch(JOB_ID, metrics=metrics)
+
+        history = self.store.get_metric_history(JOB_ID, "loss")
+        assert len(history) == 150
+        assert list(history.columns) == [
+            "worker_index",
+            "step",
+            "timestamp",
+            "value",
+            "min_value",
+            "max_value",
+        ]
+
+        history = self.store.get_metric_history(
+            JOB_ID, "loss", worker_index="worker-0", start_step=10, end_step=19
+        )
+        assert list(history.step) == list(range(10, 20))
+        assert list(history.value) == list(range(10, 20))
+
+        self.statements.clear()
+        history = self.store.get_metric_history(JOB_ID, "loss", max_points=10)
+        assert len(self.statements) == 2
+        worker_0 = history[history.worker_index == "worker-0"]
+        assert list(worker_0.step) == list(range(0, 100, 10))
+        assert list(worker_0.value) == [step + 4.5 for step in range(0, 100, 10)]
+        assert list(worker_0.min_value) == list(range(0, 100, 10))
+        assert list(worker_0.max_value) == list(range(9, 100, 10))
+        worker_1 = history[history.worker_index == "worker-1"]
+        assert list(worker_1.step) == list(range(0, 100, 10))
+        assert list(worker_1.value) == [2 * step + 8 for step in range(0, 100, 10)]
+
+        history = self.store.get_metric_history(
+            JOB_ID, "loss", worker_index="worker-0", end_step=4, max_points=2
+        )
+        assert list(history.step) == [0, 3]
+        assert list(history.value) == [1, 3.5]
+
+        assert self.store.get_metric_history(JOB_ID, "unknown", max_points=10).empty
+        with pytest.raises(SubmarineException):
+            self.store.get_metric_history(JOB_ID, "loss", max_points=0)
+
+    def test_get_metric_history_nan(self):
+        self.store.log_batch(
+            JOB_ID,
+            metrics=[
+                Metric("loss", 1.0, "worker-0", datetime(2021, 8, 30, 10, 10, 10), 0),
+                Metric("loss", float("nan"), "worker-0", datetime(2021, 8, 30, 10, 10, 11), 1),
+            ],
+        )
+        history = self.store.get_metric_history(JOB_ID, "loss")
+        assert history.value[0] == 1.0
+        assert math.isnan(history.value[1])
+        # NaN values are left out of the aggregates
+        history = self.store.get_metric_history(JOB_ID, "loss", max_points=1)
+        assert list(history.value) == [1.0]
+
+    def test_export_and_import_metrics(self):
+        start = datetime(2021, 8, 30, 10, 10, 10, 100000)
+        metrics = [
+            Metric("loss", 1.0 / (step + 1), f"worker-{step % 3}", start + timedelta(seconds=step), step)
+            for step in range(25)
+        ]
+        metrics.append(Metric("loss", float("nan"), "worker-0", start + timedelta(seconds=30), 30))
+        params = [Param("lr", "0.01", "worker-0"), Param("optimizer", "adam", "worker-0")]
+        self.store.log_batch(JOB_ID, metrics=metrics, params=params)
+        self.store.log_batch("application_2", metrics=metrics[:1])
+        expected_metrics = self._get_metrics()
+        expected_params = self._get_params()
+
+        export_dir = f"{self.tempdir.name}/export/{JOB_ID}"
+        self.store.export_metrics(JOB_ID, export_dir, chunk_size=10)
+        metric_file = pq.ParquetFile(f"{export_dir}/metric.parquet")
+        assert metric_file.metadata.num_rows == 26
+        assert metric_file.metadata.num_row_groups == 3
+        assert pa.types.is_dictionary(metric_file.schema_arrow.field("key").type)
+        assert pa.types.is_dictionary(metric_file.schema_arrow.field("worker_index").type)
+        assert pq.ParquetFile(f"{export_dir}/param.parquet").metadata.num_rows == 2
+
+        with self.store.ManagedSessionMaker() as session:
+            session.query(SqlMetric).filter(SqlMetric.id == JOB_ID).delete()
+            session.query(SqlParam).filter(SqlParam.id == JOB_ID).delete()
+        self.store.import_metrics(export_dir, chunk_size=10)
+        # importing again does not duplicate rows
+        self.store.import_metrics(export_dir)
+        assert self._get_metrics() == expected_metrics
+        assert self._get_params() == expected_params
+        history = self.store.get_metric_history(JOB_ID, "loss", worker_index="worker-0")
+        assert list(history.timestamp)[:2] == [start, start + timedelta(seconds=3)]
+
+        self.store.import_metrics(export_dir, job_id="application_3")
+        with self.store.ManagedSessionMaker() as session:
+            assert session.query(SqlMetric).filter(SqlMetric.id == "application_3").count() == 26
+
+    def test_allocate_folder_number(self):
+        get_first_number = mock.Mock(return_value=6)
+        assert self.store.allocate_folder_number("experiment/1", get_first_number) == 6
+        assert self.store.allocate_folder_number("experiment/1", get_first_number) == 7
+        assert self.store.allocate_folder_number("experiment/2", lambda: 1) == 1
+        assert self.store.allocate_folder_number("experiment/1", get_first_number) == 8
+        # the first number is only looked up to create the counter
+        get_first_number.assert_called_once_with()
+
+    def test_allocate_folder_number_concurrently(self):
+        numbers = []
+
+        def allocate():
+            for _ in range(5):
+                numbers.append(self.store.allocate_folder_number("experiment/1", lambda: 1))
+
+        threads = [threading.Thread(target=allocate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(numbers) == list(range(1, 21))
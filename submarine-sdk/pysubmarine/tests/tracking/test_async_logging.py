@@ -0,0 +1,89 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from datetime import datetime
+from unittest import mock
+
+import pytest
+
+from submarine.entities import Metric
+from submarine.exceptions import SubmarineException
+from submarine.tracking.async_logging import AsyncMetricLogger
+
+JOB_ID = "application_123456789"
+
+
+def _metric(step):
+    return Metric("loss", 1.0 / (step + 1), "worker-0", datetime.now(), step)
+
+
+def test_metrics_are_written_in_batches():
+    store = mock.MagicMock()
+    logger = AsyncMetricLogger(store, batch_size=4, flush_interval=60)
+    for step in range(10):
+        logger.log_metric(JOB_ID, _metric(step))
+    logger.close()
+
+    batches = [c.args[1] for c in store.log_metrics.call_args_list]
+    assert all(c.args[0] == JOB_ID for c in store.log_metrics.call_args_list)
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert [m.step for batch in batches for m in batch] == list(range(10))
+
+
+def test_flush_waits_for_pending_metrics():
+    store = mock.MagicMock()
+    logger = AsyncMetricLogger(store, batch_size=100, flush_interval=0.01)
+    logger.log_metric(JOB_ID, _metric(0))
+    logger.log_metric("application_2", _metric(1))
+    logger.flush()
+
+    logged = {c.args[0]: c.args[1] for c in store.log_metrics.call_args_list}
+    assert [m.step for m in logged[JOB_ID]] == [0]
+    assert [m.step for m in logged["application_2"]] == [1]
+    logger.close()
+
+
+def test_log_metric_blocks_when_queue_is_full():
+    release = threading.Event()
+    store = mock.MagicMock()
+    store.log_metrics.side_effect = lambda *_: release.wait()
+    logger = AsyncMetricLogger(store, max_queue_size=1, batch_size=1, flush_interval=0)
+
+    logger.log_metric(JOB_ID, _metric(0))  # taken by the background thread, which then waits
+    logger.log_metric(JOB_ID, _metric(1))  # fills the queue
+    producer = threading.Thread(target=logger.log_metric, args=(JOB_ID, _metric(2)))
+    producer.start()
+    producer.join(timeout=0.2)
+    assert producer.is_alive()
+
+    release.set()
+    producer.join(timeout=5)
+    assert not producer.is_alive()
+    logger.close()
+    assert store.log_metrics.call_count == 3
+
+
+def test_flush_raises_write_errors():
+    store = mock.MagicMock()
+    store.log_metrics.side_effect = SubmarineException("database is down")
+    logger = AsyncMetricLogger(store, flush_interval=0.01)
+    logger.log_metric(JOB_ID, _metric(0))
+    with pytest.raises(SubmarineException, match="database is down"):
+        logger.flush()
+    logger.close()
+
+    with pytest.raises(SubmarineException, match="closed"):
+        logger.log_metric(JOB_ID, _metric(1))
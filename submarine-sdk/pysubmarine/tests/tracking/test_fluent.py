@@ -0,0 +1,97 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from unittest import mock
+
+import pytest
+
+import submarine
+from submarine.tracking import fluent
+from submarine.tracking.utils import _JOB_ID_ENV_VAR, reset_run_context
+
+JOB_ID = "application_123456789"
+
+
+@pytest.fixture
+def client_cls():
+    fluent._reset_clients()
+    reset_run_context()
+    with mock.patch.dict(os.environ, {_JOB_ID_ENV_VAR: JOB_ID}), mock.patch(
+        "submarine.tracking.fluent.SubmarineClient"
+    ) as client_cls:
+        yield client_cls
+    fluent._reset_clients()
+    reset_run_context()
+    submarine.set_db_uri(None)
+
+
+def test_client_is_created_once(client_cls):
+    submarine.log_metric("loss", 0.5, step=1)
+    submarine.log_metric("loss", 0.4, step=2)
+    submarine.log_param("lr", 0.01)
+
+    client_cls.assert_called_once_with(db_uri=submarine.get_db_uri())
+    client = client_cls.return_value
+    assert client.log_metric.call_count == 2
+    client.log_param.assert_called_once_with(JOB_ID, "lr", 0.01, "worker-0")
+
+
+def test_client_is_keyed_by_db_uri(client_cls):
+    submarine.set_db_uri("sqlite:///first.db")
+    submarine.log_metric("loss", 0.5)
+    submarine.set_db_uri("sqlite:///second.db")
+    submarine.log_metric("loss", 0.5)
+    submarine.set_db_uri("sqlite:///first.db")
+    submarine.log_metric("loss", 0.5)
+
+    assert client_cls.call_args_list == [
+        mock.call(db_uri="sqlite:///first.db"),
+        mock.call(db_uri="sqlite:///second.db"),
+    ]
+
+
+def test_reset_clients(client_cls):
+    submarine.log_metric("loss", 0.5)
+    fluent._reset_clients()
+    submarine.log_metric("loss", 0.5)
+
+    assert client_cls.call_count == 2
+
+
+def test_log_metrics(client_cls):
+    submarine.log_metrics({"loss": 0.5, "auc": 0.75}, step=3)
+
+    client = client_cls.return_value
+    client.log_batch.assert_called_once()
+    job_id = client.log_batch.call_args.args[0]
+    metrics = client.log_batch.call_args.kwargs["metrics"]
+    assert job_id == JOB_ID
+    assert [(m.key, m.value, m.step, m.worker_index) for m in metrics] == [
+        ("loss", 0.5, 3, "worker-0"),
+        ("auc", 0.75, 3, "worker-0"),
+    ]
+    assert metrics[0].timestamp == metrics[1].timestamp
+
+
+def test_log_params(client_cls):
+    submarine.log_params({"lr": 0.01, "optimizer": "adam"})
+
+    client = client_cls.return_value
+    params = client.log_batch.call_args.kwargs["params"]
+    assert [(p.key, p.value, p.worker_index) for p in params] == [
+        ("lr", 0.01, "worker-0"),
+        ("optimizer", "adam", "worker-0"),
+    ]
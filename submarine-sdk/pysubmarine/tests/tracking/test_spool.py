@@ -0,0 +1,119 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements. See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import glob
+import os
+from datetime import datetime, timedelta
+from unittest import mock
+
+import pytest
+
+from submarine.entities import Metric, Param
+from submarine.exceptions import SubmarineException
+from submarine.tracking.async_logging import AsyncMetricLogger
+from submarine.tracking.spool import MetricSpool
+
+JOB_ID = "application_123456789"
+START = datetime(2022, 1, 1)
+
+
+def _metric(step, value=None):
+    return Metric(
+        "loss",
+        1.0 / (step + 1) if value is None else value,
+        "worker-0",
+        START + timedelta(seconds=step),
+        step,
+    )
+
+
+def _logged(store):
+    return [(c.args[0], c.kwargs["metrics"], c.kwargs["params"]) for c in store.log_batch.call_args_list]
+
+
+def test_replay_uploads_and_removes_segments(tmp_path):
+    spool = MetricSpool(str(tmp_path), segment_size=200)
+    for step in range(5):
+        spool.append(JOB_ID, metrics=[_metric(step)])
+    spool.append("application_2", params=[Param("lr", "0.1", "worker-0")])
+    assert spool.has_pending()
+    assert len(glob.glob(os.path.join(str(tmp_path), "*.log"))) > 1
+
+    store = mock.MagicMock()
+    assert spool.replay(store) == 6
+    logged = _logged(store)
+    assert [m.step for job_id, metrics, _ in logged if job_id == JOB_ID for m in metrics] == list(range(5))
+    assert [m.timestamp for _, metrics, _ in logged for m in metrics] == [
+        _metric(s).timestamp for s in range(5)
+    ]
+    assert [
+        (p.key, p.value) for job_id, _, params in logged if job_id == "application_2" for p in params
+    ] == [("lr", "0.1")]
+    assert not spool.has_pending()
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_replay_keeps_segments_when_store_is_down(tmp_path):
+    spool = MetricSpool(str(tmp_path))
+    spool.append(JOB_ID, metrics=[_metric(0, float("nan"))])
+    store = mock.MagicMock()
+    store.log_batch.side_effect = SubmarineException("database is down")
+    with pytest.raises(SubmarineException, match="database is down"):
+        spool.replay(store)
+    assert spool.has_pending()
+
+    store.log_batch.side_effect = None
+    assert spool.replay(store) == 1
+    (metric,) = _logged(store)[-1][1]
+    assert metric.value != metric.value  # NaN survives the round trip
+    assert not spool.has_pending()
+
+
+def test_replay_skips_truncated_record(tmp_path):
+    spool = MetricSpool(str(tmp_path))
+    spool.append(JOB_ID, metrics=[_metric(0)])
+    spool.close()
+    (segment,) = glob.glob(os.path.join(str(tmp_path), "*.log"))
+    with open(segment, "a") as f:
+        f.write('{"job_id": "applic')
+
+    store = mock.MagicMock()
+    assert spool.replay(store) == 1
+
+
+def test_replay_if_due_is_rate_limited(tmp_path):
+    spool = MetricSpool(str(tmp_path), replay_interval=3600)
+    spool.append(JOB_ID, metrics=[_metric(0)])
+    store = mock.MagicMock()
+    assert spool.replay_if_due(store) == 0
+    spool.replay_interval = 0
+    assert spool.replay_if_due(store) == 1
+
+
+def test_async_logger_spools_failed_writes(tmp_path):
+    spool = MetricSpool(str(tmp_path), replay_interval=0)
+    store = mock.MagicMock()
+    store.log_metrics.side_effect = SubmarineException("database is down")
+    logger = AsyncMetricLogger(store, flush_interval=0.01, spool=spool)
+    logger.log_metric(JOB_ID, _metric(0))
+    logger.flush()
+    assert spool.has_pending()
+
+    # the next successful write replays the spooled metric
+    store.log_metrics.side_effect = None
+    logger.log_metric(JOB_ID, _metric(1))
+    logger.close()
+    assert [m.step for _, metrics, _ in _logged(store) for m in metrics] == [0]
+    assert not spool.has_pending()
@@ -13,19 +13,36 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import os
+import tempfile
 from unittest import mock
 
+import pytest
+from sqlalchemy.pool import NullPool
+
 from submarine.store import DEFAULT_SUBMARINE_JDBC_URL
+from submarine.store.database.engine import dispose_engines
 from submarine.store.tracking.sqlalchemy_store import SqlAlchemyStore
 from submarine.tracking.utils import (
     _JOB_ID_ENV_VAR,
     _TRACKING_URI_ENV_VAR,
     get_job_id,
+    get_run_context,
     get_tracking_sqlalchemy_store,
+    get_worker_index,
+    reset_run_context,
+    resolve_store_uri,
 )
 
 
+@pytest.fixture(autouse=True)
+def run_context():
+    reset_run_context()
+    yield
+    reset_run_context()
+
+
 def test_get_job_id():
     env = {
         _JOB_ID_ENV_VAR: "application_12346789",
@@ -34,14 +51,106 @@ def test_get_job_id():
         assert get_job_id() == "application_12346789"
 
 
+def test_get_run_context_from_tf_config():
+    tf_config = {
+        "cluster": {"chief": ["host0:2222"], "worker": ["host1:2222", "host2:2222"], "ps": ["host3:2222"]},
+        "task": {"type": "worker", "index": 1},
+    }
+    env = {_JOB_ID_ENV_VAR: "application_12346789", "TF_CONFIG": json.dumps(tf_config)}
+    with mock.patch.dict(os.environ, env):
+        context = get_run_context()
+    assert context.job_id == "application_12346789"
+    assert context.worker_index == "worker-1"
+    # ranked after the chief, the ps task does not train
+    assert (context.task_type, context.task_index, context.rank, context.world_size) == ("worker", 1, 2, 3)
+    assert context.tf_config == tf_config
+
+    for task, rank in [({"type": "chief", "index": 0}, 0), ({"type": "ps", "index": 0}, -1)]:
+        reset_run_context()
+        env["TF_CONFIG"] = json.dumps({**tf_config, "task": task})
+        with mock.patch.dict(os.environ, env):
+            context = get_run_context()
+        assert (context.rank, context.world_size) == (rank, 3)
+
+
+def test_get_run_context_from_tf_config_without_index():
+    tf_config = {"cluster": {"chief": ["host0:2222"]}, "task": {"type": "chief"}}
+    with mock.patch.dict(os.environ, {"TF_CONFIG": json.dumps(tf_config)}):
+        context = get_run_context()
+    assert context.worker_index == "chief-0"
+    assert (context.task_index, context.rank, context.world_size) == (0, 0, 1)
+    reset_run_context()
+    cluster_spec = {"cluster": {"ps": ["host0:2222"]}, "task": {"JOB_NAME": "ps"}}
+    with mock.patch.dict(os.environ, {"CLUSTER_SPEC": json.dumps(cluster_spec)}):
+        context = get_run_context()
+    assert context.worker_index == "ps-0"
+    assert context.rank == -1
+
+
+def test_get_run_context_from_pytorch_env():
+    with mock.patch.dict(os.environ, {"RANK": "0", "WORLD": "3"}):
+        context = get_run_context()
+    assert context.worker_index == "master-0"
+    assert (context.rank, context.world_size) == (0, 3)
+    reset_run_context()
+    with mock.patch.dict(os.environ, {"RANK": "2", "WORLD_SIZE": "3"}):
+        context = get_run_context()
+    assert context.worker_index == "worker-2"
+    assert (context.rank, context.world_size) == (2, 3)
+
+
+def test_run_context_is_resolved_once():
+    with mock.patch.dict(os.environ, {_JOB_ID_ENV_VAR: "application_1", "RANK": "1"}):
+        assert get_worker_index() == "worker-1"
+        with mock.patch("submarine.tracking.utils._resolve_run_context") as resolve:
+            get_worker_index()
+            get_job_id()
+            resolve.assert_not_called()
+    assert get_job_id() == "application_1"
+    reset_run_context()
+    with mock.patch.dict(os.environ, {_JOB_ID_ENV_VAR: "application_2"}):
+        assert get_job_id() == "application_2"
+        assert get_worker_index() == "worker-0"
+
+
 def test_get_tracking_sqlalchemy_store():
     patch_create_engine = mock.patch("sqlalchemy.create_engine")
     uri = DEFAULT_SUBMARINE_JDBC_URL
     env = {_TRACKING_URI_ENV_VAR: uri}
     with mock.patch.dict(os.environ, env), patch_create_engine as mock_create_engine, mock.patch(
         "submarine.store.tracking.sqlalchemy_store.SqlAlchemyStore._initialize_tables"
-    ):
+    ), mock.patch("submarine.store.tracking.sqlalchemy_store.SqlAlchemyStore._verify_schema"):
         store = get_tracking_sqlalchemy_store(uri)
         assert isinstance(store, SqlAlchemyStore)
         assert store.db_uri == uri
-    mock_create_engine.assert_called_once_with(uri, pool_pre_ping=True)
+        # the stores of a database share its engine
+        assert get_tracking_sqlalchemy_store(uri).engine is store.engine
+        with mock.patch.dict(os.environ, {"SUBMARINE_DB_NULL_POOL": "true"}):
+            get_tracking_sqlalchemy_store(uri)
+        dispose_engines()
+    assert mock_create_engine.call_args_list == [
+        mock.call(uri, pool_pre_ping=True),
+        mock.call(uri, pool_pre_ping=True, poolclass=NullPool),
+    ]
+
+
+def test_resolve_store_uri():
+    uri = DEFAULT_SUBMARINE_JDBC_URL
+    assert resolve_store_uri(uri) == uri
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        local_dir = os.path.join(tmp_dir, "store")
+        assert resolve_store_uri("file://" + local_dir) == "sqlite:///" + os.path.join(
+            local_dir, "submarine.db"
+        )
+        assert os.path.isdir(local_dir)
+
+
+def test_get_local_tracking_sqlalchemy_store():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = get_tracking_sqlalchemy_store("file://" + tmp_dir)
+        assert isinstance(store, SqlAlchemyStore)
+        assert store.db_uri == "sqlite:///" + os.path.join(tmp_dir, "submarine.db")
+        with store.engine.connect() as connection:
+            assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        store.engine.dispose()
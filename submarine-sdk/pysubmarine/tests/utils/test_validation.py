@@ -13,14 +13,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from datetime import datetime
+
 import pytest
 
+from submarine.entities import Metric, Param
 from submarine.exceptions import SubmarineException
 from submarine.utils.validation import (
     _validate_db_type_string,
     _validate_length_limit,
     _validate_metric_name,
     _validate_param_name,
+    validate_batch,
 )
 
 GOOD_METRIC_OR_PARAM_NAMES = [
@@ -66,6 +70,20 @@ def test_validate_param_name():
             _validate_param_name(bad_name)
 
 
+def test_validate_batch():
+    timestamp = datetime.now()
+    metrics = [Metric("loss", 0.5, "worker-0", timestamp, 0)]
+    params = [Param("lr", "0.01", "worker-0")]
+    validate_batch(metrics, params)
+
+    with pytest.raises(SubmarineException, match="Invalid metric name"):
+        validate_batch(metrics + [Metric("//", 0.5, "worker-0", timestamp, 0)], params)
+    with pytest.raises(SubmarineException, match="Got invalid value"):
+        validate_batch(metrics + [Metric("auc", "high", "worker-0", timestamp, 0)], params)
+    with pytest.raises(SubmarineException, match="Invalid parameter name"):
+        validate_batch(metrics, params + [Param("..", "a", "worker-0")])
+
+
 def test__validate_length_limit():
     limit = 10
     key = "key"